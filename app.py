@@ -1,4 +1,29 @@
 import streamlit as st
+from quickvu.config import Config
+from quickvu.profiling import profiler
+from quickvu.utils import setup_logger
+
+setup_logger()
+
+if Config.PROFILING_METRICS_PORT:
+    # local Prometheus scrape target, started once per process
+    profiler.serve(Config.PROFILING_METRICS_PORT)
+
+@st.fragment(run_every=5.0)
+def profiling_panel():
+    """Show what the profiled cleaning and analysis calls cost, refreshed every few seconds."""
+    with st.expander("Profiling", expanded=False):
+        summary = profiler.summary()
+        if summary.empty:
+            st.caption("No profiled calls yet.")
+            return
+        st.dataframe(summary, use_container_width=True)
+        with st.popover("Recent calls"):
+            st.dataframe(profiler.to_frame().tail(50).iloc[::-1], use_container_width=True)
+        st.download_button("Download JSON lines", data=profiler.to_json_lines(), file_name="quickvu_profile.jsonl", mime="application/x-ndjson")
+        st.download_button("Download Prometheus metrics", data=profiler.to_prometheus(), file_name="quickvu_metrics.prom", mime="text/plain")
+        if st.button("Clear"):
+            profiler.clear()
 
 # Define your pages using st.Page objects
 pages = {
@@ -8,6 +33,7 @@ pages = {
     "Apps": [
         st.Page("app_pages/quickPrep.py", title="Quick Prep: Data Cleaning", icon=":material/mop:"),
         st.Page("app_pages/quickGlance.py", title="Quick Glance: Data Analysis", icon=":material/search:",),
+        st.Page("app_pages/quickConverter.py", title="Quick Converter: File Conversion", icon=":material/swap_horiz:"),
     ],
     "Others": {
         st.Page("app_pages/quickFeedback.py", title="Feedback", icon=":material/rate_review:")
@@ -17,5 +43,10 @@ pages = {
 # Setup navigation in the sidebar
 pg = st.navigation(pages, position="sidebar", expanded=True)
 
+# Per-step costs, when profiling is enabled with QUICKVU_PROFILING=1
+if profiler.enabled:
+    with st.sidebar:
+        profiling_panel()
+
 # Run the selected page
 pg.run()
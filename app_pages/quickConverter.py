@@ -1,30 +1,42 @@
 import streamlit as st
-import pandas as pd
+from quickvu import file_converter as fc
 
 # Sidebar: Upload and select conversion options
 st.sidebar.header("File Upload & Conversion")
-uploaded_file = st.sidebar.file_uploader("Choose a file", type=["csv", "xlsx", "xls", "json", "parquet"])
-convert_to = st.sidebar.selectbox("Convert to format", ["csv", "xlsx", "json", "parquet"])
+uploaded_file = st.sidebar.file_uploader("Choose a file", type=["csv", "xlsx", "xls", "json", "ndjson", "jsonl", "parquet"])
+convert_to = st.sidebar.selectbox("Convert to format", ["csv", "xlsx", "ndjson", "parquet"])
+compression_options = {
+    "csv": ["None", "gzip", "bz2"],
+    "ndjson": ["None", "gzip", "bz2"],
+    "parquet": ["snappy", "zstd", "gzip", "None"],
+    "xlsx": ["None"],
+}
+compression = st.sidebar.selectbox("Compression", compression_options[convert_to],
+                                   help="Compress the converted file. Excel files are always zip-compressed.")
+compression = None if compression == "None" else compression
 
 if uploaded_file:
     # Detect file type
     file_type = uploaded_file.name.split(".")[-1]
-    df = fc.read_file(uploaded_file, file_type)
-
-    st.markdown("### Dataset Preview")
-    st.write(df.head())
+    # only the first rows are read for the preview
+    try:
+        df = fc.read_file(uploaded_file, file_type, nrows=100)
+        st.markdown("### Dataset Preview")
+        st.write(df.head())
+    except Exception as e:
+        st.error(f"Error reading file: {e}")
 
     # Convert and download button
     if st.sidebar.button("Convert and Download"):
-        output_path = f"converted_file.{convert_to}"
-        if convert_to == "csv":
-            fc.convert_to_csv(df, output_path)
-        elif convert_to == "xlsx":
-            fc.convert_to_excel(df, output_path)
-        elif convert_to == "json":
-            fc.convert_to_json(df, output_path)
-        elif convert_to == "parquet":
-            fc.convert_to_parquet(df, output_path)
-
-        st.success(f"File converted to {convert_to.upper()} format! Download below:")
-        st.download_button("Download Converted File", data=open(output_path, "rb"), file_name=output_path)
+        # the file is converted batch by batch straight into an in-memory download buffer
+        try:
+            with st.spinner("Converting..."):
+                buffer, report = fc.convert(uploaded_file, file_type, convert_to, compression=compression)
+        except Exception as e:
+            st.error(f"Error converting file: {e}")
+        else:
+            st.success(f"File converted to {convert_to.upper()} format! Download below:")
+            st.caption(f"{report['rows']:,} rows in {report['batches']} batches, "
+                       f"{report['output_bytes'] / (1024 * 1024):.1f} MB in {report['seconds']:.1f} s")
+            st.download_button("Download Converted File", data=buffer,
+                               file_name=fc.output_name(uploaded_file.name, convert_to, compression))
@@ -1,14 +1,35 @@
 import numpy as np
 import pandas as pd
-import seaborn as sns
 import streamlit as st
-import matplotlib.pyplot as plt
 
 from quickvu.config import Config
-from quickvu import data_processing, eda, visualization
-from quickvu import gemini
+from quickvu import correlation, data_processing, eda, jobs, loader, progressive, visualization
 
-sns.set_style('whitegrid')
+def plotting():
+    """Import the plotting libraries when a chart is first drawn, they are slow to import."""
+    import seaborn as sns
+    # figures are built without pyplot, whose global state is not thread-safe
+    from matplotlib.figure import Figure
+    sns.set_style('whitegrid')
+    return Figure, sns
+
+@st.fragment(run_every=1.0)
+def job_progress(job_id: str, label: str):
+    """Show the progress of a background job, refreshed every second, and rerun the page once it finishes."""
+    job = jobs.runner.get(job_id)
+    if job is None or job.status not in ('queued', 'running'):
+        st.rerun()
+    st.progress(job.progress, text=f"{label}: {job.message or job.status} ({job.progress:.0%})")
+    if st.button("Cancel", key=f"cancel-{job_id}"):
+        job.cancel()
+        st.rerun()
+
+@st.fragment(run_every=1.0)
+def exact_results(futures: list):
+    """Rerun the page once one of the exact results computed in the background is ready, checked every second."""
+    if any(future.done() for future in futures):
+        st.rerun()
+    st.caption(f"Computing {len(futures)} exact result{'s' if len(futures) > 1 else ''} on the full dataset...")
 
 with open('app_pages/styles.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
@@ -25,17 +46,20 @@ st.sidebar.image('./dataset/logo-png.png', use_container_width=True)
 
 
 st.sidebar.markdown('<h3 class="side-header">Upload your Dataset</h3>', unsafe_allow_html=True)
-uploaded_file = st.sidebar.file_uploader("Choose a CSV, Excel, or JSON file", type=["csv", "xlsx", "xls", "json"], help="Upload your dataset in CSV, Excel, or JSON format for analysis.")
+# several files, or zip archives of them, are shards of one dataset and are combined
+uploaded_file = st.sidebar.file_uploader("Choose CSV, Excel, or JSON files", type=["csv", "xlsx", "xls", "json", "zip"], accept_multiple_files=True,
+                                         help="Upload your dataset in CSV, Excel, or JSON format for analysis. Several files or a zip archive are combined into one dataset, matching columns by their standardized names.")
 
 if uploaded_file:
     try:
-        # Read data based on file type
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith('.json'):
-            df = pd.read_json(uploaded_file)
+        # Parsed uploads are cached by content hash, so reruns skip re-reading the file
+        df, load_report = loader.load_dataset(uploaded_file, with_report=True)
+        cache_stats = loader.cache_info()
+        st.sidebar.caption(f"Dataset cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        if 'files' in load_report:
+            st.sidebar.caption(f"Combined {len(load_report['files'])} files")
+        if load_report.get('widened'):
+            st.sidebar.caption("Widened columns: " + "; ".join(f"{column} ({change})" for column, change in load_report['widened'].items()))
         
         # Display preview of the dataset
         st.markdown('<h2 class="sub-header">Dataset Preview</h2>', unsafe_allow_html=True)
@@ -43,17 +67,22 @@ if uploaded_file:
     
     except Exception as e:
         st.error(f"Error loading file: {e}")
+        # the rest of the page needs the dataset
+        st.stop()
     
     columns = df.columns.tolist()
     column_types = df.dtypes
 
-    numerical_columns = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+    # date columns are detected from a sample of the values and preselected
+    detected_datetime = data_processing.detect_datetime_columns(df)
+    # integer dates (e.g. 20240131 or a year) are offered as dates rather than numbers
+    numerical_columns = [column for column in df.select_dtypes(include=['number']).columns if column not in detected_datetime]
     categorical_columns = df.select_dtypes(include=['object', 'category']).columns.tolist()
 
     st.sidebar.markdown('<h3 class="side-header">Select Columns for Analysis</h3>', unsafe_allow_html=True)
     selected_categorical = st.sidebar.multiselect("Select Categorical Columns", categorical_columns, help="Choose columns with categorical data like 'Product Type', 'Category', etc.")
     selected_numerical = st.sidebar.multiselect("Select Numerical Columns", numerical_columns, help="Select columns with numerical data like 'Sales Amount', 'Profit', etc.")
-    selected_datetime = st.sidebar.multiselect("Select Date/Time Columns", columns, help="Choose date columns for time-based analysis.")
+    selected_datetime = st.sidebar.multiselect("Select Date/Time Columns", columns, default=detected_datetime, help="Choose date columns for time-based analysis.")
     
     # Convert integer columns to datetime
     df = data_processing.convert_int_to_datetime(df, selected_datetime)
@@ -79,32 +108,78 @@ if uploaded_file:
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
     st.sidebar.markdown('<h3 class="side-header">Exploratory Data Analysis</h3>', unsafe_allow_html=True)
-    
+
+    # On large datasets every result is first computed on a sample and replaced by the exact one when it is ready
+    progressive_mode = st.sidebar.checkbox("Progressive Mode", value=len(df_clean) > Config.PROGRESSIVE_MIN_ROWS,
+                                           help="Show results from a sample right away, then refine them on the full dataset.")
+    sample_rows = Config.PROGRESSIVE_SAMPLE_ROWS if progressive_mode else len(df_clean)
+    # df_clean only depends on the upload and the converted date columns
+    data_key = f"{load_report['content_hash']}:{sorted(selected_datetime)}"
+    pending = []
+
+    def show(render, func, frame, *args, key=data_key, by=None, sample_func=None, **kwargs):
+        """Render `func(frame, *args, **kwargs)`, from a sample first in progressive mode."""
+        placeholder = st.empty()
+        result = progressive.runner.run(func, frame, *args, data_key=key, sample_rows=sample_rows, by=by,
+                                        sample_func=sample_func, **kwargs)
+        with placeholder.container():
+            render(result.value)
+            if not result.exact:
+                st.caption(f"Estimated from a {result.sample_rows:,}-row sample of {result.total_rows:,} rows, the exact result replaces it when ready.")
+                pending.append((placeholder, result, render))
+        return result
+
     if st.sidebar.checkbox("Show Summary Statistics", help="Display summary statistics such as mean, median, and standard deviation for numerical columns."):
         st.markdown('<h2 class="sub-header">Summary Statistics</h2>', unsafe_allow_html=True)
-        st.write("Numerical:",eda.generate_summary_statistics(df_clean))
-        st.write("Categorical:",eda.generate_object_summary_statistics(df_clean))
+        show(lambda summary: st.write("Numerical:", summary), eda.generate_summary_statistics, df_clean,
+             sample_func=progressive.summary_with_intervals)
+        show(lambda summary: st.write("Categorical:", summary), eda.generate_object_summary_statistics, df_clean)
 
     if st.sidebar.checkbox("Show Correlation Matrix", help="Display a correlation matrix for selected numerical columns."):
         st.markdown('<h2 class="sub-header">Correlation Matrix</h2>', unsafe_allow_html=True)
         
         if selected_numerical:
-            df_numerical = df_clean[selected_numerical]
-            correlation_matrix = df_numerical.corr()
+            Figure, sns = plotting()
 
-            fig, ax = plt.subplots(figsize=(10, 8))
-            sns.heatmap(correlation_matrix, annot=True, fmt=".2f", cmap='coolwarm', square=True, cbar_kws={"shrink": .8}, ax=ax)
-            ax.set_title('Correlation Matrix of Selected Numerical Columns', fontsize=16, fontweight='bold', color="#333")
-            st.pyplot(fig)
+            def show_correlation(matrix):
+                wide = len(matrix) > Config.CORRELATION_HEATMAP_MAX_COLUMNS
+                if wide:
+                    # too many columns for a readable heatmap: list the strongest pairs and show the clustered blocks
+                    st.dataframe(correlation.top_pairs(matrix, k=20), use_container_width=True)
+                    matrix = correlation.clustered_view(matrix, Config.CORRELATION_HEATMAP_MAX_COLUMNS)
+
+                fig = Figure(figsize=(10, 8))
+                ax = fig.subplots()
+                sns.heatmap(matrix, annot=not wide, fmt=".2f", cmap='coolwarm', square=True, cbar_kws={"shrink": .8}, ax=ax)
+                ax.set_title('Correlation Matrix of Selected Numerical Columns', fontsize=16, fontweight='bold', color="#333")
+                st.pyplot(fig)
+
+            result = show(show_correlation, correlation.correlation_matrix, df_clean, columns=selected_numerical)
+            correlation_matrix = result.value
+            if not result.exact:
+                low, high = progressive.correlation_intervals(correlation_matrix, result.sample_rows)
+                st.caption(f"95% confidence intervals of the sample correlations are at most ±{np.nanmax((high - low).to_numpy()) / 2:.3f} wide.")
+            if len(correlation_matrix) > Config.CORRELATION_HEATMAP_MAX_COLUMNS:
+                correlation_matrix = correlation.clustered_view(correlation_matrix, Config.CORRELATION_HEATMAP_MAX_COLUMNS)
 
             # Explanation Section
             with st.expander("Need Help Understanding the Correlation Matrix?"):
+                # the explanation is fetched by a background job so the rest of the page renders meanwhile;
+                # it stays shown while the matrix is unchanged, and explanations are also cached on disk
+                explain_key = jobs.job_key('explain', correlation_matrix.round(2))
                 if st.button("Explain Correlation Matrix"):
-                    corr_matrix_str = correlation_matrix.to_string()  # Convert the correlation matrix to string
-                    with st.spinner("Generating explanation..."):
-                        explanation = gemini.explain_correlation_matrix(corr_matrix_str)
-                    st.markdown('<h2 class="sub-header">Explanation</h2>', unsafe_allow_html=True)
-                    st.info(explanation, icon="💡")
+                    st.session_state.explain_key = explain_key
+                if st.session_state.get('explain_key') == explain_key:
+                    explain_job = jobs.runner.submit(jobs.explain_correlation, correlation_matrix, name='explanation', key=explain_key)
+                    if not explain_job.wait(Config.JOB_INLINE_SECONDS):
+                        job_progress(explain_job.id, "Generating explanation")
+                    elif explain_job.status == 'cancelled':
+                        st.caption("The explanation was cancelled. Click the button to request it again.")
+                        jobs.runner.forget(explain_job.id)
+                        del st.session_state.explain_key
+                    else:
+                        st.markdown('<h2 class="sub-header">Explanation</h2>', unsafe_allow_html=True)
+                        st.info(explain_job.result(), icon="💡")
         else:
             st.markdown(
                 '<p class="warning-message">Please select at least one numerical column to view the correlation matrix.</p>', 
@@ -121,8 +196,10 @@ if uploaded_file:
         if selected_categorical and selected_numerical:
             categ_col = st.sidebar.selectbox("Select Categorical Column", selected_categorical, key="Categorical Column", help="Select a categorical column representing products.")
             numer_col = st.sidebar.selectbox("Select Numeric Column", selected_numerical, key="Numerical Column", help="Select a numerical column representing sales amounts.")
-            fig = visualization.plot_metrics_by_category(df_clean, categ_col, numer_col)
-            st.pyplot(fig)
+            plotting()
+            # stratified by category, so small categories still show up in the sample
+            show(st.pyplot, visualization.plot_metrics_by_category, df_clean, categ_col, numer_col, by=categ_col,
+                 sample_func=progressive.sum_estimate(visualization.plot_metrics_by_category, numer_col))
         else:
             st.markdown('<p class="warning-message">Please select both a Categorical and a Numerical column for this analysis.</p>', unsafe_allow_html=True)
 
@@ -130,25 +207,49 @@ if uploaded_file:
     if st.sidebar.checkbox("Plot Metrics Trends", help="Plot metric trends over time based on selected columns"):
         st.write("## Metrics Over Time")
 
-        datetime_columns = df_clean.select_dtypes(include=['datetime64[ns]', 'object']).columns.tolist()
+        datetime_columns = [column for column in selected_datetime if column in df_clean.columns] or df_clean.select_dtypes(include=['datetime64[ns]', 'object', 'category']).columns.tolist()
 
         if datetime_columns and numerical_columns:
             date_col = datetime_columns[0] if len(datetime_columns) == 1 else st.sidebar.selectbox("Select Date Column", datetime_columns)
             amount_col = st.sidebar.selectbox("Select Numeric Column", selected_numerical)
 
             if date_col and amount_col:
-                df_clean[date_col] = pd.to_datetime(df_clean[date_col], errors='coerce')
+                # a new frame, background computations may still be reading the current one
+                df_clean = df_clean.assign(**{date_col: pd.to_datetime(df_clean[date_col], errors='coerce')})
                 df_clean = df_clean.dropna(subset=[date_col, amount_col])  # Drop rows with NaT or NaN values
 
                 if not df_clean.empty:  # Check if the DataFrame is not empty after dropping NaNs
-                    fig = eda.plot_sales_trends(df_clean, date_col, amount_col)
-                    st.pyplot(fig)
+                    plotting()
+
+                    def show_trends(fig):
+                        st.pyplot(fig)
+                        st.caption(f"Plotted {fig.point_counts['plotted']:,} of {fig.point_counts['raw']:,} points")
+
+                    show(show_trends, eda.plot_sales_trends, df_clean, date_col, amount_col, key=f"{data_key}:{date_col}:{amount_col}",
+                         sample_func=progressive.sum_estimate(eda.plot_sales_trends, amount_col))
                 else:
                     st.warning("No valid data available for the selected columns.")
             else:
                 st.warning("Please ensure both a valid date column and a sales amount column are selected.")
         else:
             st.warning("Please ensure your dataset contains both Date/Time and Numerical columns for this analysis.")
+
+    # swap in the exact results that are ready; the page never waits for the others, exact_results
+    # reruns it once one of them is done, and changing any option reruns it right away
+    computing = []
+    for placeholder, result, render in pending:
+        if not result.future.done():
+            computing.append(result.future)
+            continue
+        try:
+            exact = progressive.runner.refined(result)
+        except Exception as e:
+            st.error(f"Error computing the exact result: {e}")
+            continue
+        with placeholder.container():
+            render(exact.value)
+    if computing:
+        exact_results(computing)
             
 else:
     st.markdown('<p class="instructions">Please upload a CSV file to start data analysis. </br> You can drop the file at the data uploader located on the navigation side bar. </p>', unsafe_allow_html=True)
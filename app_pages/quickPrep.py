@@ -1,9 +1,11 @@
-import numpy as np
-import pandas as pd
+import json
+import uuid
+
 import streamlit as st
-import quickvu.prepare_data as DataPrepper
-from quickvu import eda
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from quickvu import backends, jobs, loader, transformers
+from quickvu.config import Config
+from quickvu.pipeline import Pipeline, checkpoint_cache
+from quickvu.session_store import dataset_store
 
 with open('app_pages/styles.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
@@ -15,28 +17,52 @@ st.image('./dataset/quickPrepDiagram.png')
 
 st.markdown("""Quick Prep is a versatile data cleaning tool to help prepare your dataset for analysis. Simply upload your data, select the desired cleaning options, and download the prepared data.""")
 
+@st.fragment(run_every=1.0)
+def job_progress(job_id: str, label: str):
+    """Show the progress of a background job, refreshed every second, and rerun the page once it finishes."""
+    job = jobs.runner.get(job_id)
+    if job is None or job.status not in ('queued', 'running'):
+        st.rerun()
+    st.progress(job.progress, text=f"{label}: {job.message or job.status} ({job.progress:.0%})")
+    if st.button("Cancel", key=f"cancel-{job_id}"):
+        job.cancel()
+        st.rerun()
+
 # Sidebar - File upload
 st.sidebar.image('./dataset/logo-png.png', use_container_width=True)
 
 st.sidebar.markdown('<h3 class="side-header">Upload your Dataset</h3>', unsafe_allow_html=True)
-uploaded_file = st.sidebar.file_uploader("Choose a CSV, Excel, or JSON file", type=["csv", "xlsx", "xls", "json"], help="Upload your dataset in CSV, Excel, or JSON format for analysis.")
+# several files, or zip archives of them, are shards of one dataset and are combined
+uploaded_file = st.sidebar.file_uploader("Choose CSV, Excel, or JSON files", type=["csv", "xlsx", "xls", "json", "zip"], accept_multiple_files=True,
+                                         help="Upload your dataset in CSV, Excel, or JSON format for analysis. Several files or a zip archive are combined into one dataset, matching columns by their standardized names.")
+
+# pandas cleans in memory; the duckdb backend (Config.PREP_BACKEND) works on the file on disk,
+# so `df` is whatever the backend uses as a table and is only read through the backend
+prep_backend = backends.get_backend()
 
 if uploaded_file:
     try:
-        # Read data based on file type
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith('.json'):
-            df = pd.read_json(uploaded_file)
+        # Parsed uploads are cached by content hash, so reruns skip re-reading the file
+        df, load_report = prep_backend.scan(uploaded_file)
+        if prep_backend.name == 'pandas':
+            cache_stats = loader.cache_info()
+            st.sidebar.caption(f"Dataset cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+            st.sidebar.caption(f"Compact dtypes saved {load_report['memory_saved'] / 1024 ** 2:.1f} MB")
+        # the pandas backend reports each combined file, the duckdb one their paths
+        shards = load_report.get('files', load_report.get('paths'))
+        if shards:
+            st.sidebar.caption(f"Combined {len(shards)} files")
+        if load_report.get('widened'):
+            st.sidebar.caption("Widened columns: " + "; ".join(f"{column} ({change})" for column, change in load_report['widened'].items()))
         
         # Display preview of the dataset
         st.markdown('<h2 class="sub-header">Dataset Preview</h2>', unsafe_allow_html=True)
-        st.write(df.head(10))
+        st.write(prep_backend.head(df, 10))
     
     except Exception as e:
         st.error(f"Error loading file: {e}")
+        # the rest of the page needs the dataset
+        st.stop()
 
     # Sidebar - Data Cleaning Options
     st.sidebar.markdown('<h3 class="side-header">Data Cleaning Options</h3>', unsafe_allow_html=True)
@@ -45,90 +71,188 @@ if uploaded_file:
     show_summary_stats = st.sidebar.checkbox("Show Summary Statistics", help="Display summary statistics for numerical columns.")
 
     # Standardize Column Names
-    if st.sidebar.checkbox("Standardize Column Names", help="Standardizes column names to lower case and replaces spaces with underscores."):
-        df = DataPrepper.standardize_column_names(df)
-        st.session_state.df = df
+    # renaming only touches the column index, so it is applied right away and the widgets below see the new names
+    standardize_names = st.sidebar.checkbox("Standardize Column Names", help="Standardizes column names to lower case and replaces spaces with underscores.")
+    if standardize_names:
+        df = prep_backend.run(Pipeline().add('standardize_column_names'), df)
+
+    # The remaining options are recorded as steps and run together at the end,
+    # so the pipeline can reorder filters/drops and fuse column-wise steps
+    cleaning = Pipeline()
+    # column-wise steps split their columns over a pool of workers
+    parallel = {'executor': Config.PARALLEL_EXECUTOR, 'max_workers': Config.PARALLEL_MAX_WORKERS}
+    input_key = f"{load_report['content_hash']}:{standardize_names}"
+
+    # Imputation and scaling statistics are fitted once per dataset and options and reused by
+    # every rerun; statistics saved from an earlier dataset (e.g. yesterday's feed) can be applied instead
+    saved_statistics = st.sidebar.file_uploader("Apply Saved Statistics", type=["json"], accept_multiple_files=True,
+                                                help="Fill and scale with statistics downloaded from an earlier dataset instead of fitting them on this one.")
+    saved = {}
+    for saved_file in saved_statistics or []:
+        try:
+            transformer = transformers.load(saved_file)
+            saved[type(transformer).__name__] = transformer
+        except (ValueError, KeyError) as e:
+            st.sidebar.error(f"Error loading {saved_file.name}: {e}")
+    fitted = {}
 
     # Handle Missing Values
     missing_value_option = st.sidebar.selectbox("Handle Missing Values", 
                                                 ("None", "Fill with Mean", "Fill with Median", "Drop Missing Rows"),
                                                 help="Choose how to handle missing values in the dataset.")
-    if missing_value_option == "Fill with Mean":
-        df = DataPrepper.handle_missing_values(df, method='mean')
-        st.session_state.df = df
-    elif missing_value_option == "Fill with Median":
-        df = DataPrepper.handle_missing_values(df, method='median')
-        st.session_state.df = df
+    if missing_value_option in ("Fill with Mean", "Fill with Median"):
+        strategy = 'mean' if missing_value_option == "Fill with Mean" else 'median'
+        imputer = saved.get('StreamingImputer') or transformers.fitted_cache.fit(
+            transformers.StreamingImputer(strategy), df, input_key, backend=prep_backend)
+        fitted['imputer'] = imputer
+        cleaning.add('handle_missing_values', method=strategy, imputer=imputer, **parallel)
     elif missing_value_option == "Drop Missing Rows":
-        df = DataPrepper.handle_missing_values(df)
-        st.session_state.df = df
+        cleaning.add('handle_missing_values', method='drop')
 
     # Outlier Handling with Column Selection
     if st.sidebar.checkbox("Detect and Handle Outliers", help="Select columns and choose a method to detect and handle outliers in the dataset."):
-        outlier_columns = st.sidebar.multiselect("Select Columns for Outlier Treatment", df.select_dtypes(include=[np.number]).columns)
+        outlier_columns = st.sidebar.multiselect("Select Columns for Outlier Treatment", prep_backend.numeric_columns(df))
         outlier_method = st.sidebar.radio("Outlier Detection Method", ("Z-score", "IQR"))
         apply_outliers = st.sidebar.button("Apply Outlier Treatment", help="Marks outliers as TRUE, non-outliers as FALSE.")
 
         if apply_outliers and outlier_columns:
             if outlier_method == "Z-score":
-                df = DataPrepper.detech_outliers(df, method='zscore', columns=outlier_columns)
-                st.session_state.df = df
+                cleaning.add('detech_outliers', method='zscore', columns=outlier_columns, **parallel)
             elif outlier_method == "IQR":
-                df = DataPrepper.detech_outliers(df, method='iqr', columns=outlier_columns)
-                st.session_state.df = df 
+                cleaning.add('detech_outliers', method='iqr', columns=outlier_columns, **parallel)
 
     # Data Scaling with Column Selection
     if st.sidebar.checkbox("Scale Data", help="Select a column to scale and choose the scaling method (Standardize or Normalize)."):
-        scale_column = st.sidebar.selectbox("Select Column to Scale", df.select_dtypes(include=[np.number]).columns)
+        scale_column = st.sidebar.selectbox("Select Column to Scale", prep_backend.numeric_columns(df))
         scaling_method = st.sidebar.radio("Scaling Method", ("Standardize", "Normalize"))
-        if st.sidebar.button("Apply Scaling"):
-            if scaling_method == "Standardize":
-                scaler = StandardScaler()
-            else:
-                scaler = MinMaxScaler()
-            df[scale_column] = scaler.fit_transform(df[[scale_column]])
-            st.session_state.df = df 
+        # the scaler is fitted by a background job, and the request is remembered until the job
+        # is done, as the button is only pressed for one rerun
+        if st.sidebar.button("Apply Scaling") or st.session_state.get('prep_scaling'):
+            method = 'standarize' if scaling_method == "Standardize" else 'normalize'
+            scaler = saved.get('StreamingScaler')
+            if scaler is not None and scale_column not in scaler.columns_:
+                st.sidebar.warning(f"The saved scaler has no statistics for {scale_column}, they are fitted on this dataset.")
+                scaler = None
+            if scaler is None:
+                # fitted on the column as the earlier steps leave it; their results are checkpointed for the cleaning run
+                data_key = jobs.job_key(input_key, cleaning.optimize())
+                fit_job = jobs.runner.submit(jobs.fit_transformer, prep_backend, transformers.StreamingScaler(method, [scale_column]),
+                                             Pipeline(cleaning.steps), df, data_key, name='scaler',
+                                             key=jobs.job_key('scaler', data_key, method, scale_column),
+                                             checkpoints=checkpoint_cache, input_key=input_key)
+                if not fit_job.wait(Config.JOB_INLINE_SECONDS):
+                    st.session_state.prep_scaling = True
+                    job_progress(fit_job.id, "Fitting scaler")
+                    st.stop()
+                st.session_state.pop('prep_scaling', None)
+                try:
+                    scaler = fit_job.result()
+                except jobs.JobCancelled:
+                    st.sidebar.warning("Fitting the scaler was cancelled. Change the scaling options to fit it again.")
+            if scaler is not None:
+                fitted['scaler'] = scaler
+                cleaning.add('scale_data', numerical_columns=[scale_column], method=method, scaler=scaler)
+    else:
+        st.session_state.pop('prep_scaling', None)
 
     # Drop Duplicate Rows
     if st.sidebar.checkbox("Drop Duplicate Rows", help="Drop duplicate rows from the dataset."):
-        df = DataPrepper.remove_duplicates(df)
-        st.session_state.df = df 
+        cleaning.add('remove_duplicates')
     # Drop Columns
     if st.sidebar.checkbox("Drop Columns", help="Select and remove a column from the dataset."):
-        column_to_drop = st.sidebar.selectbox("Select Column to Drop", df.columns)
+        column_to_drop = st.sidebar.selectbox("Select Column to Drop", prep_backend.columns(df))
         if st.sidebar.button("Drop Column"):
-            df = df.drop(columns=[column_to_drop])
-            st.session_state.df = df
+            cleaning.add('drop_columns', columns=[column_to_drop])
 
     # Change Data Type
     if st.sidebar.checkbox("Change Data Type", help="Change the data type of a selected column."):
-        dtype_column = st.sidebar.selectbox("Select Column to Change Type", df.columns)
+        dtype_column = st.sidebar.selectbox("Select Column to Change Type", prep_backend.columns(df))
         dtype_option = st.sidebar.selectbox("Select Data Type", ["int", "float", "str", "datetime"])
         if st.sidebar.button("Change Data Type"):
-            df = DataPrepper.convert_data_types(df, {dtype_column: dtype_option})
-            st.session_state.df = df 
+            cleaning.add('convert_data_types', column_types={dtype_column: dtype_option}, **parallel)
 
     # Row Filtering
     if st.sidebar.checkbox("Filter Rows", help="Filter rows based on selected values from a specific column."):
-        filter_column = st.sidebar.selectbox("Select Column to Filter By", df.columns)
-        unique_values = df[filter_column].unique()
+        filter_column = st.sidebar.selectbox("Select Column to Filter By", prep_backend.columns(df))
+        unique_values = prep_backend.unique_values(df, filter_column)
         filter_values = st.sidebar.multiselect("Select Values to Keep", unique_values)
         if filter_values:
-            df = df[df[filter_column].isin(filter_values)]
-            st.session_state.df = df 
+            cleaning.add('filter_rows', filter_conditions={filter_column: filter_values})
+
+    # Cleaning runs as a background job so the page stays responsive; a rerun with the same
+    # options gets the same job instead of starting again, and each step's output is
+    # checkpointed, so only the steps from the changed option onward rerun
+    cleaning_key = jobs.job_key(prep_backend.name, input_key, cleaning.optimize())
+    stored = None
+    if prep_backend.name == 'pandas' and 'prep_job_id' not in st.session_state \
+            and st.session_state.get('dataset_key') == cleaning_key:
+        # the cleaned frame of an earlier rerun with the same options, kept in the shared Arrow store
+        stored = dataset_store.get(st.session_state.dataset_id)
+    if stored is not None:
+        df = stored
+    else:
+        cleaning_job = None
+        if 'prep_job_id' in st.session_state:
+            # a job started by an earlier run, e.g. by a button that is no longer pressed
+            cleaning_job = jobs.runner.get(st.session_state.prep_job_id)
+            if cleaning_job is not None and cleaning_job.status in ('queued', 'running'):
+                job_progress(cleaning_job.id, "Cleaning")
+                st.stop()
+            del st.session_state.prep_job_id
+        if cleaning_job is None or cleaning_job.status != 'done':
+            cleaning_job = jobs.runner.submit(jobs.run_cleaning, prep_backend, cleaning, df, name='cleaning', key=cleaning_key,
+                                              checkpoints=checkpoint_cache, input_key=input_key)
+            if not cleaning_job.wait(Config.JOB_INLINE_SECONDS):
+                st.session_state.prep_job_id = cleaning_job.id
+                job_progress(cleaning_job.id, "Cleaning")
+                st.stop()
+        try:
+            df = cleaning_job.result()
+        except jobs.JobCancelled:
+            st.warning("Cleaning was cancelled. Change the cleaning options to run it again.")
+            st.stop()
+        cleaning_key = cleaning_job.key
+        if prep_backend.name == 'pandas':
+            # the store is the only holder of the working frame between reruns; the session
+            # keeps its id and the job's own copy is dropped
+            if 'dataset_id' not in st.session_state:
+                st.session_state.dataset_id = uuid.uuid4().hex
+            dataset_store.put(st.session_state.dataset_id, df)
+            st.session_state.dataset_key = cleaning_key
+            jobs.runner.forget(cleaning_job.id)
+            if cleaning.last_run_info['steps']:
+                st.sidebar.caption(f"Reused {cleaning.last_run_info['reused']} of {cleaning.last_run_info['steps']} cleaning steps from cache")
 
     # Display Cleaned Dataset
     st.markdown('<h2 class="sub-header">Cleaned Dataset</h2>', unsafe_allow_html=True)
-    st.write(df.head(10))
+    st.write(prep_backend.head(df, 10))
 
     st.markdown('<h2 class="sub-header">Summary Statistics</h2>', unsafe_allow_html=True)
-    st.write("Numerical:", eda.generate_summary_statistics(df))
-    st.write("Categorical:", eda.generate_object_summary_statistics(df))
+    numerical_summary, categorical_summary = prep_backend.summarize(df)
+    st.write("Numerical:", numerical_summary)
+    st.write("Categorical:", categorical_summary)
 
     # Download option
     st.sidebar.markdown('<h3 class="side-header">Download Cleaned Data</h3>', unsafe_allow_html=True)
-    csv = df.to_csv(index=False)
-    st.sidebar.download_button("Download CSV", data=csv, file_name="cleaned_data.csv", mime="text/csv", help="Download the cleaned data as a CSV file.")
+    # the CSV is written in chunks by a background job, once per cleaned dataset
+    export_job = jobs.runner.submit(jobs.export_table, prep_backend, df, 'csv', name='export', key=jobs.job_key(cleaning_key, 'csv'))
+    if export_job.status == 'cancelled':
+        st.sidebar.caption("Preparing the CSV was cancelled. Change the cleaning options to prepare it again.")
+    elif export_job.wait(Config.JOB_INLINE_SECONDS):
+        st.sidebar.download_button("Download CSV", data=export_job.result(), file_name="cleaned_data.csv", mime="text/csv", help="Download the cleaned data as a CSV file.")
+    else:
+        with st.sidebar:
+            job_progress(export_job.id, "Preparing CSV")
+    # the cleaning steps, to clean other files the same way with the `quickvu` command
+    recipe = Pipeline([('standardize_column_names', {})] if standardize_names else [])
+    recipe.steps += cleaning.steps
+    st.sidebar.download_button("Download Recipe", data=json.dumps(recipe.to_recipe(), indent=2), file_name="quickvu_recipe.json",
+                               mime="application/json", help="Download the cleaning steps to run them on other files with `quickvu recipe.json <files>`.")
+    # the fitted statistics, to clean later datasets the same way with "Apply Saved Statistics"
+    for name, transformer in fitted.items():
+        st.sidebar.download_button(f"Download {name.title()} Statistics", data=json.dumps(transformer.to_dict()),
+                                   file_name=f"{name}_statistics.json", mime="application/json",
+                                   help=f"Download the fitted {name} statistics as JSON.")
 
 else:
     st.markdown('<p class="instructions">Please upload a file to start data cleaning. </br> You can drop the file at the data uploader located on the navigation side bar. </p>', unsafe_allow_html=True)
@@ -0,0 +1,87 @@
+"""Import-time budget check for quickvu and the app pages.
+
+Every target is imported in a fresh interpreter, a few times, and the median time is compared
+with its budget. A target also fails when it pulls in one of the heavy optional libraries that
+should only be imported once a feature needs them. Exits with status 1 on any failure.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--scale 1.0]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# seconds; modules are measured on top of an already imported pandas and numpy, which every
+# page needs anyway, and pages on top of streamlit as well
+BUDGETS = {
+    "quickvu": 0.05,
+    "quickvu.eda": 0.15,
+    "quickvu.prepare_data": 0.15,
+    "quickvu.pipeline": 0.15,
+    "quickvu.gemini": 0.15,
+    "quickvu.file_converter": 0.25,
+    "app_pages/quickPrep.py": 0.25,
+    "app_pages/quickGlance.py": 0.25,
+    "app_pages/quickConverter.py": 0.25,
+}
+
+# libraries that must not be loaded just by importing a module or opening a page
+HEAVY_MODULES = ("google.generativeai", "sklearn", "scipy", "seaborn", "matplotlib.pyplot")
+
+_MEASURE = """
+import json, sys, time
+{preload}
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def page_imports(path: str) -> str:
+    """Return the top-level import statements of a page script, which is what opening it costs before rendering."""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def measure(target: str) -> dict:
+    """Import a target in a fresh interpreter and return the import time and heavy modules loaded."""
+    if target.endswith(".py"):
+        preload, imports = "import numpy, pandas, streamlit", page_imports(target)
+    elif target == "quickvu":
+        preload, imports = "", "import quickvu"
+    else:
+        preload, imports = "import numpy, pandas", f"import {target}"
+    script = _MEASURE.format(preload=preload, imports=imports, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target, the median is used")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. for slower machines")
+    args = parser.parse_args()
+
+    failures = 0
+    for target, budget in BUDGETS.items():
+        runs = [measure(target) for _ in range(args.repeat)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        heavy = sorted(set().union(*(run["heavy"] for run in runs)))
+        limit = budget * args.scale
+        ok = seconds <= limit and not heavy
+        failures += not ok
+        note = f" loads {', '.join(heavy)}" if heavy else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {target:<30} {seconds * 1000:8.1f} ms (budget {limit * 1000:.0f} ms){note}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Benchmarks for the public functions of quickvu's prepare_data, eda, visualization and data_processing.
+
+Every case runs on synthetic data of several row counts and column widths. Wall time (the
+median of `--repeat` runs) and peak traced memory (one extra run under tracemalloc) are saved
+as JSON and, with `--baseline`, compared against an earlier run. The data is generated from a
+fixed seed and nothing touches the network, so runs are reproducible locally.
+
+Timings depend on the machine, so no baseline is committed. Create one on the machine that
+will run the comparisons, from a checkout of the reference version, with `--save-baseline`;
+it is written to benchmarks/baseline.json, which `--baseline` reads when given no file.
+Use the same `--rows`, `--widths` and `--cases` for both runs, as only matching cases are compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --quick --save-baseline
+    python benchmarks/run_benchmarks.py --quick --baseline
+    python benchmarks/run_benchmarks.py --rows 1000,100000 --widths 10,100 --baseline other-results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import matplotlib
+
+# no display and no GUI event loop while benchmarking
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quickvu import data_processing, eda, ingest, prepare_data, transformers, visualization  # noqa: E402
+
+DEFAULT_ROWS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUICK_ROWS = (1_000, 10_000)
+DEFAULT_WIDTHS = (10, 100)
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def make_frame(rows: int, width: int, seed: int = 0) -> pd.DataFrame:
+    """Build a reproducible dataset with numeric, text, category and date columns, missing values and outliers.
+
+    Half of the columns are floats, the rest are split between integers, text and categories;
+    two date-like columns (a datetime and a YYYYMMDD integer) are always added.
+    """
+    rng = np.random.default_rng(seed)
+    floats = max(1, width // 2)
+    others = max(3, width - floats - 2)
+    data = {}
+    for index in range(floats):
+        values = rng.normal(100, 15, rows)
+        values[rng.random(rows) < 0.05] = np.nan
+        values[rng.random(rows) < 0.001] = 10_000
+        data[f"Float Value {index}"] = values
+    words = np.array([" alpha ", "beta!", "gamma#2", "delta  ", "Epsilon", "zeta?"], dtype=object)
+    for index in range(others):
+        kind = index % 3
+        if kind == 0:
+            data[f"Int Value {index}"] = rng.integers(0, 1_000, rows)
+        elif kind == 1:
+            values = words[rng.integers(0, len(words), rows)]
+            values[rng.random(rows) < 0.05] = None
+            data[f"Text {index}"] = values
+        else:
+            data[f"Category {index}"] = pd.Categorical(rng.choice(["north", "south", "east", "west"], rows))
+    data["Purchase Date"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1_500 * 24 * 60, rows), unit="min")
+    data["Date Key"] = rng.integers(20_200_101, 20_231_228, rows)
+    return pd.DataFrame(data)
+
+
+def _columns(frame: pd.DataFrame, prefix: str) -> list:
+    return [column for column in frame.columns if column.startswith(prefix)]
+
+
+def _figure(function):
+    """Wrap a plotting function so its figures are closed and don't pile up across runs."""
+    def run(frame):
+        import matplotlib.pyplot as plt
+
+        result = function(frame)
+        plt.close("all")
+        return result
+    return run
+
+
+def _chunked_outliers(frame: pd.DataFrame):
+    columns = _columns(frame, "Float")
+    chunks = lambda: (frame.iloc[start:start + 100_000] for start in range(0, len(frame), 100_000))
+    for _ in prepare_data.detech_outliers_in_chunks(chunks, method="iqr", columns=columns):
+        pass
+
+
+def _export(frame: pd.DataFrame):
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_data.export_data(frame, os.path.join(directory, "export.csv"))
+
+
+def _reconcile(frame: pd.DataFrame):
+    """Combine four shards of the dataset, every other one with lower case column names."""
+    size = -(-len(frame) // 4)
+    shards = [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+    shards = [shard.rename(columns=str.lower) if position % 2 else shard for position, shard in enumerate(shards)]
+    ingest.reconcile_frames(shards)
+
+
+_fitted = {}
+
+
+def _fitted_transformer(transformer, frame: pd.DataFrame):
+    """Fit a transformer once per dataset size, so the fitted cases only time applying it."""
+    key = (repr(transformer), frame.shape)
+    if key not in _fitted:
+        _fitted[key] = transformer.fit(frame)
+    return _fitted[key]
+
+
+# case name -> function of a fresh copy of the dataset
+CASES = {
+    "prepare_data.get_data_overview": prepare_data.get_data_overview,
+    "prepare_data.handle_missing_values[drop]": lambda frame: prepare_data.handle_missing_values(frame, "drop"),
+    "prepare_data.handle_missing_values[mean]": lambda frame: prepare_data.handle_missing_values(frame, "mean"),
+    "prepare_data.handle_missing_values[median]": lambda frame: prepare_data.handle_missing_values(frame, "median"),
+    "prepare_data.handle_missing_values[fitted]": lambda frame: prepare_data.handle_missing_values(
+        frame, "mean", imputer=_fitted_transformer(transformers.StreamingImputer("mean"), frame)),
+    "prepare_data.convert_data_types": lambda frame: prepare_data.convert_data_types(
+        frame, {column: "float32" for column in _columns(frame, "Int")}),
+    "prepare_data.detech_outliers[iqr]": lambda frame: prepare_data.detech_outliers(frame, "iqr"),
+    "prepare_data.detech_outliers[iqr-sketch]": lambda frame: prepare_data.detech_outliers(frame, "iqr", quantile_method="sketch"),
+    "prepare_data.detech_outliers[zscore]": lambda frame: prepare_data.detech_outliers(frame, "zscore", threshold=3),
+    "prepare_data.detech_outliers_in_chunks[iqr]": _chunked_outliers,
+    "prepare_data.clean_text_data": lambda frame: prepare_data.clean_text_data(frame, _columns(frame, "Text")),
+    "prepare_data.remove_duplicates": prepare_data.remove_duplicates,
+    "prepare_data.scale_data[standarize]": lambda frame: prepare_data.scale_data(frame, _columns(frame, "Float"), "standarize"),
+    "prepare_data.scale_data[normalize]": lambda frame: prepare_data.scale_data(frame, _columns(frame, "Float"), "normalize"),
+    "prepare_data.scale_data[fitted]": lambda frame: prepare_data.scale_data(frame, _columns(frame, "Float"), scaler=_fitted_transformer(
+        transformers.StreamingScaler("standarize", _columns(frame, "Float")), frame)),
+    "prepare_data.standardize_column_names": prepare_data.standardize_column_names,
+    "prepare_data.manipulate_columns": lambda frame: prepare_data.manipulate_columns(frame, {
+        "rename": {"Date Key": "date_key"},
+        "add": {"ratio": "`Float Value 0` / (`Int Value 0` + 1)",
+                "band": lambda row: "high" if row["Float Value 0"] > 100 else "low"},
+    }),
+    "prepare_data.filter_rows": lambda frame: prepare_data.filter_rows(frame, {_columns(frame, "Category")[0]: ["north", "east"]}),
+    "prepare_data.drop_columns": lambda frame: prepare_data.drop_columns(frame, _columns(frame, "Text")),
+    "prepare_data.export_data": _export,
+    "ingest.reconcile_frames": _reconcile,
+    "eda.generate_summary_statistics": eda.generate_summary_statistics,
+    "eda.generate_object_summary_statistics": eda.generate_object_summary_statistics,
+    "eda.plot_sales_trends": _figure(lambda frame: eda.plot_sales_trends(frame, "Purchase Date", "Float Value 0")),
+    "eda.plot_correlation_matrix": _figure(eda.plot_correlation_matrix),
+    "visualization.plot_metrics_by_category": _figure(lambda frame: visualization.plot_metrics_by_category(
+        frame, _columns(frame, "Category")[0], "Float Value 0")),
+    "visualization.plot_distribution": _figure(lambda frame: visualization.plot_distribution(
+        frame, _columns(frame, "Category")[0], "Float Value 0")),
+    "data_processing.preprocess_data": data_processing.preprocess_data,
+    "data_processing.convert_int_to_datetime": lambda frame: data_processing.convert_int_to_datetime(frame, ["Date Key"]),
+    # samples every column: integers are checked for YYYYMMDD dates and epoch times, text is parsed as dates
+    "data_processing.detect_datetime_columns": data_processing.detect_datetime_columns,
+}
+
+
+def clear_caches():
+    """Drop memoized results so every run does the full work."""
+    from quickvu import stats
+
+    stats._summary_cache.clear()
+
+
+def run_case(function, frame: pd.DataFrame, repeat: int) -> dict:
+    """Time a case on fresh copies of the data, then measure its peak memory in one traced run."""
+    timings = []
+    for _ in range(repeat):
+        data = frame.copy()
+        clear_caches()
+        started = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - started)
+
+    data = frame.copy()
+    clear_caches()
+    tracemalloc.start()
+    try:
+        function(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(timings), "min_seconds": min(timings), "peak_mb": peak / 1024 ** 2}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(rows: list, widths: list, cases: list, repeat: int, max_seconds: float) -> list:
+    """Run every case at every size, skipping larger sizes of a case once it gets slower than `max_seconds`."""
+    results = []
+    too_slow = set()
+    # one small run first, so lazy imports (scipy, sklearn, matplotlib) aren't timed as part of a case
+    warm_up = make_frame(100, min(widths))
+    for name in cases:
+        try:
+            CASES[name](warm_up.copy())
+        except Exception:
+            pass
+    for width in widths:
+        for row_count in rows:
+            frame = make_frame(row_count, width)
+            for name in cases:
+                result = {"case": name, "rows": row_count, "columns": frame.shape[1]}
+                if (name, width) in too_slow:
+                    result["status"] = "skipped"
+                else:
+                    try:
+                        result.update(run_case(CASES[name], frame, repeat), status="ok")
+                    except Exception as error:
+                        result.update(status="error", error=f"{type(error).__name__}: {error}")
+                    if result.get("seconds", 0) > max_seconds:
+                        too_slow.add((name, width))
+                results.append(result)
+                _print_result(result)
+    return results
+
+
+def _print_result(result: dict):
+    if result["status"] == "ok":
+        detail = f"{result['seconds'] * 1000:10.1f} ms {result['peak_mb']:9.1f} MB"
+    else:
+        detail = f"{result['status']:>13} {result.get('error', '')[:60]}"
+    print(f"{result['case']:<48} {result['rows']:>10,} x {result['columns']:<4} {detail}", flush=True)
+
+
+def compare(results: list, baseline: dict, tolerance: float, min_seconds: float) -> list:
+    """Return the cases that got slower than the baseline by more than `tolerance` (a fraction)."""
+    previous = {(entry["case"], entry["rows"], entry["columns"]): entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["case"], result["rows"], result["columns"]))
+        if result["status"] != "ok" or before is None or before.get("status") != "ok":
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        # tiny timings are noise, so an absolute difference is required as well
+        if ratio > 1 + tolerance and result["seconds"] - before["seconds"] > min_seconds:
+            regressions.append({**result, "baseline_seconds": before["seconds"], "ratio": ratio})
+    return regressions
+
+
+def _sizes(text: str) -> list:
+    return [int(float(value)) for value in text.split(",") if value]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=_sizes, default=list(DEFAULT_ROWS), help="comma-separated row counts, e.g. 1e3,1e5")
+    parser.add_argument("--widths", type=_sizes, default=list(DEFAULT_WIDTHS), help="comma-separated column counts")
+    parser.add_argument("--quick", action="store_true", help=f"only run {', '.join(map(str, QUICK_ROWS))} rows")
+    parser.add_argument("--cases", default="", help="only run cases whose name contains one of these comma-separated words")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the median is reported")
+    parser.add_argument("--max-seconds", type=float, default=60.0,
+                        help="skip larger sizes of a case once a run takes longer than this")
+    parser.add_argument("--output", help="where to write the results, defaults to benchmarks/results/<timestamp>.json")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE,
+                        help=f"results file to compare against, {BASELINE} when no file is given")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    if args.baseline and not os.path.exists(args.baseline):
+        # checked before the benchmarks run, which can take a while
+        parser.error(f"baseline {args.baseline} not found. No baseline is committed, as timings depend on the machine: "
+                     f"create one with --save-baseline on this machine first.")
+
+    # deprecation and chained-assignment warnings from the functions under test would drown the report
+    warnings.filterwarnings("ignore")
+    rows = list(QUICK_ROWS) if args.quick else args.rows
+    words = [word for word in args.cases.split(",") if word]
+    cases = [name for name in CASES if not words or any(word in name for word in words)]
+
+    report = {"environment": environment(), "results": run(rows, args.widths, cases, args.repeat, args.max_seconds)}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    for path in [output] + ([BASELINE] if args.save_baseline else []):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        measured = {(entry["case"], entry["rows"], entry["columns"]) for entry in baseline["results"]}
+        if not any((result["case"], result["rows"], result["columns"]) in measured for result in report["results"]):
+            print(f"No case of this run is in the baseline {args.baseline}; "
+                  f"run with the same --rows, --widths and --cases as when it was saved.")
+            return 1
+        regressions = compare(report["results"], baseline, args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"SLOWER {regression['case']} {regression['rows']:,} x {regression['columns']}: "
+                  f"{regression['baseline_seconds'] * 1000:.1f} ms -> {regression['seconds'] * 1000:.1f} ms "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
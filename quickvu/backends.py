@@ -0,0 +1,660 @@
+import atexit
+import datetime
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from . import prepare_data, stats
+from .cache import hash_bytes
+from .config import Config
+from .pipeline import Pipeline, Step
+
+_NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                  'UINTEGER', 'UBIGINT', 'UHUGEINT', 'FLOAT', 'DOUBLE', 'DECIMAL')
+
+# target types of `convert_data_types`, as SQL types
+_SQL_TYPES = {
+    'int': 'BIGINT', 'int64': 'BIGINT', 'int32': 'INTEGER', 'int16': 'SMALLINT', 'int8': 'TINYINT',
+    'float': 'DOUBLE', 'float64': 'DOUBLE', 'float32': 'FLOAT',
+    'str': 'VARCHAR', 'string': 'VARCHAR', 'object': 'VARCHAR', 'category': 'VARCHAR',
+    'bool': 'BOOLEAN', 'datetime': 'TIMESTAMP',
+}
+
+# readers for the file types the DuckDB backend can scan without loading them
+_READERS = {'csv': 'read_csv_auto', 'parquet': 'read_parquet', 'json': 'read_json_auto'}
+
+
+class PandasBackend:
+    """Runs cleaning pipelines on in-memory pandas DataFrames. This is the default backend.
+
+    A table is simply the DataFrame.
+    """
+
+    name = 'pandas'
+
+    def scan(self, uploaded_file):
+        """Load an upload through `loader.load_dataset`, which caches the parsed frame.
+
+        :param uploaded_file: A Streamlit `UploadedFile` or any binary file object with a `name`,
+            or a list of them whose rows are combined.
+
+        :return: The dataset and its ingestion report.
+        :rtype: tuple[pd.DataFrame, dict]
+        """
+        # imported here, loader pulls in the ingestion code only the pandas backend needs
+        from . import loader
+
+        return loader.load_dataset(uploaded_file, with_report=True)
+
+    def run(
+            self,
+            pipeline: Pipeline,
+            table: pd.DataFrame,
+            checkpoints=None,
+            input_key: str = None,
+            on_step=None
+        ) -> pd.DataFrame:
+        """Apply a pipeline with `Pipeline.run`, see there for `checkpoints`, `input_key` and `on_step`."""
+        return pipeline.run(table, checkpoints=checkpoints, input_key=input_key, on_step=on_step)
+
+    def head(self, table: pd.DataFrame, n: int = 10) -> pd.DataFrame:
+        return table.head(n)
+
+    def columns(self, table: pd.DataFrame) -> list:
+        return table.columns.tolist()
+
+    def numeric_columns(self, table: pd.DataFrame) -> list:
+        return table.select_dtypes(include=[np.number]).columns.tolist()
+
+    def unique_values(self, table: pd.DataFrame, column: str) -> list:
+        return table[column].unique().tolist()
+
+    def summarize(self, table: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Return the numeric and text summaries of `stats.summarize`."""
+        return stats.summarize(table)
+
+    def fit(self, transformer, table: pd.DataFrame):
+        """Fit a `transformers` scaler or imputer on the table."""
+        return transformer.fit(table if transformer.columns is None else table[transformer.columns])
+
+    def export(self, table: pd.DataFrame, file_format: str = 'csv') -> bytes:
+        """Return the table as CSV or Parquet bytes."""
+        if file_format == 'csv':
+            return table.to_csv(index=False).encode('utf-8')
+        elif file_format == 'parquet':
+            return table.to_parquet(index=False)
+        raise ValueError("Invalid export format. Choose 'csv' or 'parquet'.")
+
+    def close(self):
+        """Nothing to release, tables are plain DataFrames."""
+
+
+def _quote(name) -> str:
+    """Quote a column name as an SQL identifier."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value) -> str:
+    """Write a Python value as an SQL literal."""
+    if value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+        return 'NULL'
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return f"'{float(value)!r}'::DOUBLE"
+    if isinstance(value, (datetime.datetime, np.datetime64)):
+        return f"TIMESTAMP '{pd.Timestamp(value).isoformat()}'"
+    if isinstance(value, datetime.date):
+        return f"DATE '{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DuckDBBackend:
+    """Runs cleaning pipelines out of core with DuckDB, for datasets bigger than memory.
+
+    A table is an SQL query over files on disk. Pipeline steps are compiled to SQL and only
+    executed when a result is read or exported, so DuckDB streams the data and spills
+    sorts and aggregations to `temp_directory` within `memory_limit`. Steps that need
+    column statistics (mean and median imputation, outlier bounds, scaling) first run one
+    aggregate query and use the results as literals, like the two passes of
+    `prepare_data.detech_outliers_in_chunks`. New columns from `manipulate_columns` are
+    computed with pandas, one record batch at a time.
+
+    Results match the pandas backend, except that SQL regular expressions only treat
+    ASCII whitespace as whitespace in `clean_text_data`.
+
+    Uploads and intermediate results are files in `temp_directory`. Files nobody has used
+    for `expire_after` seconds are deleted by `sweep`, which runs on every `scan` and `run`;
+    `close` deletes the rest.
+
+    `duckdb` is an optional dependency and is only imported when the backend is first used.
+    """
+
+    name = 'duckdb'
+
+    def __init__(
+            self,
+            memory_limit: str = Config.DUCKDB_MEMORY_LIMIT,
+            temp_directory: str = None,
+            batch_rows: int = Config.CONVERTER_BATCH_ROWS,
+            expire_after: float = Config.DUCKDB_FILE_EXPIRE_AFTER_SECONDS
+        ):
+        """
+        :param memory_limit: Memory DuckDB may use before spilling, e.g. `2GB`.
+        :type memory_limit: str, optional
+        :param temp_directory: Directory for spilled data, uploads and intermediate files.
+            A temporary directory is created when None, and removed by `close`.
+        :type temp_directory: str, optional
+        :param batch_rows: Rows per record batch when results are computed with pandas.
+        :type batch_rows: int, optional
+        :param expire_after: Seconds after its last use when an upload or intermediate file is deleted.
+        :type expire_after: float, optional
+        """
+        self.memory_limit = memory_limit
+        self._owns_directory = temp_directory is None
+        self.temp_directory = temp_directory or tempfile.mkdtemp(prefix='quickvu-duckdb-')
+        self.batch_rows = batch_rows
+        self.expire_after = expire_after
+        self._connection = None
+        self._files = set()
+        self._lock = threading.Lock()
+
+    def cursor(self):
+        """Return a cursor on the shared database; each thread should use its own."""
+        with self._lock:
+            if self._connection is None:
+                try:
+                    import duckdb
+                except ImportError as error:
+                    raise ImportError("The duckdb backend needs the duckdb package: pip install duckdb") from error
+                os.makedirs(self.temp_directory, exist_ok=True)
+                self._connection = duckdb.connect(config={
+                    'memory_limit': self.memory_limit,
+                    'temp_directory': self.temp_directory,
+                    'preserve_insertion_order': True,
+                })
+            return self._connection.cursor()
+
+    def _temp_path(self, name: str) -> str:
+        """Return the path of an upload or intermediate file, deleted by `sweep` and `close`."""
+        os.makedirs(self.temp_directory, exist_ok=True)
+        path = os.path.join(self.temp_directory, name)
+        with self._lock:
+            self._files.add(path)
+        return path
+
+    @staticmethod
+    def _delete(path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def sweep(self, now: float = None):
+        """Delete uploads and intermediate files that have not been used for `expire_after` seconds.
+
+        Tables still reading a deleted file fail, so `expire_after` should outlast the sessions
+        holding them, see `Config.DUCKDB_FILE_EXPIRE_AFTER_SECONDS`.
+
+        :param now: Current `time.time()` value, mostly useful for tests.
+        :type now: float, optional
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for path in list(self._files):
+                try:
+                    expired = now - os.path.getmtime(path) >= self.expire_after
+                except FileNotFoundError:
+                    self._files.discard(path)
+                    continue
+                if expired:
+                    self._delete(path)
+                    self._files.discard(path)
+
+    def close(self):
+        """Close the database and delete every upload and intermediate file of the backend."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            for path in self._files:
+                self._delete(path)
+            self._files.clear()
+            if self._owns_directory:
+                shutil.rmtree(self.temp_directory, ignore_errors=True)
+
+    def _spill(self, name: str, data: bytes, file_type: str) -> str:
+        """Write upload bytes to `temp_directory` under a name derived from their content."""
+        path = self._temp_path(f"upload-{hash_bytes(data)}.{file_type}")
+        if os.path.exists(path):
+            # used again, so `sweep` keeps it
+            os.utime(path)
+        else:
+            temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temporary, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, path)
+        return path
+
+    @staticmethod
+    def _file_type(name: str, file_type: str = None) -> str:
+        file_type = file_type or os.path.splitext(name)[1].lstrip('.').lower()
+        if file_type not in _READERS:
+            raise ValueError(f"Unsupported file type for the duckdb backend: {name}. Use a CSV, Parquet or JSON file.")
+        return file_type
+
+    def scan(self, source, file_type: str = None) -> tuple[str, dict]:
+        """Return a table reading a file in place.
+
+        Uploads (file objects) are first written to `temp_directory`, under a name derived
+        from their content, so reruns with the same upload reuse the file.
+
+        Several files, or zip archives of them, are shards of one table: their columns are
+        matched with `ingest.match_columns` and the shards combined with `UNION ALL BY NAME`,
+        which widens differing column types and leaves the columns a shard lacks missing.
+        DuckDB reads the shards in parallel.
+
+        :param source: Path of a CSV, Parquet or JSON file, or a binary file object with a `name`,
+            or a list of them.
+        :param file_type: `csv`, `parquet` or `json`, taken from the file name when None.
+        :type file_type: str, optional
+
+        :return: The table and a report with the file path and its size.
+        :rtype: tuple[str, dict]
+        """
+        self.sweep()
+        sources = list(source) if isinstance(source, (list, tuple)) else [source]
+        names = [item if isinstance(item, str) else item.name for item in sources]
+        if len(sources) == 1 and not names[0].lower().endswith('.zip'):
+            file_type = self._file_type(names[0], file_type)
+            source = path = sources[0]
+            if not isinstance(source, str):
+                path = self._spill(source.name, source.getvalue() if hasattr(source, 'getvalue') else source.read(), file_type)
+            report = {"path": path, "file_bytes": os.path.getsize(path), "content_hash": os.path.basename(path)}
+            return f"SELECT * FROM {_READERS[file_type]}({_literal(path)})", report
+
+        # imported here, like the pandas backend's loader
+        from .ingest import match_columns
+        from .loader import expand_archives
+
+        shards = []
+        for name, item in zip(names, sources):
+            if isinstance(item, str) and not name.lower().endswith('.zip'):
+                shards.append((name, self._file_type(name, file_type), item))
+                continue
+            if isinstance(item, str):
+                with open(item, 'rb') as file:
+                    data = file.read()
+            else:
+                data = item.getvalue() if hasattr(item, 'getvalue') else item.read()
+            for member, member_data in expand_archives([(name, data)]):
+                member_type = self._file_type(member, None if member != name else file_type)
+                shards.append((member, member_type, self._spill(member, member_data, member_type)))
+
+        cursor = self.cursor()
+        reads = [f"{_READERS[shard_type]}({_literal(path)})" for _, shard_type, path in shards]
+        columns, mappings = match_columns([cursor.sql(f"SELECT * FROM {read}").columns for read in reads])
+        selects = [f"SELECT {', '.join(f'{_quote(original)} AS {_quote(column)}' for original, column in mapping.items())} FROM {read}"
+                   for read, mapping in zip(reads, mappings)]
+        paths = [path for _, _, path in shards]
+        report = {
+            "path": paths[0],
+            "paths": paths,
+            "file_bytes": sum(os.path.getsize(path) for path in paths),
+            "content_hash": hash_bytes('\n'.join(os.path.basename(path) for path in paths).encode()),
+        }
+        return f"SELECT {', '.join(_quote(column) for column in columns)} FROM ({' UNION ALL BY NAME '.join(selects)})", report
+
+    def _schema(self, cursor, table: str) -> dict:
+        relation = cursor.sql(table)
+        return dict(zip(relation.columns, (str(dtype) for dtype in relation.types)))
+
+    @staticmethod
+    def _is_numeric(sql_type: str) -> bool:
+        return sql_type.split('(')[0] in _NUMERIC_TYPES
+
+    @staticmethod
+    def _value(column: str, sql_type: str) -> str:
+        """Expression of a column's value with NaN read as missing, like pandas does."""
+        if sql_type in ('FLOAT', 'DOUBLE'):
+            return f"nullif({_quote(column)}, 'NaN'::DOUBLE)"
+        return _quote(column)
+
+    def _aggregate(self, cursor, table: str, expressions: dict) -> dict:
+        """Run one aggregate query over the table and return its values by name."""
+        if not expressions:
+            return {}
+        select = ', '.join(f"{expression} AS {_quote(name)}" for name, expression in expressions.items())
+        row = cursor.sql(f"SELECT {select} FROM ({table})").fetchone()
+        return dict(zip(expressions, row))
+
+    @staticmethod
+    def _with_columns(table: str, schema: dict, columns: dict) -> str:
+        """Replace or append columns, keeping the column order of pandas assignments."""
+        replaced = [f"{expression} AS {_quote(column)}" for column, expression in columns.items() if column in schema]
+        added = [f"{expression} AS {_quote(column)}" for column, expression in columns.items() if column not in schema]
+        select = '*' + (f" REPLACE ({', '.join(replaced)})" if replaced else '')
+        return f"SELECT {', '.join([select] + added)} FROM ({table})"
+
+    def _handle_missing_values(self, cursor, table, schema, method='drop', imputer=None, **_):
+        if method == 'drop':
+            conditions = ' AND '.join(f"{self._value(column, sql_type)} IS NOT NULL" for column, sql_type in schema.items())
+            return f"SELECT * FROM ({table}) WHERE {conditions}"
+        elif method not in ('mean', 'median'):
+            raise ValueError("Invalid method for handling missing values. Choose 'drop', 'mean', or 'median'.")
+        if imputer is not None:
+            # fitted statistics, no pass over the table
+            return self._with_columns(table, schema, {
+                column: f"coalesce({self._value(column, schema[column])}, {_literal(value)})"
+                for column, value in imputer.statistics_.items() if column in schema and value is not None})
+
+        missing = self._aggregate(cursor, table, {
+            column: f"count(*) - count({self._value(column, sql_type)})" for column, sql_type in schema.items()})
+        numeric = {column: sql_type for column, sql_type in schema.items() if missing[column] and self._is_numeric(sql_type)}
+        statistics = self._aggregate(cursor, table, {
+            column: f"{'avg' if method == 'mean' else 'median'}({self._value(column, sql_type)})"
+            for column, sql_type in numeric.items()})
+        for column, sql_type in schema.items():
+            if missing[column] and column not in numeric:
+                # the mode, smallest value first on ties like `Series.mode`
+                mode = cursor.sql(
+                    f"SELECT {_quote(column)} FROM ({table}) WHERE {_quote(column)} IS NOT NULL "
+                    f"GROUP BY ALL ORDER BY count(*) DESC, 1 LIMIT 1").fetchone()
+                if mode is not None:
+                    statistics[column] = mode[0]
+        return self._with_columns(table, schema, {
+            column: f"coalesce({self._value(column, schema[column])}, {_literal(value)})"
+            for column, value in statistics.items()})
+
+    def _detech_outliers(self, cursor, table, schema, method='iqr', threshold=1.5, columns=None,
+                         quantile_method='exact', **_):
+        if method not in ('iqr', 'zscore'):
+            raise ValueError("Invalid method for detecting outliers. Choose 'iqr' or 'zscore'.")
+        if columns is None:
+            columns = [column for column, sql_type in schema.items() if self._is_numeric(sql_type)]
+
+        flags = {}
+        if method == 'iqr':
+            quantile = 'quantile_cont' if quantile_method == 'exact' else 'approx_quantile'
+            bounds = self._aggregate(cursor, table, {
+                column: f"{quantile}({self._value(column, schema[column])}, [0.25, 0.75])" for column in columns})
+            for column in columns:
+                value = self._value(column, schema[column])
+                q1, q3 = bounds[column] or (None, None)
+                if q1 is None:
+                    flags[f"{column}_outliers"] = 'FALSE'
+                    continue
+                iqr = float(q3) - float(q1)
+                flags[f"{column}_outliers"] = (f"coalesce({value} < {_literal(float(q1) - threshold * iqr)} "
+                                               f"OR {value} > {_literal(float(q3) + threshold * iqr)}, FALSE)")
+        else:
+            moments = self._aggregate(cursor, table, {
+                name.format(column): expression.format(self._value(column, schema[column]))
+                for column in columns
+                for name, expression in (('{}|mean', 'avg({})'), ('{}|std', 'stddev_pop({})'),
+                                         ('{}|missing', 'count(*) - count({})'))})
+            for column in columns:
+                mean, std = moments[f"{column}|mean"], moments[f"{column}|std"]
+                if moments[f"{column}|missing"] or not std:
+                    # scipy's zscore gives NaN for a column with missing values or no variance, which never flags
+                    flags[f"{column}_outliers"] = 'FALSE'
+                    continue
+                value = self._value(column, schema[column])
+                flags[f"{column}_outliers"] = f"abs(({value} - {_literal(mean)}) / {_literal(std)}) > {_literal(threshold)}"
+        return self._with_columns(table, schema, flags)
+
+    def _clean_text_data(self, cursor, table, schema, text_columns, **_):
+        # read_csv_auto types date-like text as DATE or TIMESTAMP, which pandas keeps as text
+        return self._with_columns(table, schema, {
+            column: f"regexp_replace(regexp_replace(CAST({_quote(column)} AS VARCHAR), '^\\s+|\\s+$', '', 'g'), '[^a-zA-Z0-9\\s]', '', 'g')"
+            for column in text_columns})
+
+    def _remove_duplicates(self, cursor, table, schema, **_):
+        # keep the first of each group of identical rows, in the original order, like `drop_duplicates`
+        partition = ', '.join(_quote(column) for column in schema)
+        return (f"SELECT * EXCLUDE (__quickvu_row) FROM (SELECT *, row_number() OVER () AS __quickvu_row FROM ({table})) "
+                f"QUALIFY row_number() OVER (PARTITION BY {partition} ORDER BY __quickvu_row) = 1 ORDER BY __quickvu_row")
+
+    def _scale_data(self, cursor, table, schema, numerical_columns, method='standarize', scaler=None, **_):
+        if scaler is not None:
+            # fitted statistics, no pass over the table
+            statistics = dict(zip(scaler.columns_, zip(scaler.center_, scaler.scale_)))
+            scaled = {}
+            for column in numerical_columns:
+                if column in statistics:
+                    center, scale = statistics[column]
+                    scaled[column] = f"({self._value(column, schema[column])}::DOUBLE - {_literal(center)}) / {_literal(scale)}"
+            return self._with_columns(table, schema, scaled)
+        if method not in ('standarize', 'normalize'):
+            raise ValueError("Invalid method for scaling data. Choose 'standarize' or 'minmax'.")
+        first, second = ('avg', 'stddev_pop') if method == 'standarize' else ('min', 'max')
+        statistics = self._aggregate(cursor, table, {
+            f"{column}|{function}": f"{function}({self._value(column, schema[column])})"
+            for column in numerical_columns for function in (first, second)})
+        scaled = {}
+        for column in numerical_columns:
+            center = statistics[f"{column}|{first}"]
+            scale = statistics[f"{column}|{second}"]
+            if method == 'normalize' and scale is not None:
+                scale = scale - center
+            # a constant column is scaled by 1, like scikit-learn does
+            scale = float(scale) if scale else 1.0
+            scaled[column] = f"({self._value(column, schema[column])}::DOUBLE - {_literal(center)}) / {_literal(scale)}"
+        return self._with_columns(table, schema, scaled)
+
+    def _convert_data_types(self, cursor, table, schema, column_types, **_):
+        for column, dtype in column_types.items():
+            if dtype not in _SQL_TYPES:
+                raise ValueError(f"Unsupported data type '{dtype}' for the duckdb backend. Choose one of {', '.join(_SQL_TYPES)}.")
+        # astype raises on missing and infinite values instead of giving NULL integers
+        integers = [column for column, dtype in column_types.items() if _SQL_TYPES[dtype] in ('BIGINT', 'INTEGER', 'SMALLINT', 'TINYINT')]
+        non_finite = self._aggregate(cursor, table, {
+            column: (f"count(*) - count(CASE WHEN NOT isinf({_quote(column)}) THEN {self._value(column, schema[column])} END)"
+                     if schema[column] in ('FLOAT', 'DOUBLE') else f"count(*) - count({_quote(column)})")
+            for column in integers})
+        for column, count in non_finite.items():
+            if count:
+                raise pd.errors.IntCastingNaNError(
+                    f"Cannot convert non-finite values (NA or inf) to integer in column '{column}'.")
+
+        converted = {}
+        for column, dtype in column_types.items():
+            value = _quote(column)
+            if dtype == 'datetime':
+                converted[column] = f"TRY_CAST({value} AS TIMESTAMP)"
+            elif _SQL_TYPES[dtype] in ('BIGINT', 'INTEGER', 'SMALLINT', 'TINYINT') and self._is_numeric(schema[column]):
+                # astype truncates floats towards zero where a cast would round
+                converted[column] = f"CAST(trunc({value}) AS {_SQL_TYPES[dtype]})"
+            else:
+                converted[column] = f"CAST({value} AS {_SQL_TYPES[dtype]})"
+        return self._with_columns(table, schema, converted)
+
+    def _standardize_column_names(self, cursor, table, schema, **_):
+        names = prepare_data.standardize_column_names(pd.DataFrame(columns=list(schema))).columns
+        return f"SELECT {', '.join(f'{_quote(old)} AS {_quote(new)}' for old, new in zip(schema, names))} FROM ({table})"
+
+    def _manipulate_columns(self, cursor, table, schema, column_operations, **_):
+        renames = column_operations.get('rename', {})
+        if renames:
+            table = f"SELECT {', '.join(f'{_quote(column)} AS {_quote(renames.get(column, column))}' for column in schema)} FROM ({table})"
+        if column_operations.get('add'):
+            # arbitrary expressions and lambdas have no SQL translation, so they run on pandas batch by batch
+            table = self._map_batches(cursor, table, lambda frame: prepare_data.manipulate_columns(
+                frame, {'add': column_operations['add']}))
+        return table
+
+    def _filter_rows(self, cursor, table, schema, filter_conditions, **_):
+        conditions = []
+        for column, value in filter_conditions.items():
+            if isinstance(value, (list, tuple, set)):
+                values = [_literal(item) for item in value]
+                conditions.append(f"{_quote(column)} IN ({', '.join(values)})" if values else 'FALSE')
+            else:
+                conditions.append(f"{_quote(column)} = {_literal(value)}")
+        return f"SELECT * FROM ({table}) WHERE {' AND '.join(conditions)}"
+
+    def _drop_columns(self, cursor, table, schema, columns, **_):
+        return f"SELECT * EXCLUDE ({', '.join(_quote(column) for column in columns)}) FROM ({table})"
+
+    def _map_batches(self, cursor, table: str, func) -> str:
+        """Apply a pandas function to every record batch and return a table over the written results.
+
+        Each batch is written to a Parquet file of its own. When the batches come out with
+        different types, the columns are widened with `ingest.widen_dtypes`, like shards are
+        combined, and the files rewritten with the widened types; columns widened to `object`
+        become text, as a Parquet column holds a single type.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # imported here, like the pandas backend's loader
+        from .ingest import widen_dtypes
+
+        directory = self._temp_path(f"step-{uuid.uuid4().hex}")
+        os.makedirs(directory)
+        parts, dtypes = [], {}
+        for batch in cursor.sql(table).fetch_record_batch(self.batch_rows):
+            result = func(batch.to_pandas())
+            if result.empty:
+                continue
+            for column, dtype in result.dtypes.items():
+                dtypes.setdefault(column, []).append(dtype)
+            parts.append(os.path.join(directory, f"part-{len(parts):06d}.parquet"))
+            pq.write_table(pa.Table.from_pandas(result, preserve_index=False), parts[-1])
+        if not parts:
+            # no rows: run the function on the empty frame for the output columns
+            empty = func(cursor.sql(f"SELECT * FROM ({table}) LIMIT 0").df())
+            pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), os.path.join(directory, 'part-000000.parquet'))
+        elif any(any(dtype != column_dtypes[0] for dtype in column_dtypes) for column_dtypes in dtypes.values()):
+            schema = pq.read_schema(parts[0]).remove_metadata()
+            for column, column_dtypes in dtypes.items():
+                widened = widen_dtypes(column_dtypes)
+                if widened == 'category':
+                    field_type = pa.dictionary(pa.int32(), pa.string())
+                elif widened == np.dtype(object):
+                    field_type = pa.string()
+                else:
+                    field_type = pa.Schema.from_pandas(pd.DataFrame({column: pd.Series(dtype=widened)})).field(column).type
+                schema = schema.set(schema.get_field_index(column), pa.field(column, field_type))
+            for part in parts:
+                written = pq.read_table(part).replace_schema_metadata()
+                if written.schema != schema:
+                    pq.write_table(written.cast(schema), part)
+        return f"SELECT * FROM read_parquet({_literal(os.path.join(directory, '*.parquet'))})"
+
+    def run(self, pipeline: Pipeline, table: str, on_step=None, **_) -> str:
+        """Compile the optimized plan of a pipeline into a query over `table`.
+
+        Checkpoint arguments of `PandasBackend.run` are accepted and ignored; DuckDB reads
+        the source again instead of keeping per-step results in memory.
+
+        :param pipeline: The cleaning steps.
+        :type pipeline: Pipeline
+        :param table: Table returned by `scan` or an earlier `run`.
+        :type table: str
+        :param on_step: Called as `on_step(done, total, step)` before each step, see `Pipeline.run`.
+        :type on_step: callable, optional
+
+        :return: The cleaned table.
+        :rtype: str
+        """
+        self.sweep()
+        cursor = self.cursor()
+        plan = pipeline.optimize()
+        for position, step in enumerate(plan):
+            if on_step is not None:
+                on_step(position, len(plan), step)
+            table = self.apply(cursor, table, step)
+        return table
+
+    def apply(self, cursor, table: str, step: Step) -> str:
+        """Return the query for one cleaning step applied to `table`."""
+        return getattr(self, f"_{step.name}")(cursor, table, self._schema(cursor, table), **step.params)
+
+    def head(self, table: str, n: int = 10) -> pd.DataFrame:
+        return self.cursor().sql(f"SELECT * FROM ({table}) LIMIT {int(n)}").df()
+
+    def columns(self, table: str) -> list:
+        return self.cursor().sql(table).columns
+
+    def numeric_columns(self, table: str) -> list:
+        return [column for column, sql_type in self._schema(self.cursor(), table).items() if self._is_numeric(sql_type)]
+
+    def unique_values(self, table: str, column: str) -> list:
+        return [row[0] for row in self.cursor().sql(f"SELECT DISTINCT {_quote(column)} FROM ({table})").fetchall()]
+
+    def batches(self, table: str):
+        """Iterate over the table as DataFrames of at most `batch_rows` rows."""
+        for batch in self.cursor().sql(table).fetch_record_batch(self.batch_rows):
+            yield batch.to_pandas()
+
+    def summarize(self, table: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Return the numeric and text summaries of `stats.summarize`, streaming the table with sketched quartiles."""
+        accumulator = stats.summarize_chunks(self.batches(table), quantile_method='sketch')
+        return accumulator.numeric_summary(), accumulator.object_summary()
+
+    def fit(self, transformer, table: str):
+        """Fit a `transformers` scaler or imputer on the table, one record batch at a time."""
+        if transformer.columns is not None:
+            table = f"SELECT {', '.join(_quote(column) for column in transformer.columns)} FROM ({table})"
+        return transformer.fit(self.batches(table))
+
+    def export(self, table: str, file_format: str = 'csv', path: str = None):
+        """Write the table as CSV or Parquet.
+
+        :param table: The table to write.
+        :type table: str
+        :param file_format: `csv` or `parquet`.
+        :type file_format: str, optional
+        :param path: File to write. The bytes are returned instead when None.
+        :type path: str, optional
+
+        :return: The file contents when no `path` is given, else the path.
+        :rtype: bytes | str
+        """
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError("Invalid export format. Choose 'csv' or 'parquet'.")
+        target = path or self._temp_path(f"export-{uuid.uuid4().hex}.{file_format}")
+        options = "FORMAT CSV, HEADER" if file_format == 'csv' else "FORMAT PARQUET"
+        self.cursor().execute(f"COPY ({table}) TO {_literal(target)} ({options})")
+        if path is not None:
+            return path
+        try:
+            with open(target, 'rb') as file:
+                return file.read()
+        finally:
+            os.remove(target)
+
+
+BACKENDS = {'pandas': PandasBackend, 'duckdb': DuckDBBackend}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = None):
+    """Return the backend called `name`, `Config.PREP_BACKEND` by default, creating it on first use.
+
+    :param name: `pandas` or `duckdb`.
+    :type name: str, optional
+
+    :return: The shared backend instance.
+    """
+    name = name or Config.PREP_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown cleaning backend '{name}'. Choose one of {', '.join(BACKENDS)}.")
+            _backends[name] = BACKENDS[name]()
+            # uploads and intermediate files of the duckdb backend don't outlive the app
+            atexit.register(_backends[name].close)
+        return _backends[name]
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return a content hash for raw bytes, used as a cache key for uploads.
+
+    :param data: The raw bytes to hash.
+    :type data: bytes
+
+    :return: Hex digest of the content.
+    :rtype: str
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def fingerprint_frame(dataframe: pd.DataFrame) -> str:
+    """Return a content fingerprint for a DataFrame.
+
+    The fingerprint covers the column names, dtypes and every value (including the index),
+    so two frames with the same fingerprint hold the same data.
+
+    :param dataframe: The DataFrame to fingerprint.
+    :type dataframe: pd.DataFrame
+
+    :return: Hex digest of the frame contents.
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(zip(dataframe.columns, dataframe.dtypes.astype(str)))).encode())
+    digest.update(pd.util.hash_pandas_object(dataframe, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def frame_nbytes(dataframe: pd.DataFrame) -> int:
+    """Return the memory footprint of a DataFrame in bytes, including object contents.
+
+    :param dataframe: The DataFrame to measure.
+    :type dataframe: pd.DataFrame
+
+    :return: Size in bytes.
+    :rtype: int
+    """
+    return int(dataframe.memory_usage(deep=True).sum())
+
+
+class FrameCache:
+    """A thread-safe LRU cache for DataFrames bounded by total memory.
+
+    Entries are evicted least-recently-used first once the summed size of the cached
+    frames goes over ``max_bytes``. A single frame larger than the budget is not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None, marking it as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, nbytes: int = None):
+        """Cache ``value`` under ``key``, evicting old entries to stay within the budget.
+
+        :param key: The cache key.
+        :param value: The value to cache, usually a DataFrame.
+        :param nbytes: Size of the value in bytes. Measured with `frame_nbytes` when not given.
+        :type nbytes: int, optional
+        """
+        if nbytes is None:
+            nbytes = frame_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self._current_bytes += nbytes
+            while self._current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def info(self) -> dict:
+        """Return hit/miss counters and memory usage of the cache.
+
+        :return: Cache statistics.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+            }
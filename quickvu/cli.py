@@ -0,0 +1,183 @@
+"""Clean files without the browser, with a recipe saved from Quick Prep.
+
+Usage:
+    quickvu recipe.json data/drops/ --output-dir data/clean --format parquet
+    quickvu recipe.json a.csv b.csv --output-dir out --workers 8 --overwrite
+"""
+import argparse
+import concurrent.futures
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from . import file_converter
+from .config import Config
+from .pipeline import Pipeline, load_recipe
+
+
+def _input_files(paths: list, pattern: str) -> list:
+    """Expand directories to the files in them matching `pattern`, keeping the order given."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(file for file in glob.glob(os.path.join(path, pattern))
+                            if os.path.isfile(file) and file.rsplit('.', 1)[-1].lower() in file_converter.INPUT_FORMATS)
+        else:
+            files.append(path)
+    return files
+
+
+def clean_file(
+        recipe: dict,
+        source: str,
+        target: str,
+        target_type: str = 'csv',
+        compression: str = None,
+        batch_size: int = Config.CLI_BATCH_ROWS
+    ) -> dict:
+    """Apply a recipe to one file and write the result.
+
+    A recipe whose steps all treat rows on their own (see `Pipeline.streamable`) is applied
+    to one batch of rows at a time, so memory stays bounded by the batch size; otherwise the
+    file is loaded whole. The output is written next to `target` first and renamed when
+    complete, so an interrupted run never leaves a partial file under the final name.
+
+    :param recipe: The recipe, see `Pipeline.to_recipe`.
+    :type recipe: dict
+    :param source: Path of the input file.
+    :type source: str
+    :param target: Path of the output file.
+    :type target: str
+    :param target_type: Output format, one of `file_converter.OUTPUT_FORMATS`.
+    :type target_type: str, optional
+    :param compression: Output compression, see `file_converter.write_batches`.
+    :type compression: str, optional
+    :param batch_size: Rows per batch.
+    :type batch_size: int, optional
+
+    :return: `rows_in`, `rows_out`, `input_bytes`, `output_bytes`, `seconds` and whether the file was `streamed`.
+    :rtype: dict
+    """
+    started = time.perf_counter()
+    pipeline = Pipeline.from_recipe(recipe)
+    streamed = pipeline.streamable()
+    rows_in = 0
+
+    def cleaned_batches():
+        nonlocal rows_in
+        with open(source, 'rb') as f:
+            batches = file_converter.iter_batches(f, source.rsplit('.', 1)[-1], batch_size)
+            if not streamed:
+                frames = [batch.to_pandas() for batch in batches]
+                frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+                rows_in = len(frame)
+                cleaned = pipeline.run(frame)
+                yield from (pa.RecordBatch.from_pandas(cleaned.iloc[start:start + batch_size], preserve_index=False)
+                            for start in range(0, max(len(cleaned), 1), batch_size))
+                return
+            for batch in batches:
+                rows_in += batch.num_rows
+                yield pa.RecordBatch.from_pandas(pipeline.run(batch.to_pandas()), preserve_index=False)
+
+    partial = f"{target}.partial"
+    try:
+        with open(partial, 'wb') as sink:
+            _, report = file_converter.write_batches(cleaned_batches(), target_type, sink, compression)
+        os.replace(partial, target)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return {
+        "rows_in": rows_in,
+        "rows_out": report["rows"],
+        "input_bytes": os.path.getsize(source),
+        "output_bytes": os.path.getsize(target),
+        "seconds": time.perf_counter() - started,
+        "streamed": streamed,
+    }
+
+
+def _throughput(name: str, result: dict) -> str:
+    seconds = max(result["seconds"], 1e-9)
+    return (f"{name}: {result['rows_in']:,} -> {result['rows_out']:,} rows in {result['seconds']:.2f} s "
+            f"({result['rows_in'] / seconds:,.0f} rows/s, {result['input_bytes'] / seconds / 1024 ** 2:.1f} MB/s"
+            f"{'' if result['streamed'] else ', loaded whole'})")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='quickvu', description="Apply a Quick Prep cleaning recipe to many files.")
+    parser.add_argument('recipe', help="Recipe JSON file, downloaded from Quick Prep or written by Pipeline.save_recipe.")
+    parser.add_argument('inputs', nargs='+', help="Input files, or directories to take every matching file from.")
+    parser.add_argument('-o', '--output-dir', required=True, help="Directory for the cleaned files.")
+    parser.add_argument('-f', '--format', default='csv', choices=file_converter.OUTPUT_FORMATS, help="Output format.")
+    parser.add_argument('--compression', help="Output compression: gzip or bz2 for CSV and NDJSON, snappy, zstd or gzip for Parquet.")
+    parser.add_argument('--pattern', default='*', help="Glob pattern of the files taken from input directories.")
+    parser.add_argument('-w', '--workers', type=int, default=Config.CLI_MAX_WORKERS,
+                        help="Files cleaned at the same time, in separate processes. Defaults to the number of CPUs.")
+    parser.add_argument('--batch-rows', type=int, default=Config.CLI_BATCH_ROWS, help="Rows per batch when streaming a file.")
+    parser.add_argument('--overwrite', action='store_true', help="Clean files whose output already exists again.")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """Entry point of the `quickvu` command.
+
+    :return: Exit status, 1 when a file failed.
+    :rtype: int
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        pipeline = load_recipe(args.recipe)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading recipe {args.recipe}: {e}", file=sys.stderr)
+        return 2
+    recipe = pipeline.to_recipe()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = {}
+    for source in _input_files(args.inputs, args.pattern):
+        target = os.path.join(args.output_dir, file_converter.output_name(os.path.basename(source), args.format, args.compression))
+        if os.path.abspath(target) == os.path.abspath(source):
+            print(f"{source}: skipped, the output would replace the input", file=sys.stderr)
+            continue
+        if target in jobs.values():
+            print(f"{source}: skipped, another input is also written to {target}", file=sys.stderr)
+            continue
+        if os.path.exists(target) and not args.overwrite:
+            print(f"{source}: skipped, {target} exists")
+            continue
+        jobs[source] = target
+    if not jobs:
+        print("No files to clean.")
+        return 0
+    print(f"Cleaning {len(jobs)} files with {len(pipeline.optimize())} steps"
+          f"{'' if pipeline.streamable() else ' (loaded whole, the recipe needs every row at once)'}")
+
+    started = time.perf_counter()
+    failed = rows = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(clean_file, recipe, source, target, args.format, args.compression, args.batch_rows): source
+                   for source, target in jobs.items()}
+        for future in concurrent.futures.as_completed(futures):
+            source = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{source}: failed, {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            rows += result["rows_in"]
+            print(_throughput(source, result), flush=True)
+
+    seconds = time.perf_counter() - started
+    print(f"Cleaned {len(jobs) - failed} of {len(jobs)} files, {rows:,} rows in {seconds:.2f} s "
+          f"({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
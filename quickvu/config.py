@@ -1,6 +1,4 @@
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
 
 class Config:
     # Constants for data columns
@@ -20,3 +18,78 @@ class Config:
     TARGET_VARIABLE = 'sales_amount'
     TEST_SIZE = 0.2
     RANDOM_STATE = 42
+
+    # Memory budget for parsed uploads kept by the dataset loader (bytes)
+    LOADER_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+    # How the loader parses the files of a multi-file or zip upload: 'serial', 'thread' or 'process'
+    INGEST_EXECUTOR = 'process'
+    # Number of files parsed at the same time, None uses every CPU
+    INGEST_MAX_WORKERS = None
+
+    # Memory budget for per-step Quick Prep checkpoints (bytes)
+    CHECKPOINT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    # How Quick Prep runs column-wise cleaning steps: 'serial', 'thread' or 'process'
+    PARALLEL_EXECUTOR = 'thread'
+    # Number of parallel workers, None uses every CPU
+    PARALLEL_MAX_WORKERS = None
+
+    # Idle Quick Prep sessions have their dataset spilled to a memory-mapped file after this many seconds
+    SESSION_SPILL_AFTER_SECONDS = 5 * 60
+    # and dropped after this many seconds
+    SESSION_EXPIRE_AFTER_SECONDS = 6 * 60 * 60
+
+    # Engine Quick Prep cleans with: 'pandas' in memory, or 'duckdb' out of core for datasets bigger than RAM
+    PREP_BACKEND = os.getenv('QUICKVU_PREP_BACKEND', 'pandas')
+    # Memory the duckdb backend may use before it spills to disk
+    DUCKDB_MEMORY_LIMIT = os.getenv('QUICKVU_DUCKDB_MEMORY_LIMIT', '2GB')
+    # Uploads and intermediate files of the duckdb backend are deleted this many seconds after their last use,
+    # once no session can still hold a table reading them
+    DUCKDB_FILE_EXPIRE_AFTER_SECONDS = SESSION_EXPIRE_AFTER_SECONDS
+
+    # Rows per record batch when the file converter streams between formats
+    CONVERTER_BATCH_ROWS = 100_000
+
+    # Correlation explanations: 'gemini' calls the API, 'stub' answers locally for tests and benchmarks
+    LLM_BACKEND = os.getenv('QUICKVU_LLM_BACKEND', 'gemini')
+    GEMINI_MODEL = 'gemini-1.5-flash'
+    LLM_TIMEOUT_SECONDS = 30
+    LLM_MAX_CONCURRENCY = 4
+    EXPLANATION_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'quickvu', 'explanations')
+
+    # Rows per chunk when correlations are accumulated
+    CORRELATION_CHUNK_ROWS = 100_000
+    # Wider correlation matrices are shown as top pairs and a clustered block of the strongest columns
+    CORRELATION_HEATMAP_MAX_COLUMNS = 30
+
+    # Quick Glance shows results from a sample first, then the exact ones, for datasets above this many rows
+    PROGRESSIVE_MIN_ROWS = 200_000
+    PROGRESSIVE_SAMPLE_ROWS = 50_000
+    # Background threads computing exact results, and how many exact results are kept
+    PROGRESSIVE_WORKERS = 2
+    PROGRESSIVE_MAX_RESULTS = 32
+
+    # Long Quick Prep operations run as background jobs, in a thread pool of this many threads
+    JOB_MAX_WORKERS = 2
+    # Finished jobs kept so a later rerun can pick up their results
+    JOB_MAX_FINISHED = 8
+    # Jobs finishing within this many seconds are shown right away, without a progress bar
+    JOB_INLINE_SECONDS = 1.0
+    # Rows per chunk when a cleaned dataset is exported to CSV
+    EXPORT_CHUNK_ROWS = 100_000
+
+    # The quickvu command cleans this many files at once (None uses every CPU), streaming this many rows at a time
+    CLI_MAX_WORKERS = None
+    CLI_BATCH_ROWS = 100_000
+
+    # Fitted scalers and imputers kept by Quick Prep, so reruns don't fit them again
+    TRANSFORMER_CACHE_ENTRIES = 32
+
+    # Per-call profiling of the prepare_data, data_processing and eda functions, off unless QUICKVU_PROFILING=1
+    PROFILING = os.getenv('QUICKVU_PROFILING', '0') == '1'
+    # Peak memory is traced with tracemalloc, which slows down allocations while profiling
+    PROFILING_TRACE_MEMORY = os.getenv('QUICKVU_PROFILING_TRACE_MEMORY', '1') == '1'
+    PROFILING_MAX_RECORDS = 10_000
+    # Per-function totals are served for Prometheus at http://127.0.0.1:<port>/metrics when set
+    PROFILING_METRICS_PORT = int(os.getenv('QUICKVU_PROFILING_PORT', '0')) or None
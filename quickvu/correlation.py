@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .config import Config
+from .sketches import KLLSketch
+
+METHODS = ('pearson', 'spearman')
+
+
+class CorrelationAccumulator:
+    """Mergeable pairwise Pearson correlation over chunks of rows.
+
+    For every pair of columns it keeps the number of rows where both are present and the sums,
+    sums of squares and cross products over those rows, like `DataFrame.corr` does with missing
+    values. Memory is a few `columns x columns` matrices however many rows are added. Values are
+    shifted by the means of the first chunk before summing, which keeps the sums small and the
+    result precise.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.shift = None
+        self.n = self.sx = self.sxx = self.sxy = None
+
+    def update(self, chunk: pd.DataFrame, columns: list = None):
+        """Add a chunk of rows.
+
+        :param chunk: Rows with the numeric columns to correlate.
+        :type chunk: pd.DataFrame
+        :param columns: Columns to correlate. Inferred from the first chunk (numeric columns) when None.
+        :type columns: list, optional
+
+        :return: The accumulator itself.
+        :rtype: CorrelationAccumulator
+        """
+        if self.columns is None:
+            self.columns = columns if columns is not None else [
+                column for column in chunk.columns if is_numeric_dtype(chunk[column])]
+        values = chunk[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        return self.update_values(values)
+
+    def update_values(self, values: np.ndarray):
+        """Add a 2-D array of rows whose columns are `self.columns`."""
+        width = values.shape[1]
+        if self.shift is None:
+            with np.errstate(invalid='ignore'):
+                counts = np.sum(~np.isnan(values), axis=0)
+                self.shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+            self.n, self.sx, self.sxx, self.sxy = (np.zeros((width, width)) for _ in range(4))
+        values = values - self.shift
+
+        present = ~np.isnan(values)
+        if present.all():
+            # no missing values: every pair sees every row, so the per-column sums are enough
+            self.n += len(values)
+            self.sx += values.sum(axis=0)[:, None]
+            self.sxx += (values ** 2).sum(axis=0)[:, None]
+        else:
+            weights = present.astype('float64')
+            values = np.where(present, values, 0.0)
+            self.n += weights.T @ weights
+            self.sx += values.T @ weights
+            self.sxx += (values ** 2).T @ weights
+        self.sxy += values.T @ values
+        return self
+
+    def merge(self, other: 'CorrelationAccumulator'):
+        """Combine another accumulator over the same columns, e.g. one built by another worker.
+
+        :param other: The accumulator to merge in.
+        :type other: CorrelationAccumulator
+
+        :return: The accumulator itself.
+        :rtype: CorrelationAccumulator
+        """
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.columns, self.shift = other.columns, other.shift.copy()
+            self.n, self.sx, self.sxx, self.sxy = other.n.copy(), other.sx.copy(), other.sxx.copy(), other.sxy.copy()
+            return self
+        # move the other sums from its shift onto ours: x - b = (x - a) - (b - a)
+        d = (self.shift - other.shift)[:, None]
+        sx = other.sx - d * other.n
+        sxx = other.sxx - 2 * d * other.sx + d ** 2 * other.n
+        sxy = other.sxy - d.T * other.sx - d * other.sx.T + d * d.T * other.n
+        self.n += other.n
+        self.sx += sx
+        self.sxx += sxx
+        self.sxy += sxy
+        return self
+
+    def matrix(self) -> pd.DataFrame:
+        """Return the correlation matrix, with NaN for pairs with fewer than two common values or no variance.
+
+        :return: Correlation of every pair of columns.
+        :rtype: pd.DataFrame
+        """
+        if self.shift is None:
+            return pd.DataFrame(index=self.columns or [], columns=self.columns or [], dtype='float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sy = self.sx.T
+            covariance = self.sxy - self.sx * sy / self.n
+            variance_x = self.sxx - self.sx ** 2 / self.n
+            variance_y = self.sxx.T - sy ** 2 / self.n
+            result = covariance / np.sqrt(variance_x * variance_y)
+        result = np.where((self.n >= 2) & (variance_x > 0) & (variance_y > 0), np.clip(result, -1, 1), np.nan)
+        diagonal = np.diag_indices_from(result)
+        result[diagonal] = np.where(np.isnan(result[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(result, index=self.columns, columns=self.columns)
+
+    def counts(self) -> pd.DataFrame:
+        """Return the number of rows where both columns of each pair are present."""
+        return pd.DataFrame(self.n, index=self.columns, columns=self.columns)
+
+
+def _chunks(data, chunk_size: int):
+    """Return a function giving a fresh iterator over the chunks of `data`."""
+    if isinstance(data, pd.DataFrame):
+        return lambda: (data.iloc[start:start + chunk_size] for start in range(0, len(data), chunk_size))
+    return data
+
+
+def correlation_accumulator(
+        data,
+        method: str = 'pearson',
+        columns: list = None,
+        chunk_size: int = Config.CORRELATION_CHUNK_ROWS,
+        error: float = 0.01
+    ) -> CorrelationAccumulator:
+    """Accumulate the pairwise correlations of a dataset chunk by chunk.
+
+    Spearman correlation is the Pearson correlation of the ranks. Ranks need the whole column,
+    so a first pass builds a `KLLSketch` per column and a second pass ranks each chunk against
+    it; the ranks are exact while the sketches hold every value, and within `error` otherwise.
+    With missing values each column is ranked over all of its values rather than per pair, so
+    results can differ slightly from `DataFrame.corr(method='spearman')`.
+
+    :param data: A DataFrame, or a function returning a fresh iterable of DataFrame chunks
+        (e.g. `lambda: pd.read_csv(path, chunksize=100_000)`), which is called twice for `spearman`.
+    :param method: `pearson` or `spearman`.
+    :type method: str, optional
+        Default is `pearson`.
+    :param columns: Numeric columns to correlate, all numeric columns when None.
+    :type columns: list, optional
+    :param chunk_size: Rows per chunk when `data` is a DataFrame.
+    :type chunk_size: int, optional
+    :param error: Rank error of the sketches used by `spearman`.
+    :type error: float, optional
+        Default is 0.01.
+
+    :return: The filled accumulator.
+    :rtype: CorrelationAccumulator
+    """
+    if method not in METHODS:
+        raise ValueError("Invalid correlation method. Choose 'pearson' or 'spearman'.")
+    read_chunks = _chunks(data, chunk_size)
+    accumulator = CorrelationAccumulator()
+    if method == 'pearson':
+        for chunk in read_chunks():
+            accumulator.update(chunk, columns)
+        return accumulator
+
+    sketches = None
+    for chunk in read_chunks():
+        if columns is None:
+            columns = [column for column in chunk.columns if is_numeric_dtype(chunk[column])]
+        if sketches is None:
+            sketches = {column: KLLSketch(error=error) for column in columns}
+        for column in columns:
+            sketches[column].update(chunk[column].to_numpy(dtype='float64', na_value=np.nan))
+    if sketches is None:
+        return accumulator
+    accumulator.columns = columns
+    for chunk in read_chunks():
+        ranks = np.column_stack([sketches[column].rank(chunk[column].to_numpy(dtype='float64', na_value=np.nan))
+                                 for column in columns])
+        accumulator.update_values(ranks)
+    return accumulator
+
+
+def correlation_matrix(
+        data,
+        method: str = 'pearson',
+        columns: list = None,
+        chunk_size: int = Config.CORRELATION_CHUNK_ROWS,
+        error: float = 0.01
+    ) -> pd.DataFrame:
+    """Return the correlation matrix of the numeric columns, computed in chunks.
+
+    Matches `DataFrame.corr(method='pearson')`, pairwise missing values included. See
+    `correlation_accumulator` for the parameters.
+
+    :return: Correlation matrix.
+    :rtype: pd.DataFrame
+    """
+    return correlation_accumulator(data, method, columns, chunk_size, error).matrix()
+
+
+def top_pairs(
+        matrix: pd.DataFrame,
+        k: int = 20,
+        min_abs: float = 0.0
+    ) -> pd.DataFrame:
+    """Return the `k` most strongly correlated pairs of columns, by absolute correlation.
+
+    :param matrix: A correlation matrix.
+    :type matrix: pd.DataFrame
+    :param k: Number of pairs to return.
+    :type k: int, optional
+        Default is 20.
+    :param min_abs: Only return pairs with an absolute correlation of at least this.
+    :type min_abs: float, optional
+
+    :return: One row per pair with `column_1`, `column_2` and `correlation`, strongest first.
+    :rtype: pd.DataFrame
+    """
+    values = matrix.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    strength = np.abs(values[rows, cols])
+    keep = np.flatnonzero(np.nan_to_num(strength, nan=-1.0) >= max(min_abs, 0.0))
+    if len(keep) > k:
+        keep = keep[np.argpartition(-strength[keep], k - 1)[:k]]
+    keep = keep[np.argsort(-strength[keep], kind='stable')]
+    labels = matrix.columns
+    return pd.DataFrame({
+        'column_1': labels[rows[keep]],
+        'column_2': labels[cols[keep]],
+        'correlation': values[rows[keep], cols[keep]],
+    })
+
+
+def cluster_order(matrix: pd.DataFrame) -> list:
+    """Order columns so that strongly correlated ones sit next to each other.
+
+    Uses average-linkage hierarchical clustering on the distance `1 - |correlation|`.
+
+    :param matrix: A correlation matrix.
+    :type matrix: pd.DataFrame
+
+    :return: The columns in clustered order.
+    :rtype: list
+    """
+    if len(matrix) < 3:
+        return matrix.columns.tolist()
+    # imported here, scipy is slow to import and only needed for the clustered view
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = 1 - np.abs(np.nan_to_num(matrix.to_numpy(), nan=0.0))
+    np.fill_diagonal(distance, 0.0)
+    distance = np.clip((distance + distance.T) / 2, 0.0, 1.0)
+    order = leaves_list(linkage(squareform(distance, checks=False), method='average'))
+    return matrix.columns[order].tolist()
+
+
+def clustered_view(
+        matrix: pd.DataFrame,
+        max_columns: int = 50
+    ) -> pd.DataFrame:
+    """Return a readable block view of a large correlation matrix.
+
+    Keeps the `max_columns` columns with the strongest correlations to any other column and
+    orders them with `cluster_order`, so correlated groups show up as blocks on a heatmap.
+
+    :param matrix: A correlation matrix.
+    :type matrix: pd.DataFrame
+    :param max_columns: Maximum number of columns to keep.
+    :type max_columns: int, optional
+        Default is 50.
+
+    :return: The reduced, reordered correlation matrix.
+    :rtype: pd.DataFrame
+    """
+    if len(matrix) > max_columns:
+        strength = np.nan_to_num(np.abs(matrix.to_numpy(copy=True)), nan=0.0)
+        np.fill_diagonal(strength, 0.0)
+        strongest = strength.max(axis=1)
+        keep = np.sort(np.argsort(-strongest, kind='stable')[:max_columns])
+        matrix = matrix.iloc[keep, keep]
+    order = cluster_order(matrix)
+    return matrix.loc[order, order]
@@ -1,6 +1,17 @@
+import numpy as np
 import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_integer_dtype,
+    is_numeric_dtype,
+    is_object_dtype,
+    is_string_dtype,
+)
 from .config import Config
+from .profiling import profiled
 
+@profiled
 def preprocess_data(
     df: pd.DataFrame, 
     column_mapping: dict = None
@@ -30,7 +41,7 @@ def preprocess_data(
 
     # Handle missing values
     for column in df.columns:
-        if df[column].dtype in ['float64', 'int64']:  # Check if the column is numeric
+        if is_numeric_dtype(df[column]) and not is_bool_dtype(df[column]):  # Check if the column is numeric (any width)
             if Config.FILL_MISSING_METHOD == 'mean':
                 # Fill missing values with the mean, if the column is numeric
                 df[column].fillna(df[column].mean(), inplace=True)
@@ -42,13 +53,69 @@ def preprocess_data(
                 df.dropna(subset=[column], inplace=True)
     return df
 
+# ranges of the integer encodings of dates, bounded by what datetime64[ns] can hold
+_YEARS = (1678, 2261)
+_YYYYMMDD = (19000101, 21001231)
+_EPOCH_SECONDS = (0, 2147483647)
+_EPOCH_MILLISECONDS = (100_000_000_000, 2147483647 * 1000)
+
+# integers shorter than these are too easily ids or amounts to be detected as epoch times
+_DETECT_EPOCH_SECONDS = 100_000_000
+_DATE_NAME_HINTS = ('date', 'time', 'year', 'day', 'month', 'period', '_dt', 'dt_')
+
+def _classify_int_dates(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pick a date encoding for every integer and convert it, in one vectorized pass.
+    
+    Each value gets the first encoding it fits: a year (`2021`), a `YYYYMMDD` date
+    (`20210131`), epoch seconds, then epoch milliseconds. The ranges don't overlap once
+    taken in this order, so every value is converted exactly once. Values in the `YYYYMMDD`
+    range that are not valid dates (`20210230`) become NaT rather than epoch seconds.
+
+    :param values: Integer values.
+    :type values: np.ndarray
+
+    :return: The dates as `datetime64[ns]` (NaT where no encoding fits) and the code of the
+        encoding used per value: 0 none, 1 year, 2 YYYYMMDD, 3 epoch seconds, 4 epoch milliseconds.
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    values = values.astype('int64', copy=False)
+    result = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+    kind = np.zeros(len(values), dtype='int8')
+
+    year = (values >= _YEARS[0]) & (values <= _YEARS[1])
+    result[year] = (values[year] - 1970).astype('datetime64[Y]')
+    kind[year] = 1
+
+    candidate = ~year & (values >= _YYYYMMDD[0]) & (values <= _YYYYMMDD[1])
+    parts = values[candidate]
+    month_start = ((parts // 10000 - 1970) * 12 + (parts // 100 % 100 - 1)).astype('datetime64[M]')
+    days = parts % 100
+    month_length = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype('int64')
+    valid = (parts // 100 % 100 >= 1) & (parts // 100 % 100 <= 12) & (days >= 1) & (days <= month_length)
+    yyyymmdd = np.zeros(len(values), dtype=bool)
+    yyyymmdd[np.flatnonzero(candidate)[valid]] = True
+    result[yyyymmdd] = month_start[valid].astype('datetime64[D]') + (days[valid] - 1).astype('timedelta64[D]')
+    kind[yyyymmdd] = 2
+
+    seconds = ~year & ~candidate & (values >= _EPOCH_SECONDS[0]) & (values <= _EPOCH_SECONDS[1])
+    result[seconds] = values[seconds].astype('datetime64[s]')
+    kind[seconds] = 3
+
+    milliseconds = (values >= _EPOCH_MILLISECONDS[0]) & (values <= _EPOCH_MILLISECONDS[1])
+    result[milliseconds] = values[milliseconds].astype('datetime64[ms]')
+    kind[milliseconds] = 4
+    return result, kind
+
+@profiled
 def convert_int_to_datetime(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
     """Converts specified integer columns in a DataFrame to datetime format.
     
-    Handles three cases:
-    1. 8-digit integers in the format 'YYYYMMDD'.
-    2. Unix timestamps.
-    3. 4-digit integers representing years, converting them to '01-01-{year}'.
+    Every value is converted once, by the first case it fits (see `_classify_int_dates`):
+    1. 4-digit integers representing years, converting them to '01-01-{year}'.
+    2. 8-digit integers in the format 'YYYYMMDD'.
+    3. Unix timestamps in seconds.
+    4. Unix timestamps in milliseconds.
+    Values that fit none become NaT, and the column becomes a `datetime64[ns]` column.
 
     :param df: The input DataFrame containing integer columns to be converted.
     :param columns: A list of column names to be checked and converted to datetime.
@@ -56,15 +123,58 @@ def convert_int_to_datetime(df: pd.DataFrame, columns: list[str]) -> pd.DataFram
     :rtype: pd.DataFrame
     """
     for col in columns:
-        if col in df.columns and df[col].dtype == 'int64':
-            # Create a mask for each case and apply the conversions more efficiently
-            yyyymmdd_mask = df[col].between(19000101, 21001231)
-            unix_timestamp_mask = df[col].between(0, 2147483647)
-            year_mask = df[col].between(1000, 9999)
-            
-            # Apply conversion only to the masked rows
-            df.loc[yyyymmdd_mask, col] = pd.to_datetime(df.loc[yyyymmdd_mask, col], format='%Y%m%d', errors='coerce')
-            df.loc[unix_timestamp_mask, col] = pd.to_datetime(df.loc[unix_timestamp_mask, col], unit='s', errors='coerce')
-            df.loc[year_mask, col] = pd.to_datetime(df.loc[year_mask, col].astype(str) + '0101', format='%Y%m%d', errors='coerce')
+        if col in df.columns and is_integer_dtype(df[col]):
+            missing = df[col].isna().to_numpy()
+            dates, _ = _classify_int_dates(df[col].to_numpy(dtype='int64', na_value=0))
+            dates[missing] = np.datetime64('NaT')
+            df[col] = pd.Series(dates, index=df.index)
     
     return df
+
+@profiled
+def detect_datetime_columns(
+        df: pd.DataFrame,
+        sample_size: int = 1000,
+        threshold: float = 0.9
+    ) -> list[str]:
+    """Detect the columns that hold dates, from a sample of their values.
+    
+    Datetime columns always count. Integer columns count when at least `threshold` of the
+    sampled values are `YYYYMMDD` dates or epoch times (years only when the column name
+    says so, e.g. `year`, since small integers are usually amounts). Text columns count
+    when that share of the sampled values parses as a date.
+
+    :param df: The input DataFrame.
+    :param sample_size: Number of non-missing values sampled per column.
+    :param threshold: Share of the sampled values that must look like dates.
+    :returns: Names of the date columns, in column order.
+    :rtype: list[str]
+    """
+    detected = []
+    for column in df.columns:
+        series = df[column]
+        if is_datetime64_any_dtype(series):
+            detected.append(column)
+            continue
+        sample = series.dropna()
+        if len(sample) > sample_size:
+            sample = sample.sample(sample_size, random_state=0)
+        if sample.empty or is_bool_dtype(series):
+            continue
+
+        if is_integer_dtype(series):
+            values = sample.to_numpy(dtype='int64')
+            _, kind = _classify_int_dates(values)
+            named = any(hint in str(column).lower() for hint in _DATE_NAME_HINTS)
+            looks_like_date = (kind == 2) | (kind == 4) | ((kind == 3) & (values >= _DETECT_EPOCH_SECONDS)) | ((kind == 1) & named)
+            if looks_like_date.mean() >= threshold:
+                detected.append(column)
+        elif is_object_dtype(series) or is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            text = sample.astype(str)
+            # plain numbers in text are ids or amounts more often than dates
+            if text.str.fullmatch(r'\s*[-+]?\d+(\.\d+)?\s*').mean() >= threshold:
+                continue
+            parsed = pd.to_datetime(text, errors='coerce', format='mixed')
+            if parsed.notna().mean() >= threshold:
+                detected.append(column)
+    return detected
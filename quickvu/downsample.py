@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ('lttb', 'minmax')
+
+
+def _positions(index: pd.Index) -> np.ndarray:
+    """Return the x positions of a series index as floats, or the row positions when it isn't numeric or datetime."""
+    if pd.api.types.is_datetime64_any_dtype(index) or pd.api.types.is_timedelta64_dtype(index):
+        values = index.asi8
+    elif pd.api.types.is_numeric_dtype(index) and not pd.api.types.is_bool_dtype(index):
+        values = index.to_numpy(dtype='float64')
+    else:
+        return np.arange(len(index), dtype='float64')
+    # relative to the first point, so nanosecond timestamps keep their precision as floats
+    return (values - values[0]).astype('float64') if len(values) else values.astype('float64')
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    The points between the first and the last are split into `threshold - 2` buckets; from each
+    bucket the point forming the largest triangle with the point kept from the previous bucket
+    and the average of the next bucket is kept, which preserves peaks and the visual shape.
+
+    :param x: Sorted x positions.
+    :type x: np.ndarray
+    :param y: Values at those positions.
+    :type y: np.ndarray
+    :param threshold: Number of points to keep, at least 3.
+    :type threshold: int
+
+    :return: Sorted indices of the kept points.
+    :rtype: np.ndarray
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(int), n)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        average_x, average_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # twice the triangle area, the constant factor doesn't change the argmax
+        area = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> np.ndarray:
+    """Min/max-per-bucket downsampling.
+
+    The x range is split into `buckets` equal-width buckets (e.g. one per pixel column) and the
+    lowest and highest point of each is kept, so every spike stays visible. The first and last
+    points are always kept.
+
+    :param x: Sorted x positions.
+    :type x: np.ndarray
+    :param y: Values at those positions.
+    :type y: np.ndarray
+    :param buckets: Number of buckets, each keeps at most two points.
+    :type buckets: int
+
+    :return: Sorted indices of the kept points.
+    :rtype: np.ndarray
+    """
+    n = len(x)
+    if buckets < 1 or 2 * buckets + 2 >= n:
+        return np.arange(n)
+
+    bucket_ids = np.minimum(((x - x[0]) / max(x[-1] - x[0], 1e-12) * buckets).astype(int), buckets - 1)
+    # order by bucket, then by value; the first and last row of each bucket are its min and max
+    order = np.lexsort((y, bucket_ids))
+    boundaries = np.flatnonzero(np.diff(bucket_ids[order])) + 1
+    firsts = order[np.concatenate([[0], boundaries])]
+    lasts = order[np.concatenate([boundaries - 1, [n - 1]])]
+    return np.unique(np.concatenate([[0, n - 1], firsts, lasts]))
+
+
+def downsample(series: pd.Series, max_points: int, method: str = 'lttb') -> pd.Series:
+    """Reduce a series sorted by its index to about `max_points` points for plotting.
+
+    :param series: The series to plot, its index is the x axis.
+    :type series: pd.Series
+    :param max_points: Maximum number of points to keep, e.g. the plot width in pixels.
+    :type max_points: int
+    :param method: `lttb` or `minmax`.
+    :type method: str, optional
+        Default is `lttb`.
+
+    :return: The kept points of the series.
+    :rtype: pd.Series
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid downsampling method. Choose one of {', '.join(METHODS)}.")
+    if len(series) <= max_points:
+        return series
+
+    x = _positions(series.index)
+    y = np.nan_to_num(series.to_numpy(dtype='float64', na_value=np.nan))
+    if method == 'lttb':
+        indices = lttb(x, y, max_points)
+    else:
+        indices = minmax(x, y, max(1, (max_points - 2) // 2))
+    return series.iloc[indices]
@@ -1,64 +1,104 @@
-import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 
+from . import correlation, downsample, stats
+from .profiling import profiled
+
+@profiled
 def generate_summary_statistics(df: pd.DataFrame):
     """
-    Generates and returns summary statistics for the dataframe.
+    Generates and returns summary statistics for the numerical columns of the dataframe.
+    
+    Numeric and categorical statistics come from one fused pass (see `stats.summarize`)
+    that is memoized by the data fingerprint, so calling both summary functions scans the data once.
     
     :param df: Input dataset.
     
     :returns: Summary statistics.
     :rtype: pd.DataFrame
     """
-    return df.describe()
+    return stats.summarize(df)[0]
 
+@profiled
 def generate_object_summary_statistics(df: pd.DataFrame):
     """
-    Generates and returns summary statistics for the dataframe.
+    Generates and returns summary statistics for the text and categorical columns of the dataframe.
     
     :param df: Input dataset.
     
     :returns: Summary statistics.
     :rtype: pd.DataFrame
     """
-    return df.describe(include='object')
+    return stats.summarize(df)[1]
 
+@profiled
 def plot_sales_trends(
     df: pd.DataFrame, 
     date_column: str, 
-    sales_column: str
+    sales_column: str,
+    max_points: int = None,
+    method: str = 'lttb'
     ):
     """
     Plots sales trends over time.
+    
+    The grouped series is downsampled before plotting (see `downsample.downsample`), so the
+    rendering cost depends on the plot width rather than on the number of distinct dates.
+    The figure gets a `point_counts` attribute with the number of `raw` and `plotted` points.
 
     :param df: Input dataset.
     :param date_column: The column representing dates.
     :param sales_column: The column representing sales amount.
+    :param max_points: Maximum number of points to plot. Defaults to the width of the axes in pixels.
+    :param method: Downsampling method, `lttb` or `minmax`.
     
     :returns: Matplotlib figure object
     """
-    fig, ax = plt.subplots()
-    df.groupby(date_column)[sales_column].sum().plot(ax=ax)  # Group by date_column without .dt
+    from matplotlib.figure import Figure
+
+    # not pyplot: figures are also drawn in background threads, and pyplot's state is not thread-safe
+    fig = Figure()
+    ax = fig.subplots()
+    trend = df.groupby(date_column)[sales_column].sum()  # Group by date_column without .dt
+    if max_points is None:
+        # about one point per horizontal pixel; more would not be visible
+        max_points = int(fig.get_figwidth() * fig.dpi * ax.get_position().width)
+    plotted = downsample.downsample(trend, max_points, method)
+    plotted.plot(ax=ax)
+    fig.point_counts = {"raw": len(trend), "plotted": len(plotted)}
     ax.set_title('Sales Trends Over Time')
     ax.set_xlabel('Date')
     ax.set_ylabel('Total Sales Amount')
     return fig
 
 
-def plot_correlation_matrix(df: pd.DataFrame):
+@profiled
+def plot_correlation_matrix(
+    df: pd.DataFrame,
+    method: str = 'pearson',
+    max_columns: int = 50
+    ):
     """
     Plots a correlation matrix of the dataset.
     
+    Correlations are accumulated in chunks (see `correlation.correlation_matrix`). A dataset
+    with more than `max_columns` numeric columns is shown as a clustered block of its most
+    strongly correlated columns, since a full heatmap can't be read past that. Smaller
+    matrices keep the column order of the dataset.
+    
     :param df: Input dataset.
+    :param method: `pearson` or `spearman`.
+    :param max_columns: Maximum number of columns on the heatmap.
     
     :returns: Matplotlib figure object
     """
-    numeric_df = df.select_dtypes(include=['number'])
-    corr = numeric_df.corr()
-    fig, ax = plt.subplots()
-    plt.figure(figsize=(12, 8))
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    corr = correlation.correlation_matrix(df, method)
+    if len(corr) > max_columns:
+        corr = correlation.clustered_view(corr, max_columns)
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
     sns.heatmap(corr, annot=False, cmap='coolwarm', ax=ax, square=True, center=0)
     ax.set_title('Correlation Matrix')
     return fig
\ No newline at end of file
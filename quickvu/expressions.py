@@ -0,0 +1,347 @@
+import ast
+import inspect
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression uses something the vectorized compiler doesn't support."""
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+# string methods that map one to one onto the pandas `.str` accessor
+_STRING_METHODS = {
+    'upper', 'lower', 'strip', 'lstrip', 'rstrip', 'title', 'capitalize',
+    'startswith', 'endswith', 'replace', 'zfill', 'isdigit', 'isalpha', 'isnumeric',
+}
+
+_SCALAR_TYPES = (int, float, str, bool, type(None), np.number, np.bool_)
+
+
+def _is_series(value) -> bool:
+    return isinstance(value, pd.Series)
+
+
+def _as_mask(value):
+    """Truth value of a condition, following Python truthiness for each row (NaN counts as True)."""
+    if _is_series(value):
+        if pd.api.types.is_bool_dtype(value):
+            return value.to_numpy(dtype=bool)
+        return np.asarray([bool(item) for item in value], dtype=bool)
+    return bool(value)
+
+
+def _call_function(name: str, args: list):
+    value = args[0]
+    if name == 'abs' and len(args) == 1:
+        return value.abs() if _is_series(value) else abs(value)
+    if name == 'round' and len(args) in (1, 2):
+        return value.round(*args[1:]) if _is_series(value) else round(*args)
+    if name == 'len' and len(args) == 1:
+        return value.str.len() if _is_series(value) else len(value)
+    if name in ('str', 'int', 'float') and len(args) == 1:
+        if not _is_series(value):
+            return {'str': str, 'int': int, 'float': float}[name](value)
+        if name == 'str':
+            return value.map(str)
+        return value.astype(name)
+    if name in ('min', 'max') and len(args) == 2:
+        if not any(_is_series(arg) for arg in args):
+            return min(args) if name == 'min' else max(args)
+        return (np.minimum if name == 'min' else np.maximum)(*args)
+    raise ExpressionError(f"function '{name}' is not supported")
+
+
+def _call_method(value, method: str, args: list):
+    if method not in _STRING_METHODS:
+        raise ExpressionError(f"method '{method}' is not supported")
+    if _is_series(value):
+        if method == 'replace':
+            return value.str.replace(*args, regex=False)
+        return getattr(value.str, method)(*args)
+    return getattr(value, method)(*args)
+
+
+class _Compiler:
+    """Translate a Python expression AST into a function evaluated on whole columns."""
+
+    def __init__(self, row_name: str = None, namespace: dict = None, columns: dict = None):
+        self.row_name = row_name
+        self.namespace = namespace or {}
+        # placeholder name -> column name, for backtick-quoted columns in string expressions
+        self.columns = columns or {}
+
+    def compile(self, node):
+        method = getattr(self, f"_compile_{type(node).__name__}", None)
+        if method is None:
+            raise ExpressionError(f"'{type(node).__name__}' expressions are not supported")
+        return method(node)
+
+    def _column(self, name):
+        def column(frame):
+            if name not in frame.columns:
+                raise ExpressionError(f"column '{name}' does not exist")
+            return frame[name]
+        return column
+
+    def _compile_Constant(self, node):
+        value = node.value
+        return lambda frame: value
+
+    def _compile_Name(self, node):
+        if node.id == self.row_name:
+            raise ExpressionError("the row can only be used to select a column, e.g. x['price']")
+        if node.id in self.columns:
+            return self._column(self.columns[node.id])
+        if node.id in ('True', 'False', 'None'):
+            value = {'True': True, 'False': False, 'None': None}[node.id]
+            return lambda frame: value
+        if node.id in self.namespace:
+            value = self.namespace[node.id]
+            if not isinstance(value, _SCALAR_TYPES):
+                raise ExpressionError(f"variable '{node.id}' is not a scalar")
+            return lambda frame: value
+        if self.row_name is None:
+            # string expressions refer to columns by name
+            return self._column(node.id)
+        raise ExpressionError(f"name '{node.id}' is not defined")
+
+    def _compile_Subscript(self, node):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row_name:
+            if not isinstance(node.slice, ast.Constant):
+                raise ExpressionError("columns must be selected with a constant name")
+            return self._column(node.slice.value)
+        raise ExpressionError("indexing is only supported to select a column of the row")
+
+    def _compile_Attribute(self, node):
+        if isinstance(node.value, ast.Name) and node.value.id == self.row_name:
+            if hasattr(pd.Series, node.attr):
+                # on a row, e.g. x.name or x.size is the Series attribute, not the column
+                raise ExpressionError(f"'{node.attr}' is an attribute of the row, select the column with x['{node.attr}']")
+            return self._column(node.attr)
+        raise ExpressionError(f"attribute '{node.attr}' is not supported")
+
+    def _compile_BinOp(self, node):
+        function = _BINARY_OPERATORS.get(type(node.op))
+        if function is None:
+            raise ExpressionError(f"operator '{type(node.op).__name__}' is not supported")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda frame: function(left(frame), right(frame))
+
+    def _compile_UnaryOp(self, node):
+        operand = self.compile(node.operand)
+        if isinstance(node.op, ast.USub):
+            return lambda frame: -operand(frame)
+        if isinstance(node.op, ast.UAdd):
+            return lambda frame: +operand(frame)
+        if isinstance(node.op, ast.Not):
+            def negate(frame):
+                value = operand(frame)
+                return pd.Series(~_as_mask(value), index=value.index) if _is_series(value) else not value
+            return negate
+        raise ExpressionError(f"operator '{type(node.op).__name__}' is not supported")
+
+    def _compile_BoolOp(self, node):
+        values = [self.compile(value) for value in node.values]
+        is_and = isinstance(node.op, ast.And)
+
+        def combine(frame):
+            results = [value(frame) for value in values]
+            if not any(_is_series(result) for result in results):
+                return all(results) if is_and else any(results)
+            if not all(_is_series(result) and pd.api.types.is_bool_dtype(result) for result in results):
+                # `and`/`or` return one of their operands, which only matches `&`/`|` for booleans
+                raise ExpressionError("'and'/'or' are only supported between conditions")
+            combined = results[0]
+            for result in results[1:]:
+                combined = (combined & result) if is_and else (combined | result)
+            return combined
+        return combine
+
+    def _compile_Compare(self, node):
+        operands = [self.compile(operand) for operand in [node.left, *node.comparators]]
+        comparisons = []
+        for position, op in enumerate(node.ops):
+            comparisons.append((position, self._comparison(op)))
+
+        def compare(frame):
+            values = [operand(frame) for operand in operands]
+            result = None
+            for position, function in comparisons:
+                outcome = function(values[position], values[position + 1])
+                result = outcome if result is None else result & outcome
+            return result
+        return compare
+
+    def _comparison(self, op):
+        if type(op) in _COMPARISONS:
+            return _COMPARISONS[type(op)]
+        if isinstance(op, (ast.In, ast.NotIn)):
+            negate = isinstance(op, ast.NotIn)
+
+            def contains(left, right):
+                if _is_series(right) and not _is_series(left):
+                    result = right.str.contains(str(left), regex=False)
+                elif _is_series(left) and isinstance(right, (list, tuple, set)):
+                    result = left.isin(right)
+                elif not _is_series(left) and not _is_series(right):
+                    result = left in right
+                else:
+                    raise ExpressionError("'in' is supported for substrings and constant lists")
+                return ~result if negate and _is_series(result) else (not result if negate else result)
+            return contains
+        # `is None` is left out on purpose: row-wise it is False for NaN, unlike `isna`
+        raise ExpressionError(f"comparison '{type(op).__name__}' is not supported")
+
+    def _compile_List(self, node):
+        items = [self.compile(item) for item in node.elts]
+        return lambda frame: [item(frame) for item in items]
+
+    _compile_Tuple = _compile_List
+    _compile_Set = _compile_List
+
+    def _compile_IfExp(self, node):
+        test, body, orelse = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+
+        def choose(frame):
+            condition = test(frame)
+            if not _is_series(condition):
+                return body(frame) if condition else orelse(frame)
+            mask = _as_mask(condition)
+            chosen, other = body(frame), orelse(frame)
+            chosen = chosen if _is_series(chosen) else pd.Series(chosen, index=frame.index)
+            return chosen.where(mask, other)
+        return choose
+
+    def _compile_Call(self, node):
+        if node.keywords:
+            raise ExpressionError("keyword arguments are not supported")
+        args = [self.compile(arg) for arg in node.args]
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            if not args:
+                raise ExpressionError(f"function '{name}' needs an argument")
+            return lambda frame: _call_function(name, [arg(frame) for arg in args])
+        if isinstance(node.func, ast.Attribute):
+            target, method = self.compile(node.func.value), node.func.attr
+            if method not in _STRING_METHODS:
+                raise ExpressionError(f"method '{method}' is not supported")
+            return lambda frame: _call_method(target(frame), method, [arg(frame) for arg in args])
+        raise ExpressionError("only plain function and string method calls are supported")
+
+
+def _lambda_source(func) -> ast.Lambda:
+    """Find the AST of a lambda from its source code."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        raise ExpressionError("the source of the function is not available")
+
+    code = func.__code__
+    arguments = list(code.co_varnames[:code.co_argcount])
+    candidates = []
+    for match in re.finditer(r'\blambda\b', source):
+        # the longest text from `lambda` that parses on its own is the lambda expression
+        for end in range(len(source), match.start(), -1):
+            text = source[match.start():end].strip()
+            try:
+                tree = ast.parse(text, mode='eval')
+            except SyntaxError:
+                continue
+            if not isinstance(tree.body, ast.Lambda):
+                # e.g. `lambda x: x['a'], 'b'` parses as a tuple; keep shrinking
+                continue
+            if [arg.arg for arg in tree.body.args.args] == arguments:
+                candidates.append((text, tree.body))
+            break
+    if not candidates:
+        raise ExpressionError("only lambda functions can be vectorized")
+    if len(candidates) > 1:
+        # several lambdas on the same lines, keep the one that compiles to the same bytecode
+        matching = [(text, node) for text, node in candidates
+                    if any(getattr(const, 'co_code', None) == code.co_code
+                           for const in compile(text, '<lambda>', 'eval').co_consts)]
+        if len(matching) != 1:
+            raise ExpressionError("could not tell which lambda on the line is the function")
+        candidates = matching
+    return candidates[0][1]
+
+
+def compile_expression(expression):
+    """Compile a derived-column expression into a function that works on whole columns.
+
+    Two forms are accepted:
+
+    - a string such as `"price * quantity"`, `"'high' if score > 80 else 'low'"` or
+      `` "`item type`.lower()" ``, where names (or backtick-quoted names) are columns;
+    - a row-wise lambda such as `lambda x: x['price'] * x['quantity']`, as used with
+      `DataFrame.apply(axis=1)`. Its source is parsed, so scalar variables it closes over work.
+
+    Arithmetic, comparisons (including `in` for substrings and constant lists), `and`/`or`/`not`
+    on conditions, conditional expressions, `abs`/`round`/`len`/`str`/`int`/`float`/`min`/`max`
+    and common string methods are supported. Anything else raises `ExpressionError`.
+
+    :param expression: The expression string or row-wise lambda.
+
+    :return: A function taking a DataFrame and returning the derived column (or a scalar).
+    :rtype: callable
+    """
+    if isinstance(expression, str):
+        columns = {}
+
+        def placeholder(match):
+            name = f"__column_{len(columns)}"
+            columns[name] = match.group(1)
+            return name
+        text = re.sub(r'`([^`]+)`', placeholder, expression.strip())
+        try:
+            tree = ast.parse(text, mode='eval')
+        except SyntaxError as error:
+            raise ExpressionError(f"invalid expression '{expression}': {error.msg}")
+        return _Compiler(columns=columns).compile(tree.body)
+
+    if not callable(expression) or not hasattr(expression, '__code__'):
+        raise ExpressionError("expressions must be strings or lambda functions")
+    node = _lambda_source(expression)
+    if len(node.args.args) != 1:
+        raise ExpressionError("row-wise lambdas take exactly one argument")
+    closure = inspect.getclosurevars(expression)
+    namespace = {**closure.globals, **closure.nonlocals}
+    return _Compiler(row_name=node.args.args[0].arg, namespace=namespace).compile(node.body)
+
+
+def evaluate(
+        dataframe: pd.DataFrame,
+        expression
+    ):
+    """Evaluate a derived-column expression on a DataFrame with vectorized operations.
+
+    :param dataframe: The DataFrame whose columns the expression refers to.
+    :type dataframe: pd.DataFrame
+    :param expression: The expression string or row-wise lambda, see `compile_expression`.
+
+    :return: The derived column, or a scalar for constant expressions.
+    :rtype: pd.Series
+    """
+    return compile_expression(expression)(dataframe)
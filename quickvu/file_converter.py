@@ -0,0 +1,366 @@
+import bz2
+import gzip
+import io
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+from .config import Config
+
+# formats that can be read, by file extension
+INPUT_FORMATS = ('csv', 'ndjson', 'jsonl', 'json', 'parquet', 'xlsx', 'xls')
+# formats that can be written; `json` is written as newline-delimited JSON
+OUTPUT_FORMATS = ('csv', 'ndjson', 'json', 'parquet', 'xlsx')
+
+# compression codecs per output format; text formats are wrapped in a compressed stream,
+# Parquet compresses its pages itself
+_TEXT_FORMATS = ('csv', 'ndjson', 'json')
+_TEXT_COMPRESSION = {'gzip': (gzip.GzipFile, '.gz'), 'bz2': (bz2.BZ2File, '.bz2')}
+PARQUET_COMPRESSION = ('snappy', 'gzip', 'zstd', 'brotli', 'lz4')
+
+# rows per worksheet in an .xlsx file
+_EXCEL_MAX_ROWS = 1_048_576
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def _array(values: list) -> pa.Array:
+    """Build an Arrow array from Python values, falling back to strings for mixed types."""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def _split(batch: pa.RecordBatch, batch_size: int):
+    for start in range(0, batch.num_rows, batch_size):
+        yield batch.slice(start, batch_size)
+
+
+def _csv_sample(source, sample_bytes: int = 1 << 20) -> bytes:
+    """Read the complete lines of the first `sample_bytes` of a CSV file, leaving the source rewound."""
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            sample = file.read(sample_bytes + 1)
+    else:
+        sample = _rewind(source).read(sample_bytes + 1)
+        _rewind(source)
+    return sample if len(sample) <= sample_bytes else sample[:sample.rfind(b'\n') + 1]
+
+
+def _csv_batches(source, batch_size: int):
+    # the column types are inferred from the first block; columns that are empty there are read as text.
+    # they are found from a separate copy of the first block: a second reader on the same file object
+    # would race the read-ahead of the first one
+    try:
+        sample = pa_csv.open_csv(io.BytesIO(_csv_sample(source)),
+                                 parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'))
+        null_columns = {field.name: pa.string() for field in sample.schema if pa.types.is_null(field.type)}
+        sample.close()
+    except pa.ArrowInvalid:
+        null_columns = {}
+    reader = pa_csv.open_csv(_rewind(source), convert_options=pa_csv.ConvertOptions(column_types=null_columns))
+    with reader:
+        try:
+            for batch in reader:
+                yield from _split(batch, batch_size)
+        except pa.ArrowInvalid as e:
+            match = re.match(r"In CSV column #(\d+): (.*)", str(e))
+            if match is None or 'conversion error' not in str(e):
+                raise
+            column = reader.schema.names[int(match.group(1))]
+            raise ValueError(f"Column '{column}' of the CSV file changes type after its first rows, which set its type "
+                             f"to {reader.schema.field(column).type}: {match.group(2)}") from e
+
+
+def _ndjson_batches(source, batch_size: int):
+    for batch in pa_json.open_json(_rewind(source)):
+        yield from _split(batch, batch_size)
+
+
+def _xlsx_batches(source, batch_size: int):
+    # imported here so the converter doesn't need openpyxl until an Excel file is used
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rewind(source), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = [str(name) if name is not None else f"column_{position}" for position, name in enumerate(header)]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == batch_size:
+                yield pa.RecordBatch.from_arrays([_array([row[position] if position < len(row) else None for row in buffer])
+                                                  for position in range(len(names))], names=names)
+                buffer = []
+        if buffer:
+            yield pa.RecordBatch.from_arrays([_array([row[position] if position < len(row) else None for row in buffer])
+                                              for position in range(len(names))], names=names)
+    finally:
+        workbook.close()
+
+
+def _frame_batches(dataframe: pd.DataFrame, batch_size: int):
+    for start in range(0, len(dataframe), batch_size):
+        chunk = dataframe.iloc[start:start + batch_size]
+        try:
+            yield pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            yield pa.RecordBatch.from_arrays([_array(chunk[column].tolist()) for column in chunk.columns],
+                                             names=[str(column) for column in chunk.columns])
+
+
+def _is_json_lines(source) -> bool:
+    """Check whether a .json file holds one record per line rather than a single array."""
+    head = _rewind(source).read(4096)
+    _rewind(source)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+    return not head.lstrip().startswith('[')
+
+
+def iter_batches(
+        source,
+        file_type: str,
+        batch_size: int = Config.CONVERTER_BATCH_ROWS
+    ):
+    """Read a file as a stream of Arrow record batches of at most `batch_size` rows.
+
+    CSV, NDJSON, Parquet and XLSX files are streamed, so memory stays bounded by the batch
+    size. A JSON array and legacy `.xls` files can't be read incrementally and are parsed whole.
+
+    :param source: Path or binary file-like object, e.g. a Streamlit upload.
+    :param file_type: File extension, one of `INPUT_FORMATS`.
+    :type file_type: str
+    :param batch_size: Maximum number of rows per batch.
+    :type batch_size: int, optional
+
+    :return: Iterator of `pyarrow.RecordBatch`.
+    """
+    file_type = file_type.lower().lstrip('.')
+    if file_type == 'csv':
+        return _csv_batches(source, batch_size)
+    elif file_type in ('ndjson', 'jsonl') or (file_type == 'json' and _is_json_lines(source)):
+        return _ndjson_batches(source, batch_size)
+    elif file_type == 'json':
+        return _frame_batches(pd.read_json(_rewind(source)), batch_size)
+    elif file_type == 'parquet':
+        return pq.ParquetFile(_rewind(source)).iter_batches(batch_size=batch_size)
+    elif file_type == 'xlsx':
+        return _xlsx_batches(source, batch_size)
+    elif file_type == 'xls':
+        return _frame_batches(pd.read_excel(_rewind(source)), batch_size)
+    raise ValueError(f"Unsupported file type: {file_type}. Choose one of {', '.join(INPUT_FORMATS)}.")
+
+
+def read_file(
+        source,
+        file_type: str,
+        nrows: int = 1000
+    ) -> pd.DataFrame:
+    """Read the first rows of a file for a preview without loading the whole file.
+
+    :param source: Path or binary file-like object.
+    :param file_type: File extension, one of `INPUT_FORMATS`.
+    :type file_type: str
+    :param nrows: Number of rows to read.
+    :type nrows: int, optional
+        Default is 1000.
+
+    :return: The first rows of the file.
+    :rtype: pd.DataFrame
+    """
+    batches = []
+    rows = 0
+    for batch in iter_batches(source, file_type, batch_size=nrows):
+        batches.append(batch.slice(0, nrows - rows))
+        rows += batches[-1].num_rows
+        if rows >= nrows:
+            break
+    _rewind(source)
+    if not batches:
+        return pd.DataFrame()
+    return pa.Table.from_batches(batches).to_pandas()
+
+
+def _conform(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """Cast a batch to the schema of the first batch, e.g. when a later batch inferred other types."""
+    if batch.schema.equals(schema):
+        return batch
+    try:
+        return batch.select(schema.names).cast(schema)
+    except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as error:
+        raise ValueError(f"Column types changed between batches and can't be reconciled: {error}") from error
+
+
+def _first_schema(batch: pa.RecordBatch) -> pa.Schema:
+    # columns that were empty in the first batch are written as text
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in batch.schema])
+
+
+def _write_csv(batches, sink):
+    writer = None
+    for batch in batches:
+        if writer is None:
+            schema = _first_schema(batch)
+            writer = pa_csv.CSVWriter(sink, schema)
+        writer.write_batch(_conform(batch, schema))
+        yield batch.num_rows
+    if writer is not None:
+        writer.close()
+
+
+def _write_ndjson(batches, sink):
+    for batch in batches:
+        sink.write(batch.to_pandas().to_json(orient='records', lines=True, date_format='iso').encode())
+        if batch.num_rows:
+            sink.write(b'\n')
+        yield batch.num_rows
+
+
+def _write_parquet(batches, sink, compression: str):
+    writer = None
+    for batch in batches:
+        if writer is None:
+            schema = _first_schema(batch)
+            writer = pq.ParquetWriter(sink, schema, compression=compression or 'none')
+        writer.write_batch(_conform(batch, schema))
+        yield batch.num_rows
+    if writer is not None:
+        writer.close()
+
+
+def _write_xlsx(batches, sink):
+    from openpyxl import Workbook
+
+    # a write-only workbook streams rows to temporary files instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, header = None, 0, None
+    for batch in batches:
+        header = header or batch.schema.names
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            if sheet is None or sheet_rows == _EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(header)
+                sheet_rows = 1
+            sheet.append([value.replace(tzinfo=None) if hasattr(value, 'tzinfo') and value.tzinfo else value
+                          for value in row])
+            sheet_rows += 1
+        yield batch.num_rows
+    if sheet is None:
+        workbook.create_sheet("Sheet1")
+    workbook.save(sink)
+
+
+def output_name(file_name: str, target_type: str, compression: str = None) -> str:
+    """Return the download name of a converted file, e.g. `sales.csv` -> `sales.parquet`."""
+    stem = file_name.rsplit('.', 1)[0]
+    extension = 'ndjson' if target_type == 'json' else target_type
+    suffix = _TEXT_COMPRESSION[compression][1] if target_type in _TEXT_FORMATS and compression in _TEXT_COMPRESSION else ''
+    return f"{stem}.{extension}{suffix}"
+
+
+def write_batches(
+        batches,
+        target_type: str,
+        sink=None,
+        compression: str = None
+    ) -> tuple:
+    """Write a stream of Arrow record batches to a file format, one batch at a time.
+
+    :param batches: Iterable of `pyarrow.RecordBatch`, e.g. from `iter_batches`.
+    :param target_type: Output format, one of `OUTPUT_FORMATS`.
+    :type target_type: str
+    :param sink: Binary file-like object to write to. A new `io.BytesIO` is used when None,
+        which can be passed straight to `st.download_button`.
+    :param compression: `gzip` or `bz2` for CSV and NDJSON; `snappy`, `gzip`, `zstd`, `brotli`
+        or `lz4` for Parquet. XLSX files are always zip-compressed.
+    :type compression: str, optional
+
+    :return: The sink, rewound to the start, and a report with the `rows`, `batches`,
+        `seconds` and `output_bytes` written.
+    :rtype: tuple
+    """
+    target_type = target_type.lower().lstrip('.')
+    if target_type not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {target_type}. Choose one of {', '.join(OUTPUT_FORMATS)}.")
+    if compression is not None:
+        allowed = tuple(_TEXT_COMPRESSION) if target_type in _TEXT_FORMATS else PARQUET_COMPRESSION if target_type == 'parquet' else ()
+        if compression not in allowed:
+            raise ValueError(f"Compression '{compression}' is not supported for {target_type}.")
+
+    started = time.perf_counter()
+    sink = io.BytesIO() if sink is None else sink
+    target = sink
+    if target_type in _TEXT_FORMATS and compression in _TEXT_COMPRESSION:
+        target = _TEXT_COMPRESSION[compression][0](fileobj=sink, mode='wb') if compression == 'gzip' \
+            else _TEXT_COMPRESSION[compression][0](sink, mode='wb')
+
+    if target_type == 'csv':
+        written = _write_csv(batches, target)
+    elif target_type in ('ndjson', 'json'):
+        written = _write_ndjson(batches, target)
+    elif target_type == 'parquet':
+        written = _write_parquet(batches, target, compression)
+    else:
+        written = _write_xlsx(batches, target)
+
+    rows = batch_count = 0
+    for batch_rows in written:
+        rows += batch_rows
+        batch_count += 1
+    if target is not sink:
+        target.close()
+
+    report = {
+        "rows": rows,
+        "batches": batch_count,
+        "seconds": time.perf_counter() - started,
+        "output_bytes": sink.tell() if hasattr(sink, 'tell') else None,
+    }
+    _rewind(sink)
+    return sink, report
+
+
+def convert(
+        source,
+        source_type: str,
+        target_type: str,
+        sink=None,
+        compression: str = None,
+        batch_size: int = Config.CONVERTER_BATCH_ROWS
+    ) -> tuple:
+    """Convert a file between formats one record batch at a time.
+
+    Only one batch of rows is held in memory, so converting a file much larger than RAM (e.g.
+    a multi-GB CSV to Parquet) works as long as the output fits in `sink`.
+
+    :param source: Path or binary file-like object to convert.
+    :param source_type: Input file extension, one of `INPUT_FORMATS`.
+    :type source_type: str
+    :param target_type: Output format, one of `OUTPUT_FORMATS`.
+    :type target_type: str
+    :param sink: Binary file-like object to write to, see `write_batches`.
+    :param compression: Output compression, see `write_batches`.
+    :type compression: str, optional
+    :param batch_size: Maximum number of rows per batch.
+    :type batch_size: int, optional
+
+    :return: The sink, rewound to the start, and a report with the `rows`, `batches`,
+        `seconds` and `output_bytes` of the conversion.
+    :rtype: tuple
+    """
+    return write_batches(iter_batches(source, source_type, batch_size), target_type, sink, compression)
@@ -1,39 +1,212 @@
+import asyncio
+import json
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
-def configure_gemini():
+import pandas as pd
+
+from .cache import hash_bytes
+from .config import Config
+
+# bump when the prompt changes so cached explanations of the old prompt are not reused
+PROMPT_VERSION = 1
+
+PROMPT = """"Please interpret the correlation matrix in detail,
+                explaining the relationships between the variables in a clear and concise manner.
+                Avoid using symbols like asterisks or double asterisks for formatting.
+                Focus on providing a human-readable explanation that is easy to understand:\n{corr_matrix}\n"""
+
+
+class GeminiBackend:
+    """Generates text with the Gemini API. The SDK is imported and configured on first use."""
+
+    name = 'gemini'
+
+    def __init__(self, model_name: str = Config.GEMINI_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = configure_gemini(self.model_name)
+            return self._model
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+
+class StubBackend:
+    """A local backend that answers without any network call, for tests and benchmarks.
+
+    :param delay: Seconds to wait before answering, to simulate API latency.
+    :type delay: float, optional
+    """
+
+    name = 'stub'
+    model_name = None
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"Stub explanation of a {len(prompt.splitlines())}-line prompt."
+
+
+BACKENDS = {'gemini': GeminiBackend, 'stub': StubBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+# limits concurrent API calls across every session of the app; a call gives its slot back when it times out
+_request_slots = threading.BoundedSemaphore(Config.LLM_MAX_CONCURRENCY)
+# threads calling the API, shared by every session. Calls that timed out keep running here until the API
+# answers, so there is room for them next to the calls holding a slot
+_request_pool = ThreadPoolExecutor(max_workers=2 * Config.LLM_MAX_CONCURRENCY, thread_name_prefix='quickvu-llm')
+
+
+def configure_gemini(model_name: str = Config.GEMINI_MODEL):
     """
     Load API key from .env file and configure the Gemini model.
     :return: A configured Gemini model instance.
     """
+    # the SDK is slow to import, so it is only loaded once an explanation is requested
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+
     load_dotenv()
 
     # Check if API key is loaded
     api_key = os.getenv('GEMINI_API_KEY')
     if api_key is None:
         raise ValueError("API_KEY not found! Please check your .env file.")
-    
+
     # Configure and return Gemini model
     genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-1.5-flash')
+    return genai.GenerativeModel(model_name)
 
-gemini_model = configure_gemini()
 
+def get_backend():
+    """Return the backend named by `Config.LLM_BACKEND`, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if Config.LLM_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown LLM backend '{Config.LLM_BACKEND}'. Choose one of {', '.join(BACKENDS)}.")
+            _backend = BACKENDS[Config.LLM_BACKEND]()
+        return _backend
 
-def explain_correlation_matrix(corr_matrix):
+
+def set_backend(backend):
+    """Replace the backend, e.g. with a `StubBackend` in tests. None goes back to the configured one."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(Config.EXPLANATION_CACHE_DIR, f"{key}.json")
+
+
+def _read_cached(key: str):
+    try:
+        with open(_cache_path(key), encoding='utf-8') as file:
+            return json.load(file)["text"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cached(key: str, text: str):
+    os.makedirs(Config.EXPLANATION_CACHE_DIR, exist_ok=True)
+    # write to a temporary file first so a concurrent reader never sees half a file
+    temporary = f"{_cache_path(key)}.{threading.get_ident()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({"prompt_version": PROMPT_VERSION, "text": text}, file)
+    os.replace(temporary, _cache_path(key))
+
+
+def _prompt_and_key(corr_matrix, decimals: int, backend) -> tuple[str, str]:
+    if isinstance(corr_matrix, pd.DataFrame):
+        # rounding makes the key stable against float noise from recomputing the same matrix
+        corr_matrix = corr_matrix.round(decimals).to_string()
+    # explanations of one backend or model are never served for another
+    source = f"{getattr(backend, 'name', type(backend).__name__)}|{getattr(backend, 'model_name', None)}"
+    return PROMPT.format(corr_matrix=corr_matrix), hash_bytes(f"{PROMPT_VERSION}|{source}|{corr_matrix}".encode())
+
+
+async def explain_correlation_matrix_async(
+        corr_matrix,
+        timeout: float = Config.LLM_TIMEOUT_SECONDS,
+        decimals: int = 2,
+        backend=None
+    ) -> str:
+    """
+    Fetch an explanation for a correlation matrix without blocking the event loop.
+
+    Runs `explain_correlation_matrix` in a thread, see there.
+
+    :param corr_matrix: The correlation matrix, as a DataFrame or its string representation.
+    :param timeout: Seconds to wait for the API before giving up.
+    :param decimals: Decimals the matrix is rounded to in the prompt and the cache key.
+    :param backend: Backend to generate with, defaults to `get_backend()`.
+    :return: Explanation text from the model, or an error message.
+    """
+    return await asyncio.to_thread(explain_correlation_matrix, corr_matrix, timeout, decimals, backend)
+
+
+def explain_correlation_matrix(
+        corr_matrix,
+        timeout: float = Config.LLM_TIMEOUT_SECONDS,
+        decimals: int = 2,
+        backend=None
+    ) -> str:
     """
     Fetch an explanation for a correlation matrix from the Gemini API.
-    
-    :param corr_matrix: A string representation of the correlation matrix.
-    :return: Explanation text from the Gemini model.
+
+    Explanations are cached on disk, keyed by the rounded matrix, `PROMPT_VERSION` and the
+    backend and model, so the same matrix is only sent to the API once. At most `Config.LLM_MAX_CONCURRENCY`
+    requests run at the same time. The call returns after at most `timeout` seconds, waiting
+    for a free request slot included; a request that times out is left to finish in the
+    background and its answer is dropped. Pages run this off the script thread with
+    `jobs.explain_correlation`.
+
+    :param corr_matrix: The correlation matrix, as a DataFrame or its string representation.
+    :param timeout: Seconds to wait for the API before giving up.
+    :param decimals: Decimals the matrix is rounded to in the prompt and the cache key.
+    :param backend: Backend to generate with, defaults to `get_backend()`.
+    :return: Explanation text from the model, or an error message.
     """
-    prompt = f""""Please interpret the correlation matrix in detail, 
-                explaining the relationships between the variables in a clear and concise manner. 
-                Avoid using symbols like asterisks or double asterisks for formatting. 
-                Focus on providing a human-readable explanation that is easy to understand:\n{corr_matrix}\n"""
     try:
-        response = gemini_model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error: {str(e)}"
\ No newline at end of file
+        backend = backend or get_backend()
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    prompt, key = _prompt_and_key(corr_matrix, decimals, backend)
+    cached = _read_cached(key)
+    if cached is not None:
+        return cached
+
+    timed_out = f"Error: the explanation took longer than {timeout:g} seconds, please try again."
+    deadline = time.monotonic() + timeout
+    if not _request_slots.acquire(timeout=timeout):
+        return timed_out
+    try:
+        future = _request_pool.submit(backend.generate, prompt)
+        try:
+            text = future.result(max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            # not waited for: a request still queued is dropped, a running one finishes on its own
+            future.cancel()
+            return timed_out
+        except Exception as e:
+            return f"Error: {str(e)}"
+    finally:
+        _request_slots.release()
+    _write_cached(key, text)
+    return text
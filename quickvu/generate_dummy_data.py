@@ -1,49 +1,205 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
-np.random.seed(0)
+DEPARTMENTS = ['Sales', 'Engineering', 'HR', 'Marketing']
+GENDERS = ['Male', 'Female']
+COMMENTS = ['Good performance', 'Needs improvement']
+
+
+def _generate_chunk(
+        start: int,
+        num_rows: int,
+        seed: np.random.SeedSequence,
+        null_rate: float,
+        outlier_rate: float,
+        duplicate_rate: float,
+        cardinality: dict
+    ) -> pd.DataFrame:
+    """Generate rows `start + 1` to `start + num_rows` of the dataset from their own random stream."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start + 1, start + num_rows + 1)
+    cardinality = cardinality or {}
+
+    names = cardinality.get('Name')
+    name_numbers = ids if names is None else rng.integers(1, names + 1, num_rows)
+    department_count = cardinality.get('Department', len(DEPARTMENTS))
+    departments = np.array((DEPARTMENTS + [f'Department_{index}' for index in range(len(DEPARTMENTS), department_count)])[:department_count],
+                           dtype=object)
+    data = {
+        'ID': ids,
+        'Name': np.char.add('Person_', name_numbers.astype(str)).astype(object),
+        'Age': rng.integers(18, 60, num_rows).astype(float),  # Random ages between 18 and 60
+        'Salary': rng.normal(50000, 12000, num_rows),  # Normally distributed salary
+        'Gender': np.array(GENDERS, dtype=object)[rng.integers(0, len(GENDERS), num_rows)],
+        'Department': departments[rng.integers(0, len(departments), num_rows)],
+        'Joining_Date': (np.datetime64('2020-01-01', 'ns')
+                         + rng.integers(0, cardinality.get('Joining_Date', 365), num_rows).astype('timedelta64[D]')),
+        'Performance_Score': rng.normal(70, 10, num_rows),  # Normally distributed performance score
+        'Comments': np.array(COMMENTS, dtype=object)[(ids - 1) % 2],
+    }
+
+    # Introduce some NaN values
+    for column in ('Age', 'Salary', 'Comments'):
+        data[column][rng.random(num_rows) < null_rate] = np.nan if column != 'Comments' else None
+
+    # Add some outliers in the 'Salary', 'Performance_Score' and 'Age' columns
+    data['Salary'][rng.random(num_rows) < outlier_rate] = 200000  # Very high salaries as outliers
+    data['Performance_Score'][rng.random(num_rows) < outlier_rate] = 5  # Very low performance scores as outliers
+    data['Age'][rng.random(num_rows) < outlier_rate / 3] = 98  # Very high ages as outliers
+
+    # Exact copies of earlier rows of the chunk, so duplicate removal has something to find.
+    # Sources are only drawn from rows that are not copies themselves, so every copy stays a
+    # duplicate and the share of duplicate rows matches `duplicate_rate`.
+    is_duplicate = rng.random(num_rows) < duplicate_rate
+    is_duplicate[0] = False
+    duplicates = np.flatnonzero(is_duplicate)
+    if len(duplicates):
+        originals = np.flatnonzero(~is_duplicate)
+        earlier_originals = np.searchsorted(originals, duplicates)
+        sources = originals[(rng.random(len(duplicates)) * earlier_originals).astype(int)]
+        for values in data.values():
+            values[duplicates] = values[sources]
+
+    return pd.DataFrame(data)
+
+
+def _generate_chunk_args(args: tuple) -> pd.DataFrame:
+    return _generate_chunk(*args)
+
+
+def iter_test_data(
+        num_rows: int = 100,
+        chunk_size: int = 1_000_000,
+        seed: int = 0,
+        null_rate: float = 0.05,
+        outlier_rate: float = 0.03,
+        duplicate_rate: float = 0.0,
+        cardinality: dict = None,
+        max_workers: int = 1
+    ):
+    """Generate the dummy employee dataset as a stream of DataFrame chunks.
+
+    Each chunk draws from its own `numpy.random.Generator`, seeded by spawning `seed`, so the
+    output only depends on `seed` and `chunk_size`, not on the number of workers.
+
+    :param num_rows: Total number of rows.
+    :type num_rows: int, optional
+    :param chunk_size: Rows per chunk.
+    :type chunk_size: int, optional
+    :param seed: Seed of the whole dataset.
+    :type seed: int, optional
+    :param null_rate: Share of missing values in `Age`, `Salary` and `Comments`.
+    :type null_rate: float, optional
+    :param outlier_rate: Share of outliers in `Salary` and `Performance_Score` (a third of that in `Age`).
+    :type outlier_rate: float, optional
+    :param duplicate_rate: Share of rows that are exact copies of an earlier row of their chunk.
+    :type duplicate_rate: float, optional
+    :param cardinality: Number of distinct values per column, for `Name`, `Department` and
+        `Joining_Date` (days), e.g. `{'Department': 50}`. By default every name is unique.
+    :type cardinality: dict, optional
+    :param max_workers: Number of processes generating chunks in parallel.
+    :type max_workers: int, optional
 
-def generate_test_data(num_rows=100):
+    :return: Iterator of DataFrames, in row order.
+    """
+    starts = range(0, num_rows, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(start, min(chunk_size, num_rows - start), chunk_seed, null_rate, outlier_rate, duplicate_rate, cardinality)
+             for start, chunk_seed in zip(starts, seeds)]
+    if max_workers == 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _generate_chunk(*task)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # map keeps the chunk order while the next chunks are generated
+        yield from pool.map(_generate_chunk_args, tasks)
+
+
+def generate_test_data(num_rows=100, seed=0, **options):
     """Generates a DataFrame of dummy employee data with specified attributes and introduces some NaN values and outliers.
 
     :param num_rows: The number of rows to generate in the DataFrame, defaults to 100.
     :type num_rows: int, optional
+    :param seed: Seed of the random streams, the same seed gives the same data.
+    :type seed: int, optional
+    :param options: Rates, cardinality, chunk size and workers, see `iter_test_data`.
 
     :return: A DataFrame containing synthetic employee data with columns for ID, Name, Age, Salary, Gender, Department, Joining_Date, Performance_Score, and Comments.
     :rtype: pandas.DataFrame
     """
-    data = {
-        'ID': np.arange(1, num_rows + 1),
-        'Name': [f'Person_{i}' for i in range(1, num_rows + 1)],
-        'Age': np.random.randint(18, 60, size=num_rows).astype(float),  # Random ages between 18 and 60
-        'Salary': np.random.normal(50000, 12000, size=num_rows),  # Normally distributed salary
-        'Gender': np.random.choice(['Male', 'Female'], size=num_rows),
-        'Department': np.random.choice(['Sales', 'Engineering', 'HR', 'Marketing'], size=num_rows),
-        'Joining_Date': pd.to_datetime('2020-01-01') + pd.to_timedelta(np.random.randint(0, 365, num_rows), unit='D'),
-        'Performance_Score': np.random.normal(70, 10, size=num_rows),  # Normally distributed performance score
-        'Comments': ['Good performance' if i % 2 == 0 else 'Needs improvement' for i in range(num_rows)]
-    }
-    
-    # Introduce some NaN values
-    data['Age'][np.random.choice(num_rows, 10, replace=False)] = np.nan
-    data['Salary'][np.random.choice(num_rows, 5, replace=False)] = np.nan
-    data['Comments'] = pd.Series(['Good performance' if i % 2 == 0 else 'Needs improvement' for i in range(num_rows)])
-
-    # Use .iloc to assign None to random rows in 'Comments' based on their integer position, 
-    # as direct indexing with a list of integers can cause errors in pandas.
-    random_indices = np.random.choice(num_rows, 8, replace=False)
-    data['Comments'].iloc[random_indices] = None
-
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Add some outliers in the 'Salary' and 'Performance_Score' columns
-    df.loc[np.random.choice(num_rows, 3, replace=False), 'Salary'] = 200000  # Very high salaries as outliers
-    df.loc[np.random.choice(num_rows, 3, replace=False), 'Performance_Score'] = 5  # Very low performance scores as outliers
-    df.loc[np.random.choice(num_rows, 1, replace=False), 'Age'] = 98  # Very low performance scores as outliers
-    
-    
-    return df
-
-dummy_data = generate_test_data(100)
-dummy_data.to_csv(r"..\dataset\prepper_test_data.csv", index=False)
+    return pd.concat(iter_test_data(num_rows, seed=seed, **options), ignore_index=True)
+
+
+def write_test_data(
+        path: str,
+        num_rows: int,
+        file_format: str = None,
+        **options
+    ) -> int:
+    """Stream the dummy dataset to a CSV or Parquet file, one chunk at a time.
+
+    :param path: Output file.
+    :type path: str
+    :param num_rows: Total number of rows.
+    :type num_rows: int
+    :param file_format: `csv` or `parquet`, taken from the file extension when None.
+    :type file_format: str, optional
+    :param options: Seed, rates, cardinality, chunk size and workers, see `iter_test_data`.
+
+    :return: Number of rows written.
+    :rtype: int
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError("Invalid file format. Choose 'csv' or 'parquet'.")
+
+    rows = 0
+    if file_format == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            for chunk in iter_test_data(num_rows, **options):
+                chunk.to_csv(file, header=rows == 0, index=False)
+                rows += len(chunk)
+        return rows
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in iter_test_data(num_rows, **options):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic employee dataset for tests and load testing.")
+    parser.add_argument('--rows', type=lambda value: int(float(value)), default=100)
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset', 'prepper_test_data.csv'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--null-rate', type=float, default=0.05)
+    parser.add_argument('--outlier-rate', type=float, default=0.03)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0)
+    parser.add_argument('--departments', type=int, default=len(DEPARTMENTS), help="number of distinct departments")
+    parser.add_argument('--names', type=int, default=None, help="number of distinct names, unique per row by default")
+    args = parser.parse_args()
+
+    cardinality = {'Department': args.departments}
+    if args.names:
+        cardinality['Name'] = args.names
+    written = write_test_data(args.output, args.rows, seed=args.seed, chunk_size=args.chunk_size, max_workers=args.workers,
+                              null_rate=args.null_rate, outlier_rate=args.outlier_rate,
+                              duplicate_rate=args.duplicate_rate, cardinality=cardinality)
+    print(f"Wrote {written:,} rows to {args.output}")
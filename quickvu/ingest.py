@@ -0,0 +1,327 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_numeric_dtype,
+    is_object_dtype,
+    is_string_dtype,
+)
+
+
+def infer_schema(
+        sample: pd.DataFrame,
+        category_ratio: float = 0.5
+    ) -> dict:
+    """Infer a compact storage type for each column from a sample of the data.
+
+    Integer and float columns are marked as numbers, and text columns whose share of
+    distinct values is at most `category_ratio` are marked to be stored as `category`.
+
+    :param sample: A sample of the dataset, usually its first rows.
+    :type sample: pd.DataFrame
+    :param category_ratio: Maximum ratio of unique to non-null values for a text column to become a category.
+    :type category_ratio: float, optional
+        Default is 0.5.
+
+    :return: Mapping of column name to `integer`, `float` or `category`. Columns left as parsed are omitted.
+    :rtype: dict
+    """
+    schema = {}
+    for column in sample.columns:
+        series = sample[column]
+        if is_bool_dtype(series):
+            continue
+        elif is_integer_dtype(series):
+            schema[column] = 'integer'
+        elif is_float_dtype(series):
+            schema[column] = 'float'
+        elif is_object_dtype(series) or is_string_dtype(series):
+            non_null = series.count()
+            if non_null and series.nunique() / non_null <= category_ratio:
+                schema[column] = 'category'
+    return schema
+
+
+def downcast_frame(
+        dataframe: pd.DataFrame,
+        schema: dict
+    ) -> pd.DataFrame:
+    """Convert the columns of a DataFrame to the compact types given by `infer_schema`.
+
+    Floats, including integer columns parsed as floats because of missing values, become
+    `float32` only when that is lossless, and text columns become `category`. Integers stay
+    `int64`: arithmetic on narrower integers (e.g. in `manipulate_columns` expressions)
+    silently wraps around. Columns whose parsed type no longer matches the schema (e.g. text
+    in a numeric column) are left untouched.
+
+    :param dataframe: The DataFrame to convert.
+    :type dataframe: pd.DataFrame
+    :param schema: Mapping of column name to compact type, as returned by `infer_schema`.
+    :type schema: dict
+
+    :return: DataFrame with compact dtypes.
+    :rtype: pd.DataFrame
+    """
+    for column, kind in schema.items():
+        if column not in dataframe.columns:
+            continue
+        series = dataframe[column]
+        if kind in ('integer', 'float') and is_float_dtype(series) and series.dtype != np.float32:
+            # floats only go to float32 when every value survives the round trip
+            values = series.to_numpy()
+            compact = values.astype(np.float32)
+            with np.errstate(invalid='ignore'):
+                lossless = (compact == values) | np.isnan(values)
+            if lossless.all():
+                dataframe[column] = compact
+        elif kind == 'category' and not isinstance(series.dtype, pd.CategoricalDtype):
+            if not (is_object_dtype(series) or is_string_dtype(series)):
+                series = series.astype(object).map(str, na_action='ignore')
+            dataframe[column] = series.astype('category')
+    return dataframe
+
+
+def _concat_chunks(chunks: list) -> pd.DataFrame:
+    """Concatenate chunks, unifying per-chunk categories so category columns stay `category`."""
+    if len(chunks) == 1:
+        return chunks[0]
+    for column in chunks[0].columns:
+        dtypes = [chunk[column].dtype for chunk in chunks]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = pd.Index([])
+            for dtype in dtypes:
+                categories = categories.union(dtype.categories, sort=False)
+            unified = pd.CategoricalDtype(categories)
+            for chunk in chunks:
+                chunk[column] = chunk[column].astype(unified)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv_compact(
+        source,
+        chunksize: int = 100_000,
+        sample_rows: int = 10_000,
+        category_ratio: float = 0.5,
+        **read_csv_kwargs
+    ) -> tuple[pd.DataFrame, dict]:
+    """Read a CSV in chunks, storing each chunk with compact dtypes as it arrives.
+
+    The schema is inferred from the first `sample_rows` rows and applied to every chunk, so
+    only one chunk at default pandas dtypes is held in memory at a time. The returned frame
+    has plain numeric and `category` columns that the `prepare_data` functions accept as is.
+
+    :param source: Path or binary file object of the CSV file.
+    :param chunksize: Number of rows parsed per chunk.
+    :type chunksize: int, optional
+        Default is 100,000.
+    :param sample_rows: Number of leading rows used to infer the schema.
+    :type sample_rows: int, optional
+        Default is 10,000.
+    :param category_ratio: Maximum ratio of unique to non-null values for a text column to become a category.
+    :type category_ratio: float, optional
+        Default is 0.5.
+    :param read_csv_kwargs: Extra keyword arguments passed to `pd.read_csv`.
+
+    :return: The dataset and a report with the schema used and the memory before and after downcasting.
+    :rtype: tuple[pd.DataFrame, dict]
+    """
+    reader = pd.read_csv(source, chunksize=max(chunksize, sample_rows), **read_csv_kwargs)
+    schema = None
+    chunks = []
+    memory_before = memory_after = 0
+
+    with reader:
+        for chunk in reader:
+            if schema is None:
+                schema = infer_schema(chunk.head(sample_rows), category_ratio)
+            memory_before += int(chunk.memory_usage(deep=True).sum())
+            chunk = downcast_frame(chunk, schema)
+            memory_after += int(chunk.memory_usage(deep=True).sum())
+            chunks.append(chunk)
+
+    dataframe = _concat_chunks(chunks)
+    report = {
+        "rows": len(dataframe),
+        "chunks": len(chunks),
+        "schema": {column: str(dtype) for column, dtype in dataframe.dtypes.items()},
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+        "memory_saved": memory_before - memory_after,
+    }
+    return dataframe, report
+
+
+def match_columns(shard_columns: list) -> tuple[list, list]:
+    """Match the columns of several shards by their `standardize_column_names` name.
+
+    Columns spelled differently across shards (e.g. `Store ID` and `store_id`) are the same
+    column and keep the spelling of the first shard that has it.
+
+    :param shard_columns: The column names of each shard, in shard order.
+    :type shard_columns: list
+
+    :return: The reconciled column names, in order of first appearance, and for each shard a
+        mapping of its column names to the reconciled ones.
+    :rtype: tuple[list, list]
+    """
+    # imported here, prepare_data pulls in the cleaning code the ingestion code otherwise does not need
+    from .prepare_data import standardize_column_names
+
+    reconciled = {}
+    mappings = []
+    for columns in shard_columns:
+        keys = standardize_column_names(pd.DataFrame(columns=[str(column) for column in columns])).columns
+        if keys.has_duplicates:
+            duplicated = [column for column, key in zip(columns, keys) if key in set(keys[keys.duplicated()])]
+            raise ValueError(f"Columns {duplicated} have the same standardized name. Rename them before combining files.")
+        mappings.append({column: reconciled.setdefault(key, column) for column, key in zip(columns, keys)})
+    return list(reconciled.values()), mappings
+
+
+def widen_dtypes(dtypes: list, missing: bool = False):
+    """Return the narrowest dtype holding the values of every dtype in `dtypes`.
+
+    Numbers widen to the smallest common numeric type (integers and floats give a float), text
+    mixed with `category` stays a `category` (the categories are unified when the columns are
+    combined), and anything else mixed falls back to `object`.
+
+    :param dtypes: The dtypes of one column in each shard that has it.
+    :type dtypes: list
+    :param missing: Whether some shards lack the column, whose rows then need a missing value.
+    :type missing: bool, optional
+        Default is False.
+
+    :return: The widened dtype, `category` for a category of unified categories.
+    :rtype: np.dtype | pd.api.extensions.ExtensionDtype | str
+    """
+    if all(isinstance(dtype, pd.CategoricalDtype) or is_object_dtype(dtype) for dtype in dtypes) \
+            and any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        return 'category'
+    if not all(isinstance(dtype, np.dtype) for dtype in dtypes):
+        if all(is_numeric_dtype(dtype) and not is_bool_dtype(dtype) for dtype in dtypes) \
+                and any(isinstance(dtype, np.dtype) for dtype in dtypes):
+            # nullable and plain numbers meet at a float, with NaN for the missing values
+            return np.dtype(np.float64)
+        # extension dtypes (nullable integers, strings, dates with a timezone) are only kept when they all agree
+        return dtypes[0] if all(dtype == dtypes[0] for dtype in dtypes) else np.dtype(object)
+    kinds = {dtype.kind for dtype in dtypes}
+    if len(kinds) == 1 and kinds <= set('OfMm'):
+        # text, floats, dates and durations all have a missing value of their own
+        return np.result_type(*dtypes)
+    if kinds <= set('iuf'):
+        widened = np.result_type(*dtypes)
+        # integers cannot hold the missing values of shards without the column
+        return np.result_type(widened, np.float32) if missing else widened
+    if kinds == {'b'} and not missing:
+        return np.dtype(bool)
+    return np.dtype(object)
+
+
+def _combine_column(parts: list, lengths: list, dtype) -> tuple:
+    """Write the parts of one column straight into a single array of the widened dtype.
+
+    :param parts: The column of each shard, None for shards without it.
+    :param lengths: The number of rows of each shard.
+    :param dtype: The widened dtype, see `widen_dtypes`.
+
+    :return: The combined column as an array or `pd.Categorical`.
+    """
+    total = sum(lengths)
+    if dtype == 'category':
+        categories = pd.Index([])
+        for part in parts:
+            if part is None:
+                continue
+            values = part.cat.categories if isinstance(part.dtype, pd.CategoricalDtype) else pd.Index(part.dropna().unique())
+            categories = categories.union(values, sort=False)
+        codes = np.empty(total, dtype=np.int8 if len(categories) < 2 ** 7 else np.int16 if len(categories) < 2 ** 15 else np.int32)
+        start = 0
+        for part, length in zip(parts, lengths):
+            if part is None:
+                codes[start:start + length] = -1
+            elif isinstance(part.dtype, pd.CategoricalDtype):
+                # recode the shard's codes to positions in the unified categories
+                recode = np.append(categories.get_indexer(part.cat.categories), -1)
+                codes[start:start + length] = recode[part.cat.codes.to_numpy()]
+            else:
+                codes[start:start + length] = categories.get_indexer(part)
+            start += length
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+    if not isinstance(dtype, np.dtype):
+        # extension dtypes have no preallocated buffer to write into
+        filled = [part if part is not None else pd.Series(index=pd.RangeIndex(length), dtype=dtype)
+                  for part, length in zip(parts, lengths)]
+        return pd.concat(filled, ignore_index=True).astype(dtype, copy=False).array
+
+    values = np.empty(total, dtype=dtype)
+    missing_value = {'O': None, 'M': np.datetime64('NaT'), 'm': np.timedelta64('NaT')}.get(dtype.kind, np.nan)
+    start = 0
+    for part, length in zip(parts, lengths):
+        if part is None:
+            values[start:start + length] = missing_value
+        elif dtype.kind == 'O':
+            # object arrays get the values themselves, e.g. Timestamps rather than integer nanoseconds
+            values[start:start + length] = part.to_numpy(dtype=object)
+        elif not isinstance(part.dtype, np.dtype):
+            values[start:start + length] = part.to_numpy(dtype=dtype, na_value=missing_value)
+        else:
+            values[start:start + length] = part.to_numpy()
+        start += length
+    return values
+
+
+def reconcile_frames(
+        frames: list,
+        names: list = None
+    ) -> tuple[pd.DataFrame, dict]:
+    """Combine shards of one dataset whose column names and dtypes drifted apart.
+
+    Columns are matched with `match_columns`, dtypes are widened with `widen_dtypes`, and
+    rows of a shard without some column are missing in it. Each column is written once into
+    an array of its final dtype, so no widened copy of a shard and no intermediate frame is
+    built along the way; `pd.concat` would instead cast every shard and then copy it again.
+
+    :param frames: The shards, in the order their rows should appear.
+    :type frames: list
+    :param names: Name of each shard, used in the report. Defaults to the shard positions.
+    :type names: list, optional
+
+    :return: The combined dataset and a report with the `renamed`, `widened` and `missing` columns.
+    :rtype: tuple[pd.DataFrame, dict]
+    """
+    if not frames:
+        raise ValueError("No files to combine.")
+    names = names or [str(position) for position in range(len(frames))]
+    columns, mappings = match_columns([frame.columns.tolist() for frame in frames])
+    lengths = [len(frame) for frame in frames]
+
+    originals = [{target: original for original, target in mapping.items()} for mapping in mappings]
+
+    renamed, widened, missing = {}, {}, {}
+    data = {}
+    for column in columns:
+        parts = []
+        for name, frame, shard_originals in zip(names, frames, originals):
+            original = shard_originals.get(column)
+            if original is None:
+                missing.setdefault(column, []).append(name)
+                parts.append(None)
+                continue
+            if original != column and original not in renamed.get(column, []):
+                renamed.setdefault(column, []).append(original)
+            parts.append(frame[original])
+        # shards without rows are parsed as text and would turn every column into `object`
+        dtypes = [part.dtype for part in parts if part is not None and len(part)] \
+            or [part.dtype for part in parts if part is not None]
+        dtype = widen_dtypes(dtypes, missing=column in missing)
+        if any(str(part_dtype) != str(dtype) for part_dtype in dtypes):
+            widened[column] = f"{', '.join(sorted({str(part_dtype) for part_dtype in dtypes}))} -> {dtype}"
+        data[column] = _combine_column(parts, lengths, dtype)
+
+    # copy=False keeps the combined arrays as they are instead of consolidating them into blocks
+    dataframe = pd.DataFrame(data, columns=columns, copy=False)
+    report = {"renamed": renamed, "widened": widened, "missing": missing}
+    return dataframe, report
@@ -0,0 +1,327 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pandas as pd
+
+from .cache import fingerprint_frame
+from .config import Config
+from .transformers import fitted_cache
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class JobContext:
+    """What a running job sees: it reports progress and checks for cancellation through it.
+
+    The state lives in a plain dict and a `threading.Event`, shared with the page.
+    """
+
+    def __init__(self, state, cancel_event):
+        self._state = state
+        self._cancel_event = cancel_event
+
+    def report(self, done: int, total: int, message: str = ''):
+        """Record progress and stop the job if it was cancelled.
+
+        Cancellation only takes effect here, so a job stops at its next report, e.g. after the
+        step or chunk it is working on.
+
+        :param done: Units of work done so far.
+        :type done: int
+        :param total: Total units of work.
+        :type total: int
+        :param message: What the job is working on.
+        :type message: str, optional
+        """
+        self.check()
+        self._state.update(done=done, total=total, message=message)
+
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check(self):
+        """Raise `JobCancelled` if the job was cancelled."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+class Job:
+    """A submitted job, as seen by the page that submitted it."""
+
+    def __init__(self, key, name: str, future, context: JobContext):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.submitted_at = time.time()
+        self.future = future
+        self.context = context
+
+    @property
+    def status(self) -> str:
+        """`queued`, `running`, `done`, `failed` or `cancelled`."""
+        if self.future.cancelled():
+            return 'cancelled'
+        if self.future.done():
+            error = self.future.exception()
+            if isinstance(error, JobCancelled):
+                return 'cancelled'
+            return 'failed' if error is not None else 'done'
+        if self.context.cancelled():
+            # cancellation was requested and the job stops at its next report
+            return 'cancelled'
+        return 'running' if self.future.running() else 'queued'
+
+    @property
+    def progress(self) -> float:
+        """Share of the work done, between 0 and 1."""
+        if self.status == 'done':
+            return 1.0
+        state = dict(self.context._state)
+        return state.get('done', 0) / state['total'] if state.get('total') else 0.0
+
+    @property
+    def message(self) -> str:
+        return dict(self.context._state).get('message', '')
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait up to `timeout` seconds for the job to finish and tell whether it did.
+
+        A cancelled job counts as finished right away, even while it runs up to its next report.
+        """
+        if self.context.cancelled():
+            return True
+        try:
+            self.future.exception(timeout)
+        except (FutureTimeoutError, CancelledError):
+            pass
+        return self.future.done()
+
+    def result(self, timeout: float = None):
+        """Return the result of the job, raising its error (or `JobCancelled`) if it has one."""
+        if self.context.cancelled() and not self.future.done():
+            raise JobCancelled()
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            raise JobCancelled() from None
+
+    def cancel(self):
+        """Cancel the job: a queued job never starts, a running one stops at its next progress report."""
+        self.context._cancel_event.set()
+        self.future.cancel()
+
+    def __repr__(self) -> str:
+        return f"Job({self.name!r}, status={self.status!r}, progress={self.progress:.0%})"
+
+
+def job_key(*parts) -> str:
+    """Build the key identifying a job from its data, operation and parameters.
+
+    DataFrames are identified by their content fingerprint, anything else by its `repr`.
+
+    :return: Hex digest of the parts.
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update((fingerprint_frame(part) if isinstance(part, pd.DataFrame) else repr(part)).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class JobRunner:
+    """Runs long operations off the Streamlit script thread.
+
+    Jobs are functions called as `func(job, *args, **kwargs)`, where `job` is a `JobContext`
+    used to report progress and to notice cancellation. A job submitted with the key of a
+    queued, running, finished or cancelled job is not run again; the existing job is returned,
+    so repeated clicks and reruns share one computation, and a cancelled job stays cancelled
+    until it is submitted with a different key (e.g. other options). Only failed jobs are
+    submitted again. The most recent `max_finished`
+    finished jobs are kept so a later rerun can pick up their results.
+
+    Jobs run in a thread pool: they take and fill the in-memory caches of the process
+    (pipeline checkpoints, fitted transformers), which worker processes could not share.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = Config.JOB_MAX_WORKERS,
+            max_finished: int = Config.JOB_MAX_FINISHED
+        ):
+        """
+        :param max_workers: Number of jobs running at the same time.
+        :type max_workers: int, optional
+        :param max_finished: Number of finished jobs kept.
+        :type max_finished: int, optional
+        """
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def submit(self, func, *args, key=None, name: str = None, **kwargs) -> Job:
+        """Submit a job, or return the job with the same key unless it failed.
+
+        :param func: The job, called as `func(job, *args, **kwargs)`.
+        :param key: Identifies the job, see `job_key`. Jobs without a key are never deduplicated.
+        :param name: Label of the job, defaults to the function name.
+        :type name: str, optional
+
+        :return: The job.
+        :rtype: Job
+        """
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.status != 'failed':
+                        return job
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='quickvu-job')
+            context = JobContext({}, threading.Event())
+            future = self._pool.submit(func, context, *args, **kwargs)
+            job = Job(key, name or getattr(func, '__name__', 'job'), future, context)
+            self._jobs[job.id] = job
+            self._prune()
+            return job
+
+    def get(self, job_id: str) -> Job:
+        """Return a job by id, or None when it is unknown or was pruned."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Cancel a job by id, if it is still known."""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, job_id: str):
+        """Drop a finished or cancelled job and its result, e.g. once the result is stored elsewhere.
+
+        A later job with the same key runs again.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and (job.future.done() or job.context.cancelled()):
+                del self._jobs[job_id]
+
+    def jobs(self) -> list:
+        """Return every known job, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+
+def run_cleaning(job: JobContext, backend, pipeline, table, **run_kwargs):
+    """Job running a cleaning `Pipeline` on a backend, with one progress report per step.
+
+    Progress and cancellation are only checked between steps: a cancelled job finishes the
+    step it is running first.
+
+    :param job: Context of the job.
+    :type job: JobContext
+    :param backend: A backend of `backends.BACKENDS`.
+    :param pipeline: The cleaning steps.
+    :type pipeline: Pipeline
+    :param table: The backend table to clean.
+    :param run_kwargs: Extra arguments of the backend's `run`, e.g. `checkpoints` and `input_key`.
+
+    :return: The cleaned table.
+    """
+    return backend.run(pipeline, table, on_step=lambda done, total, step: job.report(done, total, step.name), **run_kwargs)
+
+
+def fit_transformer(job: JobContext, backend, transformer, pipeline, table, data_key: str, **run_kwargs):
+    """Job fitting a transformer on a table as the steps of a cleaning `Pipeline` leave it.
+
+    The steps run first, with one progress report per step, and the fitted transformer is
+    kept in `transformers.fitted_cache` under `data_key`.
+
+    :param job: Context of the job.
+    :type job: JobContext
+    :param backend: A backend of `backends.BACKENDS`.
+    :param transformer: An unfitted scaler or imputer of `transformers`.
+    :param pipeline: The cleaning steps applied before fitting, may be empty.
+    :type pipeline: Pipeline
+    :param table: The backend table.
+    :param data_key: Identifies the table and the steps, see `transformers.FittedCache.fit`.
+    :type data_key: str
+    :param run_kwargs: Extra arguments of the backend's `run`, e.g. `checkpoints` and `input_key`.
+
+    :return: The fitted transformer.
+    """
+    if len(pipeline):
+        table = run_cleaning(job, backend, pipeline, table, **run_kwargs)
+    job.report(len(pipeline), len(pipeline) + 1, 'fit')
+    return fitted_cache.fit(transformer, table, data_key, backend=backend)
+
+
+def explain_correlation(job: JobContext, corr_matrix) -> str:
+    """Job fetching an explanation of a correlation matrix, see `gemini.explain_correlation_matrix`.
+
+    :param job: Context of the job.
+    :type job: JobContext
+    :param corr_matrix: The correlation matrix.
+
+    :return: The explanation, or an error message.
+    :rtype: str
+    """
+    # imported here, only pages showing explanations need the LLM backends
+    from . import gemini
+
+    job.report(0, 1, 'waiting for the model')
+    return gemini.explain_correlation_matrix(corr_matrix)
+
+
+def export_table(
+        job: JobContext,
+        backend,
+        table,
+        file_format: str = 'csv',
+        chunk_rows: int = Config.EXPORT_CHUNK_ROWS
+    ) -> bytes:
+    """Job exporting a backend table as CSV or Parquet bytes.
+
+    pandas tables are written to CSV one chunk of rows at a time, with a progress report
+    per chunk; other exports are done in a single call.
+
+    :param job: Context of the job.
+    :type job: JobContext
+    :param backend: A backend of `backends.BACKENDS`.
+    :param table: The backend table to export.
+    :param file_format: `csv` or `parquet`.
+    :type file_format: str, optional
+    :param chunk_rows: Rows per CSV chunk.
+    :type chunk_rows: int, optional
+
+    :return: The file contents.
+    :rtype: bytes
+    """
+    if backend.name != 'pandas' or file_format != 'csv':
+        job.report(0, 1, 'export')
+        return backend.export(table, file_format)
+
+    chunks = []
+    total = max(len(table), 1)
+    # an empty frame still gets its header
+    for start in range(0, total, chunk_rows):
+        job.report(start, total, 'export')
+        chunks.append(table.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8'))
+    return b''.join(chunks)
+
+
+# shared by every session; pages keep the ids of their jobs in the session state
+runner = JobRunner()
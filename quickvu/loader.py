@@ -0,0 +1,202 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from .cache import FrameCache, frame_nbytes, hash_bytes
+from .config import Config
+from .ingest import downcast_frame, infer_schema, read_csv_compact, reconcile_frames
+from .parallel import EXECUTORS
+from .utils import logger
+
+# file types `read_bytes` parses, also the members taken from zip uploads
+FILE_TYPES = ('.csv', '.xlsx', '.xls', '.json')
+
+_dataset_cache = FrameCache(max_bytes=Config.LOADER_CACHE_MAX_BYTES)
+
+
+def read_bytes(data: bytes, file_name: str) -> tuple[pd.DataFrame, dict]:
+    """Parse raw upload bytes into a compact DataFrame based on the file extension.
+
+    CSV files are streamed in chunks by `read_csv_compact`; Excel and JSON files are parsed
+    whole and then downcast with the same schema rules.
+
+    :param data: The raw file contents.
+    :type data: bytes
+    :param file_name: Name of the uploaded file, used to pick the parser.
+    :type file_name: str
+
+    :return: The parsed dataset and the ingestion report.
+    :rtype: tuple[pd.DataFrame, dict]
+    """
+    buffer = io.BytesIO(data)
+    if file_name.endswith('.csv'):
+        return read_csv_compact(buffer)
+    elif file_name.endswith(('.xlsx', '.xls')):
+        dataframe = pd.read_excel(buffer)
+    elif file_name.endswith('.json'):
+        dataframe = pd.read_json(buffer)
+    else:
+        raise ValueError(f"Unsupported file type: {file_name}. Upload a CSV, Excel, or JSON file.")
+
+    memory_before = frame_nbytes(dataframe)
+    dataframe = downcast_frame(dataframe, infer_schema(dataframe.head(10_000)))
+    memory_after = frame_nbytes(dataframe)
+    report = {
+        "rows": len(dataframe),
+        "chunks": 1,
+        "schema": {column: str(dtype) for column, dtype in dataframe.dtypes.items()},
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+        "memory_saved": memory_before - memory_after,
+    }
+    return dataframe, report
+
+
+def expand_archives(files: list) -> list:
+    """Replace zip archives by the CSV, Excel and JSON files they contain.
+
+    Directories, hidden files and macOS resource forks inside archives are skipped.
+
+    :param files: `(name, data)` pairs of the uploaded files.
+    :type files: list
+
+    :return: `(name, data)` pairs of the files to parse, archive members named `archive.zip/member.csv`.
+    :rtype: list
+    """
+    expanded = []
+    for name, data in files:
+        if not name.lower().endswith('.zip'):
+            expanded.append((name, data))
+            continue
+        members = []
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                base_name = os.path.basename(info.filename)
+                if info.is_dir() or info.filename.startswith('__MACOSX/') or base_name.startswith('.') \
+                        or not info.filename.endswith(FILE_TYPES):
+                    continue
+                members.append((f"{name}/{info.filename}", archive.read(info)))
+        if not members:
+            raise ValueError(f"{name} has no CSV, Excel, or JSON files.")
+        expanded += members
+    return expanded
+
+
+def read_shards(
+        files: list,
+        executor: str = Config.INGEST_EXECUTOR,
+        max_workers: int = Config.INGEST_MAX_WORKERS
+    ) -> tuple[pd.DataFrame, dict]:
+    """Parse the shards of one dataset in parallel and combine them with `ingest.reconcile_frames`.
+
+    Each shard is parsed and downcast by `read_bytes` on its own, so the shards are parsed
+    at the same time; their column names and dtypes are then reconciled and the rows
+    combined in shard order.
+
+    :param files: `(name, data)` pairs of the shards, zip archives already expanded.
+    :type files: list
+    :param executor: `serial`, `thread` or `process` (a process pool, which parses on every CPU).
+    :type executor: str, optional
+    :param max_workers: Number of shards parsed at the same time, defaults to the number of CPUs.
+    :type max_workers: int, optional
+
+    :return: The combined dataset and the ingestion report, with one entry per shard under `files`.
+    :rtype: tuple[pd.DataFrame, dict]
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Invalid executor. Choose one of {', '.join(EXECUTORS)}.")
+    names = [name for name, _ in files]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+    if executor == 'serial' or max_workers < 2:
+        results = [read_bytes(data, name) for name, data in files]
+    else:
+        pool_type = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        with pool_type(max_workers=max_workers) as pool:
+            results = list(pool.map(read_bytes, [data for _, data in files], names))
+
+    shard_reports = [shard_report for _, shard_report in results]
+    dataframe, report = reconcile_frames([frame for frame, _ in results], names)
+    memory_before = sum(shard_report["memory_before"] for shard_report in shard_reports)
+    memory_after = frame_nbytes(dataframe)
+    report.update({
+        "rows": len(dataframe),
+        "chunks": sum(shard_report["chunks"] for shard_report in shard_reports),
+        "schema": {column: str(dtype) for column, dtype in dataframe.dtypes.items()},
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+        "memory_saved": memory_before - memory_after,
+        "files": [{"name": name, "rows": shard_report["rows"], "columns": len(shard_report["schema"])}
+                  for name, shard_report in zip(names, shard_reports)],
+    })
+    return dataframe, report
+
+
+def load_dataset(uploaded_file, with_report: bool = False):
+    """Load an upload into a DataFrame, parsing each distinct upload only once.
+
+    The upload bytes are hashed and the parsed frame is kept in a memory-bounded LRU cache,
+    so Streamlit reruns of the same upload skip parsing. A copy is returned because the
+    cleaning functions modify frames in place.
+
+    Several files, or zip archives of them, are shards of one dataset: they are parsed in
+    parallel and combined by `read_shards`, and cached together under one hash.
+
+    :param uploaded_file: A Streamlit `UploadedFile` or any binary file object with a `name`,
+        or a list of them (e.g. from `st.file_uploader(..., accept_multiple_files=True)`).
+    :param with_report: Also return the ingestion report (content hash, dtypes used and memory saved).
+    :type with_report: bool, optional
+        Default is False.
+
+    :return: The parsed dataset, or a `(dataset, report)` tuple when `with_report` is set.
+    :rtype: pd.DataFrame | tuple[pd.DataFrame, dict]
+    """
+    uploads = uploaded_file if isinstance(uploaded_file, (list, tuple)) else [uploaded_file]
+    if not uploads:
+        raise ValueError("No files to load.")
+    files = [(upload.name, upload.getvalue() if hasattr(upload, 'getvalue') else upload.read()) for upload in uploads]
+    hashes = [hash_bytes(data) for _, data in files]
+    sharded = len(files) > 1 or files[0][0].lower().endswith('.zip')
+    if sharded:
+        # the order of the shards is the order of the rows, so it is part of the key
+        key = (hash_bytes(''.join(f"{name}:{content_hash}\n" for (name, _), content_hash in zip(files, hashes)).encode()),
+               tuple(name for name, _ in files))
+        label = f"{len(files)} files"
+    else:
+        key = (hashes[0], files[0][0])
+        label = files[0][0]
+
+    entry = _dataset_cache.get(key)
+    if entry is not None:
+        logger.info("Dataset cache hit for %s", label)
+    else:
+        logger.info("Dataset cache miss for %s, parsing %d bytes", label, sum(len(data) for _, data in files))
+        if sharded:
+            dataframe, report = read_shards(expand_archives(files))
+        else:
+            dataframe, report = read_bytes(files[0][1], files[0][0])
+        report["content_hash"] = key[0]
+        logger.info("Compact dtypes saved %d bytes for %s", report["memory_saved"], label)
+        entry = (dataframe, report)
+        _dataset_cache.put(key, entry, nbytes=report["memory_after"])
+
+    dataframe, report = entry
+    if with_report:
+        return dataframe.copy(), report
+    return dataframe.copy()
+
+
+def cache_info() -> dict:
+    """Return hit/miss counters and memory usage of the dataset cache.
+
+    :return: Cache statistics.
+    :rtype: dict
+    """
+    return _dataset_cache.info()
+
+
+def clear_cache():
+    """Drop every parsed dataset from the cache."""
+    _dataset_cache.clear()
@@ -1,14 +1,11 @@
 import pandas as pd
 from .config import Config
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
 
 def build_sales_forecast_model(
     df: pd.DataFrame, 
     feature_columns: str, 
     target_column: str
-    ) -> tuple[LinearRegression,dict]:
+    ) -> tuple['LinearRegression',dict]:
     """
     Builds and evaluates a simple regression model to forecast sales.
 
@@ -21,6 +18,10 @@ def build_sales_forecast_model(
     :returns: Evaluation metrics for the model.
     :rtype: dict
     """
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error
+
     X = df[feature_columns]
     y = df[target_column]
 
@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+EXECUTORS = ('serial', 'thread', 'process')
+
+
+def split_columns(columns: list, groups: int) -> list:
+    """Split columns into at most `groups` contiguous groups of similar size.
+
+    :param columns: The columns to split.
+    :type columns: list
+    :param groups: Maximum number of groups.
+    :type groups: int
+
+    :return: List of non-empty column lists.
+    :rtype: list
+    """
+    groups = max(1, min(groups, len(columns)))
+    return [group.tolist() for group in np.array_split(np.array(columns, dtype=object), groups) if len(group)]
+
+
+def _share_numeric_blocks(frame: pd.DataFrame) -> tuple[list, pd.DataFrame]:
+    """Copy the plain numpy numeric columns of a frame into shared memory, one 2-D block per dtype.
+
+    :return: Descriptions of the shared blocks and the remaining (non-numeric) columns.
+    """
+    blocks = []
+    shared_columns = []
+    for dtype, columns in frame.columns.to_series().groupby(frame.dtypes.astype(str)).groups.items():
+        columns = list(columns)
+        if not all(isinstance(frame[column].dtype, np.dtype) and frame[column].dtype.kind in 'iufb'
+                   for column in columns):
+            continue
+        values = frame[columns].to_numpy()
+        memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        block = np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)
+        block[:] = values
+        blocks.append({"memory": memory, "name": memory.name, "shape": values.shape,
+                       "dtype": values.dtype.str, "columns": columns})
+        shared_columns.extend(columns)
+    return blocks, frame.drop(columns=shared_columns)
+
+
+def _run_shared(func, blocks: list, others: pd.DataFrame, order: list, kwargs: dict):
+    """Process pool worker: rebuild the column group from shared memory and apply `func`.
+
+    Numeric results with an unchanged dtype are written back into the shared block, so only
+    the other result columns are sent back through pickling.
+    """
+    attached = [shared_memory.SharedMemory(name=block["name"]) for block in blocks]
+    try:
+        arrays = [np.ndarray(block["shape"], dtype=np.dtype(block["dtype"]), buffer=memory.buf)
+                  for block, memory in zip(blocks, attached)]
+        parts = [pd.DataFrame(array, columns=block["columns"], index=others.index, copy=False)
+                 for block, array in zip(blocks, arrays)]
+        frame = pd.concat([*parts, others], axis=1)[order]
+        result = func(frame, **kwargs)
+
+        written = []
+        for block, array in zip(blocks, arrays):
+            for position, column in enumerate(block["columns"]):
+                if column in result.columns and result[column].dtype == array.dtype and len(result) == len(array):
+                    array[:, position] = result[column].to_numpy()
+                    written.append(column)
+        order = result.columns.tolist()
+        payload = result.drop(columns=written).copy()
+        # drop every view of the shared blocks before they are closed
+        del frame, parts, arrays, result
+        return payload, written, order
+    finally:
+        for memory in attached:
+            memory.close()
+
+
+def _read_block_column(block: dict, position: int) -> np.ndarray:
+    """Copy one column out of a shared block."""
+    array = np.ndarray(block["shape"], dtype=np.dtype(block["dtype"]), buffer=block["memory"].buf)
+    return array[:, position].copy()
+
+
+def map_column_groups(
+        func,
+        dataframe: pd.DataFrame,
+        columns: list,
+        executor: str = 'serial',
+        max_workers: int = None,
+        **kwargs
+    ) -> pd.DataFrame:
+    """Apply a column-wise function to groups of columns, optionally in parallel, and stitch the results.
+
+    `func(frame, **kwargs)` receives a DataFrame holding one group of columns and must return a
+    DataFrame with the same rows; its columns are the results for that group. With the `process`
+    executor, numeric columns are passed to the workers through shared memory instead of being
+    pickled, and numeric results are written back the same way. `func` must then be a
+    module-level function so it can be pickled.
+
+    :param func: Column-wise function to apply.
+    :type func: callable
+    :param dataframe: The DataFrame holding the columns.
+    :type dataframe: pd.DataFrame
+    :param columns: Columns to process.
+    :type columns: list
+    :param executor: `serial`, `thread` (a thread pool, suits numeric work that releases the GIL)
+        or `process` (a process pool, suits text work).
+    :type executor: str, optional
+        Default is `serial`.
+    :param max_workers: Number of workers, defaults to the number of CPUs.
+    :type max_workers: int, optional
+    :param kwargs: Extra keyword arguments passed to `func`.
+
+    :return: The results of every group, concatenated column-wise in group order.
+    :rtype: pd.DataFrame
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Invalid executor. Choose one of {', '.join(EXECUTORS)}.")
+    if executor == 'serial' or len(columns) < 2:
+        return func(dataframe[columns], **kwargs)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    groups = split_columns(columns, max_workers)
+
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda group: func(dataframe[group], **kwargs), groups))
+        return pd.concat(results, axis=1)
+
+    shared = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = []
+            for group in groups:
+                blocks, others = _share_numeric_blocks(dataframe[group])
+                shared.append(blocks)
+                descriptions = [{key: value for key, value in block.items() if key != "memory"} for block in blocks]
+                futures.append(pool.submit(_run_shared, func, descriptions, others, group, kwargs))
+            results = []
+            for blocks, future in zip(shared, futures):
+                result, written, order = future.result()
+                # numeric results came back through the shared blocks
+                for block in blocks:
+                    for position, column in enumerate(block["columns"]):
+                        if column in written:
+                            result[column] = _read_block_column(block, position)
+                results.append(result[order])
+        return pd.concat(results, axis=1)
+    finally:
+        for blocks in shared:
+            for block in blocks:
+                block["memory"].close()
+                block["memory"].unlink()
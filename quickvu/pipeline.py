@@ -0,0 +1,350 @@
+import json
+from collections import namedtuple
+
+import pandas as pd
+
+from . import prepare_data, transformers
+from .cache import FrameCache, fingerprint_frame, hash_bytes
+from .config import Config
+
+Step = namedtuple('Step', ['name', 'params'])
+
+# per-step outputs shared by every session; keys are content fingerprints so sessions never see each other's data
+checkpoint_cache = FrameCache(max_bytes=Config.CHECKPOINT_CACHE_MAX_BYTES)
+
+# cleaning operations a pipeline can record, by name
+OPERATIONS = {
+    'standardize_column_names': prepare_data.standardize_column_names,
+    'handle_missing_values': prepare_data.handle_missing_values,
+    'detech_outliers': prepare_data.detech_outliers,
+    'clean_text_data': prepare_data.clean_text_data,
+    'remove_duplicates': prepare_data.remove_duplicates,
+    'scale_data': prepare_data.scale_data,
+    'convert_data_types': prepare_data.convert_data_types,
+    'manipulate_columns': prepare_data.manipulate_columns,
+    'filter_rows': prepare_data.filter_rows,
+    'drop_columns': prepare_data.drop_columns,
+}
+
+# steps that give the same result when applied twice in a row
+_IDEMPOTENT = {'standardize_column_names', 'remove_duplicates', 'handle_missing_values'}
+
+# steps that treat every row on its own, so a file can be cleaned one chunk at a time
+_ROW_WISE = {'standardize_column_names', 'clean_text_data', 'convert_data_types', 'manipulate_columns',
+             'filter_rows', 'drop_columns'}
+
+RECIPE_VERSION = 1
+
+# parameter holding the columns a column-wise step works on, used to merge adjacent steps
+_COLUMN_PARAMS = {
+    'clean_text_data': 'text_columns',
+    'scale_data': 'numerical_columns',
+    'detech_outliers': 'columns',
+    'convert_data_types': 'column_types',
+    'filter_rows': 'filter_conditions',
+    'drop_columns': 'columns',
+}
+
+
+def _is_row_wise(step: Step) -> bool:
+    """Check whether a step gives the same result on chunks of rows as on the whole frame."""
+    if step.name == 'handle_missing_values':
+        return step.params.get('method', 'drop') == 'drop' or step.params.get('imputer') is not None
+    if step.name == 'scale_data':
+        return step.params.get('scaler') is not None
+    return step.name in _ROW_WISE
+
+
+def _encode_param(value):
+    if isinstance(value, transformers.TRANSFORMER_TYPES):
+        return {'transformer': value.to_dict()}
+    return value
+
+
+def _decode_param(value):
+    if isinstance(value, dict) and set(value) == {'transformer'}:
+        return transformers.from_dict(value['transformer'])
+    return value
+
+
+def _columns(step: Step):
+    """Return the set of columns a step works on, or None when it touches every column."""
+    param = _COLUMN_PARAMS.get(step.name)
+    if param is None or step.params.get(param) is None:
+        return None
+    return set(step.params[param])
+
+
+def _outputs(step: Step) -> set:
+    """Return the columns a step writes, or None when it may write any column."""
+    columns = _columns(step)
+    if step.name == 'detech_outliers' and columns is not None:
+        return {f"{column}_outliers" for column in columns}
+    if step.name in ('clean_text_data', 'scale_data', 'convert_data_types'):
+        return columns
+    if step.name in ('remove_duplicates', 'filter_rows', 'drop_columns'):
+        return set()
+    if step.name == 'handle_missing_values' and step.params.get('method', 'drop') == 'drop':
+        return set()
+    return None
+
+
+def _depends_on(step: Step, earlier: Step) -> bool:
+    """Check whether `step` depends on the output of `earlier`.
+
+    These are the edges of the plan DAG: a filter or column drop is only moved ahead of an
+    earlier step when there is no edge between the two, which keeps the result unchanged.
+    """
+    if earlier.name in ('standardize_column_names', 'manipulate_columns', 'filter_rows', 'drop_columns'):
+        # renames and derived columns can change what later steps refer to,
+        # and reordering cheap steps among themselves gains nothing
+        return True
+
+    if step.name == 'filter_rows':
+        # row filters commute with steps that treat each row on its own
+        row_wise = earlier.name in ('clean_text_data', 'convert_data_types', 'remove_duplicates') or (
+            earlier.name == 'handle_missing_values' and earlier.params.get('method', 'drop') == 'drop'
+        )
+        written = _outputs(earlier)
+        return not row_wise or written is None or bool(_columns(step) & written)
+
+    if step.name == 'drop_columns':
+        dropped = _columns(step)
+        if earlier.name == 'handle_missing_values':
+            # mean/median imputation works column by column; dropping rows on NaN reads every column
+            return earlier.params.get('method', 'drop') == 'drop'
+        touched = _columns(earlier)
+        written = _outputs(earlier)
+        if touched is None or written is None:
+            return True
+        return bool(dropped & (touched | written))
+
+    return True
+
+
+def _is_noop(step: Step) -> bool:
+    """Check whether a step would leave any frame unchanged."""
+    param = _COLUMN_PARAMS.get(step.name)
+    if param is not None and param in step.params and step.params[param] is not None:
+        return len(step.params[param]) == 0
+    if step.name == 'manipulate_columns':
+        operations = step.params.get('column_operations', {})
+        return not operations.get('rename') and not operations.get('add')
+    return False
+
+
+def _merge(first: Step, second: Step):
+    """Merge two adjacent steps of the same kind into one, or return None when they can't be merged."""
+    if first.name != second.name:
+        return None
+    if first.name in _IDEMPOTENT and first.params == second.params:
+        return first
+
+    param = _COLUMN_PARAMS.get(first.name)
+    if param is None:
+        return None
+    first_columns, second_columns = _columns(first), _columns(second)
+    if first_columns is None or second_columns is None:
+        return None
+    other_params = {key: value for key, value in first.params.items() if key != param}
+    if other_params != {key: value for key, value in second.params.items() if key != param}:
+        return None
+    if first.name != 'drop_columns' and first_columns & second_columns:
+        # e.g. cleaning the same text column twice is not the same as cleaning it once
+        return None
+
+    if isinstance(first.params[param], dict):
+        merged = {**first.params[param], **second.params[param]}
+    else:
+        merged = list(first.params[param]) + [column for column in second.params[param]
+                                               if column not in first_columns]
+    return Step(first.name, {**first.params, param: merged})
+
+
+class Pipeline:
+    """A lazy plan of `prepare_data` cleaning steps.
+
+    Steps are only recorded by `add`. `run` first optimizes the plan: no-op steps are skipped,
+    row filters and column drops are moved ahead of the steps they don't depend on, and
+    adjacent column-wise steps of the same kind are merged into a single call. The optimized
+    plan is then executed in one go on a single copy of the input.
+
+    Example:
+        `Pipeline().add('handle_missing_values', method='mean').add('filter_rows', filter_conditions={'region': 'EU'}).run(df)`
+    """
+
+    def __init__(self, steps: list = None):
+        self.steps = [Step(name, dict(params)) for name, params in (steps or [])]
+        self.last_run_info = {"steps": 0, "reused": 0}
+
+    def add(self, name: str, **params):
+        """Record a cleaning step.
+
+        :param name: Name of the `prepare_data` function to run, e.g. `handle_missing_values`.
+        :type name: str
+        :param params: Keyword arguments for the function, excluding the DataFrame.
+
+        :return: The pipeline itself, so calls can be chained.
+        :rtype: Pipeline
+        """
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown cleaning step '{name}'. Choose one of {', '.join(OPERATIONS)}.")
+        self.steps.append(Step(name, params))
+        return self
+
+    def optimize(self) -> list:
+        """Return the optimized execution plan without running it.
+
+        :return: List of `Step` tuples in execution order.
+        :rtype: list
+        """
+        plan = [step for step in self.steps if not _is_noop(step)]
+
+        # push filters and column drops ahead of the steps they don't depend on
+        for index in range(len(plan)):
+            if plan[index].name not in ('filter_rows', 'drop_columns'):
+                continue
+            position = index
+            while position > 0 and not _depends_on(plan[position], plan[position - 1]):
+                plan[position - 1], plan[position] = plan[position], plan[position - 1]
+                position -= 1
+
+        # fuse adjacent steps of the same kind into one pass
+        fused = []
+        for step in plan:
+            merged = _merge(fused[-1], step) if fused else None
+            if merged is not None:
+                fused[-1] = merged
+            else:
+                fused.append(step)
+        return fused
+
+    def explain(self) -> list:
+        """Describe the optimized plan, one line per step.
+
+        :return: Human readable plan.
+        :rtype: list
+        """
+        return [f"{name}({', '.join(f'{key}={value!r}' for key, value in params.items())})"
+                for name, params in self.optimize()]
+
+    def run(
+            self,
+            dataframe: pd.DataFrame,
+            checkpoints: FrameCache = None,
+            input_key: str = None,
+            on_step=None
+        ) -> pd.DataFrame:
+        """Optimize the plan and apply it to a DataFrame.
+
+        With a `checkpoints` cache, the output of every step is stored under a key chained
+        from the input fingerprint and the name and parameters of each step so far. A later
+        run resumes from the deepest cached step, so changing step N only recomputes steps N
+        onward. The cache evicts least recently used checkpoints once its memory budget is used.
+
+        :param dataframe: The DataFrame to clean. It is not modified.
+        :type dataframe: pd.DataFrame
+        :param checkpoints: Cache to read and store per-step outputs in. No checkpointing when None.
+        :type checkpoints: FrameCache, optional
+        :param input_key: Fingerprint of `dataframe`. Computed with `fingerprint_frame` when not given.
+        :type input_key: str, optional
+        :param on_step: Called as `on_step(done, total, step)` before each step that is computed,
+            e.g. to report progress. An exception it raises stops the run.
+        :type on_step: callable, optional
+
+        :return: The cleaned DataFrame.
+        :rtype: pd.DataFrame
+        """
+        plan = self.optimize()
+        start = 0
+        keys = []
+        if checkpoints is not None:
+            key = input_key or fingerprint_frame(dataframe)
+            for step in plan:
+                key = hash_bytes(f"{key}|{step.name}|{sorted(step.params.items())!r}".encode())
+                keys.append(key)
+            for position in range(len(plan), 0, -1):
+                cached = checkpoints.get(keys[position - 1])
+                if cached is not None:
+                    dataframe, start = cached, position
+                    break
+
+        self.last_run_info = {"steps": len(plan), "reused": start}
+        dataframe = dataframe.copy()
+        for position in range(start, len(plan)):
+            step = plan[position]
+            if on_step is not None:
+                on_step(position, len(plan), step)
+            if not (step.name == 'handle_missing_values' and not dataframe.isna().values.any()):
+                # a frame without missing values skips the per-column statistics
+                dataframe = OPERATIONS[step.name](dataframe, **step.params)
+            if checkpoints is not None:
+                # steps modify their input in place, so the next one works on a copy of the checkpoint
+                checkpoints.put(keys[position], dataframe)
+                dataframe = dataframe.copy()
+        return dataframe
+
+    def streamable(self) -> bool:
+        """Check whether every step treats rows on their own, so `run` can be applied chunk by chunk.
+
+        Imputation and scaling qualify when they are given fitted statistics; outlier flags
+        and duplicate removal need the whole dataset.
+        """
+        return all(_is_row_wise(step) for step in self.optimize())
+
+    def to_recipe(self) -> dict:
+        """Return the steps as a JSON-serializable recipe, see `from_recipe`.
+
+        Fitted transformers in the parameters are saved with their statistics. Parameters
+        that can't be written as JSON, e.g. a function in `manipulate_columns`, are not supported.
+
+        :return: The recipe.
+        :rtype: dict
+        """
+        return {
+            "version": RECIPE_VERSION,
+            "steps": [{"operation": step.name, "params": {key: _encode_param(value) for key, value in step.params.items()}}
+                      for step in self.steps],
+        }
+
+    @classmethod
+    def from_recipe(cls, recipe: dict) -> 'Pipeline':
+        """Build a pipeline from a recipe written by `to_recipe`.
+
+        :param recipe: The recipe.
+        :type recipe: dict
+
+        :return: The pipeline.
+        :rtype: Pipeline
+        """
+        if recipe.get("version") != RECIPE_VERSION:
+            raise ValueError(f"Unsupported recipe version {recipe.get('version')!r}. Expected {RECIPE_VERSION}.")
+        pipeline = cls()
+        for step in recipe["steps"]:
+            pipeline.add(step["operation"], **{key: _decode_param(value) for key, value in step.get("params", {}).items()})
+        return pipeline
+
+    def save_recipe(self, path: str):
+        """Write the recipe of the pipeline to a JSON file, see `load_recipe`."""
+        with open(path, 'w') as f:
+            json.dump(self.to_recipe(), f, indent=2)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __repr__(self) -> str:
+        return f"Pipeline({[step.name for step in self.steps]})"
+
+
+def load_recipe(path_or_buffer) -> Pipeline:
+    """Read a pipeline from a recipe file written by `Pipeline.save_recipe` or downloaded from Quick Prep.
+
+    :param path_or_buffer: Path of the JSON file, or a file object.
+
+    :return: The pipeline.
+    :rtype: Pipeline
+    """
+    if hasattr(path_or_buffer, 'read'):
+        return Pipeline.from_recipe(json.load(path_or_buffer))
+    with open(path_or_buffer) as f:
+        return Pipeline.from_recipe(json.load(f))
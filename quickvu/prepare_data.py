@@ -1,8 +1,16 @@
+import itertools
+import re
+
 import pandas as pd
 import numpy as np
-from scipy.stats import zscore
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
+from .expressions import ExpressionError, compile_expression
+from .parallel import map_column_groups
+from .profiling import profiled, warn_caller
+from .sketches import KLLSketch, column_sketches
+from .transformers import StreamingImputer, StreamingScaler
+
+@profiled
 def get_data_overview(dataframe: pd.DataFrame) -> dict:
     """Get an overview of the data including basic information and sample rows.
     
@@ -20,9 +28,27 @@ def get_data_overview(dataframe: pd.DataFrame) -> dict:
     }
     return data_overview
 
+def _impute_columns(frame: pd.DataFrame, method: str) -> pd.DataFrame:
+    """Fill the missing values of a group of columns, used by `handle_missing_values`."""
+    # we want the script to handle the datatypes gracefully without causing errors
+    filled = {}
+    for column in frame.columns:
+        if pd.api.types.is_numeric_dtype(frame[column]) and not pd.api.types.is_bool_dtype(frame[column]):
+            # imputing numerical columns with the mean or median
+            statistic = frame[column].mean() if method == "mean" else frame[column].median()
+            filled[column] = frame[column].fillna(statistic)
+        else:
+            # and categorical columns with the mode
+            filled[column] = frame[column].fillna(frame[column].mode()[0])
+    return pd.DataFrame(filled, index=frame.index)
+
+@profiled
 def handle_missing_values(
         dataframe: pd.DataFrame, 
-        method: str = "drop"
+        method: str = "drop",
+        executor: str = "serial",
+        max_workers: int = None,
+        imputer: StreamingImputer = None
     ) -> pd.DataFrame:
     """Handle missing values in the dataset based on the chosen method.
     
@@ -31,38 +57,56 @@ def handle_missing_values(
     :param method: The method handle missing values. Options are `drop`, `mean`, or `median`.
     :type method: str, optional
         Default is `drop`
+    :param executor: How the columns are imputed: `serial`, `thread` or `process`, see `parallel.map_column_groups`.
+        Not used by `drop`.
+    :type executor: str, optional
+        Default is `serial`.
+    :param max_workers: Number of parallel workers, defaults to the number of CPUs.
+    :type max_workers: int, optional
+    :param imputer: A fitted imputer, e.g. one fitted on earlier data and loaded with `transformers.load`.
+        Its statistics fill the missing values instead of being computed on `dataframe`. Not used by `drop`.
+    :type imputer: StreamingImputer, optional
     
     :return: The DataFrame with missing values handled.
     :rtype: pd.DataFrame
     """
-    # we want the script to handle the datatypes gracefully without causing errors
-    numerical_columns = dataframe.select_dtypes(include=[np.number]).columns.tolist()
-    categorical_columns = dataframe.select_dtypes(exclude=[np.number]).columns.tolist()
+    if method in ("mean", "median") and imputer is not None:
+        filled = imputer.transform(dataframe[[column for column in imputer.columns_ if column in dataframe.columns]])
+        for column in filled.columns:
+            dataframe[column] = filled[column]
 
-    if method == "drop":
+    elif method == "drop":
         # dropping the missing values without any caveats
         dataframe = dataframe.dropna()
         
-    elif method == "mean":
-        # imputing numerical columns with mean and categorical with mode
-        dataframe[numerical_columns] = dataframe[numerical_columns].fillna(dataframe[numerical_columns].mean())
-        for column in categorical_columns:
-            dataframe[column] = dataframe[column].fillna(dataframe[column].mode()[0])
-            
-    elif method == "median":
-        # Impute numerical columns with median and categorical with mode
-        dataframe[numerical_columns] = dataframe[numerical_columns].fillna(dataframe[numerical_columns].median())
-        for column in categorical_columns:
-            dataframe[column] = dataframe[column].fillna(dataframe[column].mode()[0])  # Using mode for categorical columns
+    elif method in ("mean", "median"):
+        # every column is imputed on its own, so groups of columns can be filled in parallel
+        filled = map_column_groups(_impute_columns, dataframe, dataframe.columns.tolist(),
+                                   executor=executor, max_workers=max_workers, method=method)
+        for column in filled.columns:
+            dataframe[column] = filled[column]
             
     else:
         raise ValueError("Invalid method for handling missing values. Choose 'drop', 'mean', or 'median'.")
     
     return dataframe
 
+def _convert_types(frame: pd.DataFrame, column_types: dict) -> pd.DataFrame:
+    """Convert a group of columns to their target data types, used by `convert_data_types`."""
+    converted = {}
+    for column in frame.columns:
+        if column_types[column] == 'datetime':
+            converted[column] = pd.to_datetime(frame[column], errors='coerce')
+        else:
+            converted[column] = frame[column].astype(column_types[column])
+    return pd.DataFrame(converted, index=frame.index)
+
+@profiled
 def convert_data_types(
         dataframe: pd.DataFrame, 
-        column_types: dict
+        column_types: dict,
+        executor: str = "serial",
+        max_workers: int = None
     ) -> pd.DataFrame:
     """Convert columns to specific data types.
     
@@ -70,114 +114,316 @@ def convert_data_types(
     :type dataframe: pd.DataFrame
     :param column_types: A dictionary where keys are column names and values are target data types.
     :type column_types: dict
+    :param executor: How the columns are converted: `serial`, `thread` or `process`, see `parallel.map_column_groups`.
+    :type executor: str, optional
+        Default is `serial`.
+    :param max_workers: Number of parallel workers, defaults to the number of CPUs.
+    :type max_workers: int, optional
     
     :return: DataFrame with updated data types.
     :rtype: pd.DataFrame
     """
-    for column, dtype in column_types.items():
-        if dtype == 'datetime':
-            dataframe[column] = pd.to_datetime(dataframe[column], errors='coerce')
-        else:
-            dataframe[column] = dataframe[column].astype(dtype)
+    converted = map_column_groups(_convert_types, dataframe, list(column_types),
+                                  executor=executor, max_workers=max_workers, column_types=column_types)
+    for column in converted.columns:
+        dataframe[column] = converted[column]
     return dataframe
 
-def detech_outliers(
-        dataframe: pd.DataFrame, 
-        method: str = "iqr",
-        threshold: float = 1.5,
-        columns: list = None  # Accept a list of columns instead of a single column
-    ) -> pd.DataFrame:
-    """
-    Detect outliers using the specified method.
+def _quartiles(
+        dataframe: pd.DataFrame,
+        columns: list,
+        quantile_method: str = "exact",
+        error: float = 0.01,
+        batch_size: int = 1_000_000
+    ) -> tuple[pd.Series, pd.Series]:
+    """Return the 1st and 3rd quartiles of the given columns, exactly or from a quantile sketch."""
+    if quantile_method == "exact":
+        return dataframe[columns].quantile(0.25), dataframe[columns].quantile(0.75)
+    elif quantile_method != "sketch":
+        raise ValueError("Invalid quantile method. Choose 'exact' or 'sketch'.")
 
-    :param dataframe: The DataFrame to detect outliers in.
-    :type dataframe: pd.DataFrame
-    :param method: Method to detect outliers. Options are `iqr` or `zscore`.
-    :type method: str, optional
-        Default is `iqr`.
-    :param threshold: The threshold to determine outliers based on the chosen method.
-    :type threshold: float, optional
-        Default is 1.5.
-    :param columns: List of columns to detect outliers in. If None, detects outliers in all numerical columns.
-    :type columns: list, optional
+    # feed the sketch in batches so only one batch is copied to float at a time
+    sketches = column_sketches(
+        (dataframe.iloc[start:start + batch_size] for start in range(0, len(dataframe), batch_size)),
+        columns,
+        error=error,
+    )
+    quartiles = pd.DataFrame({column: sketches[column].quantile([0.25, 0.75]) for column in columns})
+    return quartiles.iloc[0], quartiles.iloc[1]
 
-    :return: DataFrame with outliers flagged.
-    :rtype: pd.DataFrame
-    """
+def _flag_outliers(
+        frame: pd.DataFrame,
+        method: str,
+        threshold: float,
+        quantile_method: str,
+        error: float
+    ) -> pd.DataFrame:
+    """Flag the outliers of a group of numerical columns, used by `detech_outliers`."""
     # Interquartile Range (IQR) is a statistical measure used to identify outliers in a dataset.
     # It is the range between the 1st quartile (Q1) and the 3rd quartile (Q3), where:
-    
+
     # - Q1 (the 1st quartile) is the value below which 25% of the data falls.
     # - Q3 (the 3rd quartile) is the value below which 75% of the data falls.
-    
+
     # The IQR is calculated as: IQR = Q3 - Q1
-    
+
     # Outliers are considered any data points that fall below: 
     # - Lower bound = Q1 - 1.5 * IQR
     # - Upper bound = Q3 + 1.5 * IQR
-    
+
     # Here is a basic diagram of the IQR:
-    
+
     #       |---------|---------|---------|---------|---------|
     #  ---- Q1      Median    Q3       Upper Bound    Lower Bound
-    
+
     # Anything outside the "lower bound" and "upper bound" are considered outliers
-    # defining a list of numerical values
-    # Determine which columns to use: the specified column or all numerical columns
-    if columns is None:
-        columns = dataframe.select_dtypes(include=[np.number]).columns.tolist()
-        
     if method == "iqr":
-        Q1 = dataframe[columns].quantile(0.25)
-        Q3 = dataframe[columns].quantile(0.75)
+        Q1, Q3 = _quartiles(frame, frame.columns.tolist(), quantile_method, error)
         IQR = Q3 - Q1
-        outliers = (dataframe[columns] < (Q1 - threshold * IQR)) | \
-                   (dataframe[columns] > (Q3 + threshold * IQR))
+        outliers = (frame < (Q1 - threshold * IQR)) | (frame > (Q3 + threshold * IQR))
     # The Z-score measures how far a data point is from the mean in terms of standard deviations.
     # Formula: Z = (X - μ) / σ
     # - X is the data point
     # - μ (mu) is the mean
     # - σ (sigma) is the standard deviation
-    
+
     # Z-score interpretation:
     # - Z = 0: data point is at the mean
     # - Z > 0: data point is above the mean
     # - Z < 0: data point is below the mean
-    
+
     # Example diagram:
     #         |-----|-----|-----|-----|-----|-----|
     # Z-score   -3    -2    -1    0     1     2     3
     #         Below mean       Mean        Above mean
-    elif method == "zscore":
-        z_scores = np.abs(dataframe[columns].apply(zscore))
-        outliers = z_scores > threshold
     else:
+        from scipy.stats import zscore
+
+        outliers = np.abs(frame.apply(zscore)) > threshold
+    return outliers.add_suffix("_outliers")
+
+@profiled
+def detech_outliers(
+        dataframe: pd.DataFrame, 
+        method: str = "iqr",
+        threshold: float = 1.5,
+        columns: list = None,  # Accept a list of columns instead of a single column
+        quantile_method: str = "exact",
+        error: float = 0.01,
+        executor: str = "serial",
+        max_workers: int = None
+    ) -> pd.DataFrame:
+    """
+    Detect outliers using the specified method.
+
+    :param dataframe: The DataFrame to detect outliers in.
+    :type dataframe: pd.DataFrame
+    :param method: Method to detect outliers. Options are `iqr` or `zscore`.
+    :type method: str, optional
+        Default is `iqr`.
+    :param threshold: The threshold to determine outliers based on the chosen method.
+    :type threshold: float, optional
+        Default is 1.5.
+    :param columns: List of columns to detect outliers in. If None, detects outliers in all numerical columns.
+    :type columns: list, optional
+    :param quantile_method: How the IQR quartiles are computed. `exact` uses `DataFrame.quantile`,
+        `sketch` uses a bounded-memory `KLLSketch` whose rank error is at most `error`.
+    :type quantile_method: str, optional
+        Default is `exact`.
+    :param error: Target rank error of the quantile sketch, only used with `quantile_method='sketch'`.
+    :type error: float, optional
+        Default is 0.01.
+    :param executor: How the columns are processed: `serial`, `thread` or `process`, see `parallel.map_column_groups`.
+    :type executor: str, optional
+        Default is `serial`.
+    :param max_workers: Number of parallel workers, defaults to the number of CPUs.
+    :type max_workers: int, optional
+
+    :return: DataFrame with outliers flagged.
+    :rtype: pd.DataFrame
+    """
+    # Determine which columns to use: the specified column or all numerical columns
+    if columns is None:
+        columns = dataframe.select_dtypes(include=[np.number]).columns.tolist()
+    if method not in ("iqr", "zscore"):
         raise ValueError("Invalid method for detecting outliers. Choose 'iqr' or 'zscore'.")
+
+    # the bounds of each column only depend on that column, so groups of columns are flagged in parallel
+    outliers = map_column_groups(_flag_outliers, dataframe, columns, executor=executor, max_workers=max_workers,
+                                 method=method, threshold=threshold, quantile_method=quantile_method, error=error)
             
     # adding the outliers into dataframe to create flags
     for column in columns:
-        dataframe[f"{column}_outliers"] = outliers[column]
+        dataframe[f"{column}_outliers"] = outliers[f"{column}_outliers"]
     return dataframe
 
+@profiled
+def detech_outliers_in_chunks(
+        read_chunks,
+        method: str = "iqr",
+        threshold: float = 1.5,
+        columns: list = None,
+        error: float = 0.01
+    ):
+    """Detect outliers in a dataset that is read in chunks, e.g. one that doesn't fit in memory.
+    
+    The data is read twice: a first pass builds the statistics (quantile sketches for `iqr`,
+    running mean and variance for `zscore`) and a second pass flags each chunk, so memory use
+    is bounded by the chunk size. Flags match `detech_outliers`, up to the sketch error for `iqr`.
+    
+    :param read_chunks: A callable returning a new iterator of DataFrame chunks on each call.
+    :type read_chunks: callable\n
+        Example: `lambda: pd.read_csv('sales.csv', chunksize=100_000)`
+    :param method: Method to detect outliers. Options are `iqr` or `zscore`.
+    :type method: str, optional
+        Default is `iqr`.
+    :param threshold: The threshold to determine outliers based on the chosen method.
+    :type threshold: float, optional
+        Default is 1.5.
+    :param columns: List of columns to detect outliers in. If None, detects outliers in all numerical columns.
+    :type columns: list, optional
+    :param error: Target rank error of the quantile sketches used by `iqr`.
+    :type error: float, optional
+        Default is 0.01.
+    
+    :return: Iterator of chunks with outliers flagged.
+    :rtype: Iterator[pd.DataFrame]
+    """
+    if method not in ("iqr", "zscore"):
+        raise ValueError("Invalid method for detecting outliers. Choose 'iqr' or 'zscore'.")
+
+    def _numeric_block(chunk):
+        return chunk[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    first_pass = iter(read_chunks())
+    first_chunk = next(first_pass, None)
+    if first_chunk is None:
+        return
+    if columns is None:
+        columns = first_chunk.select_dtypes(include=[np.number]).columns.tolist()
+
+    if method == "iqr":
+        sketches = {column: KLLSketch(error=error) for column in columns}
+        for chunk in itertools.chain([first_chunk], first_pass):
+            values = _numeric_block(chunk)
+            for position, column in enumerate(columns):
+                sketches[column].update(values[:, position])
+        Q1 = np.array([sketches[column].quantile(0.25) for column in columns])
+        Q3 = np.array([sketches[column].quantile(0.75) for column in columns])
+        lower, upper = Q1 - threshold * (Q3 - Q1), Q3 + threshold * (Q3 - Q1)
+    else:
+        count = np.zeros(len(columns))
+        mean = np.zeros(len(columns))
+        m2 = np.zeros(len(columns))
+        has_missing = np.zeros(len(columns), dtype=bool)
+        for chunk in itertools.chain([first_chunk], first_pass):
+            values = _numeric_block(chunk)
+            missing = np.isnan(values)
+            has_missing |= missing.any(axis=0)
+            chunk_count = (~missing).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                chunk_mean = np.where(chunk_count > 0, np.nansum(values, axis=0) / chunk_count, 0.0)
+                chunk_m2 = np.nansum((values - chunk_mean) ** 2, axis=0)
+                total = count + chunk_count
+                weight = np.where(total > 0, chunk_count / total, 0.0)
+                delta = chunk_mean - mean
+                mean = mean + delta * weight
+                m2 = m2 + chunk_m2 + delta ** 2 * count * weight
+            count = total
+        # population standard deviation, like scipy's zscore
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(m2 / count)
+        # scipy's zscore returns NaN for a column with missing values, so nothing is flagged there
+        std[has_missing] = np.nan
+
+    for chunk in read_chunks():
+        values = _numeric_block(chunk)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if method == "iqr":
+                outliers = (values < lower) | (values > upper)
+            else:
+                outliers = np.abs((values - mean) / std) > threshold
+        for position, column in enumerate(columns):
+            chunk[f"{column}_outliers"] = outliers[:, position]
+        yield chunk
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9\s]')
+
+def _clean_value(value):
+    """Strip a string and remove its non-alphanumeric characters; non-strings become NaN like with `.str`."""
+    if not isinstance(value, str):
+        return np.nan
+    return _NON_ALPHANUMERIC.sub('', value.strip())
+
+def _clean_text(frame: pd.DataFrame) -> pd.DataFrame:
+    """Clean a group of text columns, used by `clean_text_data`.
+    
+    Each column is reduced to its codes and distinct values (the categories of a `category`
+    column), the distinct values of the whole group are cleaned once and the results are
+    mapped back through the codes, so the cost follows the number of distinct values rather
+    than the number of rows.
+    """
+    encoded = {}
+    for column in frame.columns:
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            encoded[column] = (series.cat.codes.to_numpy(), np.asarray(series.cat.categories, dtype=object))
+        else:
+            codes, uniques = pd.factorize(series)
+            encoded[column] = (codes, np.asarray(uniques, dtype=object))
+
+    # columns often share values (e.g. product names in several columns), so they are cleaned together
+    dictionary = pd.Index(pd.unique(np.concatenate([uniques for _, uniques in encoded.values()] or [np.array([], dtype=object)])))
+    cleaned_dictionary = np.array([_clean_value(value) for value in dictionary], dtype=object)
+
+    cleaned = {}
+    for column, (codes, uniques) in encoded.items():
+        # an extra NaN at the end is picked by the -1 code of missing values
+        values = np.append(cleaned_dictionary[dictionary.get_indexer(uniques)], np.nan)
+        dtype = frame[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            # categories that clean to the same text are merged, and the column stays a category
+            category_codes, categories = pd.factorize(values[:-1])
+            codes = np.append(category_codes, -1)[codes]
+            cleaned[column] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            cleaned[column] = pd.Series(values[codes], index=frame.index, dtype=object)
+            if isinstance(dtype, pd.StringDtype):
+                cleaned[column] = cleaned[column].astype(dtype)
+    return pd.DataFrame(cleaned, index=frame.index)
+
+@profiled
 def clean_text_data(
         dataframe: pd.DataFrame, 
-        text_columns: list
+        text_columns: list,
+        executor: str = "serial",
+        max_workers: int = None
     ) -> pd.DataFrame:
     """Clean text columns by removing extra spaces and non-alphanumeric characters.
     
+    Every distinct value is cleaned once and mapped back to the rows (see `_clean_text`),
+    so repetitive columns are cheap to clean. `category` columns stay `category`.
+    
     :param dataframe: The DataFrame containing text columns.
     :type dataframe: pd.DataFrame
     :param text_columns: List of columns to clean.
     :type text_columns: list
+    :param executor: How the columns are cleaned: `serial`, `thread` or `process`, see `parallel.map_column_groups`.
+        String operations hold the GIL, so `process` is the one that scales here.
+    :type executor: str, optional
+        Default is `serial`.
+    :param max_workers: Number of parallel workers, defaults to the number of CPUs.
+    :type max_workers: int, optional
     
     :return: DataFrame with cleaned text data.
     :rtype: pd.DataFrame
     """
-    for columns in text_columns:
-        dataframe[columns] = dataframe[columns].str.strip()\
-                                .str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
+    cleaned = map_column_groups(_clean_text, dataframe, list(text_columns), executor=executor, max_workers=max_workers)
+    for column in cleaned.columns:
+        dataframe[column] = cleaned[column]
     return dataframe
 
+@profiled
 def remove_duplicates(dataframe: pd.DataFrame) -> pd.DataFrame:
     """Remove duplicate rows from a DataFrame.
     
@@ -190,10 +436,12 @@ def remove_duplicates(dataframe: pd.DataFrame) -> pd.DataFrame:
     dataframe.drop_duplicates(inplace=True)
     return dataframe
 
+@profiled
 def scale_data(
         dataframe: pd.DataFrame,
         numerical_columns: list,
-        method: str = "standarize"
+        method: str = "standarize",
+        scaler: StreamingScaler = None
     ) -> pd.DataFrame:
     """Scale numerical data to a specified range or distribution.
     
@@ -204,20 +452,23 @@ def scale_data(
     :param method: Method to scale the data. Options are `standarize` (z-score) or `minmax` (min-max).
     :type method: str, optional
         Default is `standardize`.
+    :param scaler: A fitted scaler, e.g. one fitted on earlier data and loaded with `transformers.load`.
+        Its statistics are applied instead of being fitted on `dataframe`, and `method` is ignored.
+    :type scaler: StreamingScaler, optional
         
     :return: Scaled DataFrame
     :rtype: pd.DataFrame
     """
-    if method == "standarize":
-        scaler = StandardScaler()
-    elif method == "normalize":
-        scaler = MinMaxScaler()
-    else:
-        raise ValueError("Invalid method for scaling data. Choose 'standarize' or 'minmax'.")
+    if scaler is None:
+        if method not in ("standarize", "normalize"):
+            raise ValueError("Invalid method for scaling data. Choose 'standarize' or 'minmax'.")
+        scaler = StreamingScaler(method, numerical_columns).fit(dataframe)
     
-    dataframe[numerical_columns] = scaler.fit_transform(dataframe[numerical_columns])
+    scaled = scaler.transform(dataframe[numerical_columns])
+    dataframe[numerical_columns] = scaled[numerical_columns]
     return dataframe
 
+@profiled
 def standardize_column_names(dataframe: pd.DataFrame) -> pd.DataFrame:
     """Standardize column names by converting them to lowercase and removing spaces.
     
@@ -236,29 +487,41 @@ def standardize_column_names(dataframe: pd.DataFrame) -> pd.DataFrame:
     )
     return dataframe
 
+@profiled
 def manipulate_columns(
         dataframe: pd.DataFrame, 
         column_operations: dict
     ) -> pd.DataFrame:
     """Perform various column manipulation like renaming or adding new columns.
     
+    New columns are computed with vectorized column operations (see `expressions.compile_expression`).
+    They can be given as expression strings or as row-wise lambdas; a lambda the compiler
+    can't translate falls back to `DataFrame.apply(axis=1)` with a warning.
+    
     :param dataframe: The DataFrame to manipulate columns.
     :type dataframe: pd.DataFrame
     :param column_operations: A dictionary containing operations to perform on columns.
     :type column_operations: dict\n
-    Example: `{'rename': {'old_name': 'new_name'}, 'add': {'new_column': lambda x: x['column1'] + x['column2']}}`
+    Example: `{'rename': {'old_name': 'new_name'}, 'add': {'new_column': lambda x: x['column1'] + x['column2'], 'flag': "'high' if column1 > 10 else 'low'"}}`
     
     
     :return: DataFrame with manipulated columns.
     :rtype: pd.DataFrame
     """
     if 'rename' in column_operations:
-        dataframe = dataframe.rename(column=column_operations['rename'])
+        dataframe = dataframe.rename(columns=column_operations['rename'])
     if 'add' in column_operations:
         for new_column, func in column_operations['add'].items():
-            dataframe[new_column] = dataframe.apply(func, axis=1)
+            try:
+                dataframe[new_column] = compile_expression(func)(dataframe)
+            except ExpressionError as error:
+                if isinstance(func, str):
+                    raise
+                warn_caller(f"Column '{new_column}' could not be vectorized ({error}); computing it row by row instead.")
+                dataframe[new_column] = dataframe.apply(func, axis=1)
     return dataframe
 
+@profiled
 def filter_rows(
         dataframe: pd.DataFrame, 
         filter_conditions: dict,
@@ -268,16 +531,38 @@ def filter_rows(
     :param dataframe: The DataFrame to filter rows from.
     :type dataframe: pd.DataFrame
     :param filter_conditions: A dictionary containing conditions for filtering rows.
+        A list, tuple or set of values keeps rows matching any of them.
     :type filter_conditions: dict\n
-        Example: `{'column1': 'value1', 'column2': 'value2'}`
+        Example: `{'column1': 'value1', 'column2': ['value2', 'value3']}`
         
     :return: Filtered DataFrame
     :rtype: pd.DataFrame
     """
     for column, value in filter_conditions.items():
-        dataframe = dataframe[dataframe[column] == value]
+        if isinstance(value, (list, tuple, set)):
+            dataframe = dataframe[dataframe[column].isin(value)]
+        else:
+            dataframe = dataframe[dataframe[column] == value]
     return dataframe
 
+@profiled
+def drop_columns(
+        dataframe: pd.DataFrame,
+        columns: list,
+    ) -> pd.DataFrame:
+    """Drop the given columns from a DataFrame.
+    
+    :param dataframe: The DataFrame to drop columns from.
+    :type dataframe: pd.DataFrame
+    :param columns: List of columns to drop.
+    :type columns: list
+    
+    :return: DataFrame without the dropped columns.
+    :rtype: pd.DataFrame
+    """
+    return dataframe.drop(columns=columns)
+
+@profiled
 def export_data(
         dataframe: pd.DataFrame,
         file_name: str ='cleaned_data.csv',
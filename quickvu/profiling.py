@@ -0,0 +1,281 @@
+import functools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from collections import deque, namedtuple
+
+import pandas as pd
+
+from .config import Config
+
+Record = namedtuple('Record', [
+    'function', 'started_at', 'wall_seconds', 'cpu_seconds', 'memory_peak_bytes',
+    'rows_in', 'columns_in', 'rows_out', 'columns_out', 'error'
+])
+Record.__doc__ = """One profiled call.
+
+`memory_peak_bytes` is the peak of the memory traced by `tracemalloc` during the call, above
+what was allocated when it started. It is None when memory is not traced, and when another
+profiled call ran in another thread at the same time, see `Profiler`. Rows and columns are
+those of the first DataFrame argument and of the result, None when they are not DataFrames."""
+
+
+def _shape(value):
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        # e.g. (cleaned, report) results
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value), value.shape[1] if value.ndim == 2 else 1
+    return None, None
+
+
+class Profiler:
+    """Records the cost of calls to the functions decorated with `profiled`.
+
+    Each call records its wall time, CPU time of the process, peak memory and the shape of
+    its input and output frames. Disabled, a decorated function only checks a flag before
+    calling through, so profiling can stay compiled in.
+
+    CPU time is process-wide, so calls running at the same time in other threads (background
+    jobs, parallel column workers) are counted in both. Traced memory is process-wide too, and
+    `tracemalloc` has a single peak: only one thread's calls are traced at a time. Calls starting
+    in other threads meanwhile are not traced, and the traced calls they overlap record no peak
+    either. Allocations of other threads outside profiled calls still count towards a peak.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = Config.PROFILING,
+            trace_memory: bool = Config.PROFILING_TRACE_MEMORY,
+            max_records: int = Config.PROFILING_MAX_RECORDS
+        ):
+        """
+        :param enabled: Whether calls are recorded.
+        :type enabled: bool, optional
+        :param trace_memory: Whether to trace peak memory with `tracemalloc`, which slows down allocations.
+        :type trace_memory: bool, optional
+        :param max_records: Number of most recent calls kept.
+        :type max_records: int, optional
+        """
+        self.enabled = False
+        self.trace_memory = trace_memory
+        self._records = deque(maxlen=max_records)
+        # running per-function totals for the Prometheus counters, kept when records are dropped
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # thread whose calls are traced, whether another profiled call overlapped them, and untraced calls running
+        self._memory_owner = None
+        self._memory_overlap = False
+        self._untraced_calls = 0
+        self._server = None
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Start recording calls."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording calls. Recorded calls are kept."""
+        self.enabled = False
+
+    def call(self, func, args: tuple, kwargs: dict):
+        """Call `func(*args, **kwargs)` and record its cost."""
+        frame = args[0] if args else next(iter(kwargs.values()), None)
+        rows_in, columns_in = _shape(frame)
+        # nested calls: each level keeps [allocated at start, peak so far] and passes its peak up
+        stack = self._local.__dict__.setdefault('memory', [])
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        untraced = False
+        if tracing:
+            with self._lock:
+                if self._memory_owner == threading.get_ident() or (self._memory_owner is None and not self._untraced_calls):
+                    if self._memory_owner is None:
+                        self._memory_owner, self._memory_overlap = threading.get_ident(), False
+                else:
+                    # resetting the peak would spoil the call being traced in another thread
+                    self._memory_overlap = True
+                    self._untraced_calls += 1
+                    tracing, untraced = False, True
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+
+        started_at, wall, cpu = time.time(), time.perf_counter(), time.process_time()
+        result, error = None, None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            memory_peak = None
+            if tracing:
+                start, peak = stack.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                memory_peak = peak - start
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                with self._lock:
+                    if self._memory_overlap:
+                        memory_peak = None
+                    if not stack:
+                        self._memory_owner = None
+            elif untraced:
+                with self._lock:
+                    self._untraced_calls -= 1
+            rows_out, columns_out = _shape(result)
+            record = Record(f"{func.__module__}.{func.__qualname__}", started_at, wall, cpu, memory_peak,
+                            rows_in, columns_in, rows_out, columns_out, error)
+            with self._lock:
+                self._records.append(record)
+                totals = self._totals.setdefault(record.function, dict.fromkeys(
+                    ('calls', 'errors', 'wall_seconds', 'cpu_seconds', 'memory_peak_bytes', 'rows_in', 'rows_out'), 0))
+                totals['calls'] += 1
+                totals['errors'] += error is not None
+                totals['wall_seconds'] += wall
+                totals['cpu_seconds'] += cpu
+                totals['memory_peak_bytes'] = max(totals['memory_peak_bytes'], memory_peak or 0)
+                totals['rows_in'] += rows_in or 0
+                totals['rows_out'] += rows_out or 0
+
+    def records(self) -> list:
+        """Return the recorded calls, oldest first."""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """Forget the recorded calls. The Prometheus totals keep counting."""
+        with self._lock:
+            self._records.clear()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the recorded calls as a DataFrame, one row per call."""
+        return pd.DataFrame(self.records(), columns=Record._fields)
+
+    def summary(self) -> pd.DataFrame:
+        """Return the calls aggregated by function, most expensive first.
+
+        :return: Calls, total and mean wall time, total CPU time, largest memory peak and rows in and out per function.
+        :rtype: pd.DataFrame
+        """
+        calls = self.to_frame()
+        summary = calls.groupby('function').agg(
+            calls=('wall_seconds', 'size'),
+            wall_seconds=('wall_seconds', 'sum'),
+            mean_wall_seconds=('wall_seconds', 'mean'),
+            cpu_seconds=('cpu_seconds', 'sum'),
+            memory_peak_bytes=('memory_peak_bytes', 'max'),
+            rows_in=('rows_in', 'sum'),
+            rows_out=('rows_out', 'sum'),
+            errors=('error', 'count'),
+        )
+        return summary.sort_values('wall_seconds', ascending=False)
+
+    def to_json_lines(self) -> str:
+        """Return the recorded calls as JSON lines, one object per call."""
+        return ''.join(json.dumps(record._asdict()) + '\n' for record in self.records())
+
+    def to_prometheus(self) -> str:
+        """Return per-function totals since the process started, in the Prometheus text exposition format."""
+        metrics = [
+            ('quickvu_step_calls_total', 'counter', 'Profiled calls.', 'calls'),
+            ('quickvu_step_errors_total', 'counter', 'Profiled calls that raised.', 'errors'),
+            ('quickvu_step_wall_seconds_total', 'counter', 'Wall time spent in the function.', 'wall_seconds'),
+            ('quickvu_step_cpu_seconds_total', 'counter', 'Process CPU time spent in the function.', 'cpu_seconds'),
+            ('quickvu_step_memory_peak_bytes', 'gauge', 'Largest memory peak of a call.', 'memory_peak_bytes'),
+            ('quickvu_step_rows_in_total', 'counter', 'Rows passed to the function.', 'rows_in'),
+            ('quickvu_step_rows_out_total', 'counter', 'Rows returned by the function.', 'rows_out'),
+        ]
+        with self._lock:
+            totals = {function: dict(values) for function, values in sorted(self._totals.items())}
+        lines = []
+        for name, kind, description, column in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for function, values in totals.items():
+                lines.append(f'{name}{{function="{function}"}} {float(values[column])!r}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str, file_format: str = 'jsonl'):
+        """Write the recorded calls to a file.
+
+        :param path: Destination file.
+        :type path: str
+        :param file_format: `jsonl` for one JSON object per call, or `prometheus` for per-function totals.
+        :type file_format: str, optional
+        """
+        if file_format == 'jsonl':
+            text = self.to_json_lines()
+        elif file_format == 'prometheus':
+            text = self.to_prometheus()
+        else:
+            raise ValueError("Invalid profiling export format. Choose 'jsonl' or 'prometheus'.")
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def serve(self, port: int, host: str = '127.0.0.1'):
+        """Serve `to_prometheus` at `http://host:port/metrics` from a background thread, once per process.
+
+        :param port: Port to listen on, e.g. `Config.PROFILING_METRICS_PORT`.
+        :type port: int
+        :param host: Address to listen on, local only by default.
+        :type host: str, optional
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        profiler = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = profiler.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        with self._lock:
+            if self._server is None:
+                self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+                threading.Thread(target=self._server.serve_forever, name='quickvu-metrics', daemon=True).start()
+        return self._server
+
+
+# shared by every session, enabled with the QUICKVU_PROFILING environment variable
+profiler = Profiler()
+
+
+def profiled(func):
+    """Decorator recording the calls of `func` with the shared `profiler` when it is enabled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        return profiler.call(func, args, kwargs)
+    return wrapper
+
+
+def warn_caller(message: str, category=UserWarning):
+    """Warn from a `profiled` function, pointing at the code calling it rather than at the profiling wrapper."""
+    # frame 1 is the profiled function; skip the wrapper frames above it
+    frame, stacklevel = sys._getframe(2), 3
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame, stacklevel = frame.f_back, stacklevel + 1
+    warnings.warn(message, category, stacklevel=stacklevel)
@@ -0,0 +1,380 @@
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from . import stats
+from .cache import fingerprint_frame
+from .config import Config
+
+# two-sided normal quantiles for the usual confidence levels
+_Z = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+Progressive = namedtuple('Progressive', ['value', 'exact', 'sample_rows', 'total_rows', 'future'])
+Progressive.__doc__ = """A result computed on a sample, with the exact computation running in the background.
+
+`value` is exact when `exact` is set; otherwise it comes from `sample_rows` of `total_rows`
+rows and `future` resolves to the exact value."""
+
+
+def _z(confidence: float) -> float:
+    if confidence not in _Z:
+        raise ValueError(f"Invalid confidence level. Choose one of {', '.join(map(str, _Z))}.")
+    return _Z[confidence]
+
+
+def reservoir_sample(
+        chunks,
+        n: int,
+        seed: int = 0
+    ) -> pd.DataFrame:
+    """Draw a uniform sample of `n` rows from a stream of chunks, in one pass.
+
+    Every row gets a random key and the `n` rows with the smallest keys are kept, which is
+    a uniform sample without replacement however the rows are split into chunks. Only `n`
+    rows plus one chunk are held in memory. The sample keeps the original row order.
+
+    :param chunks: Iterable of DataFrames with the same columns, e.g. `pd.read_csv(..., chunksize=...)`.
+    :param n: Number of rows to sample.
+    :type n: int
+    :param seed: Seed of the random keys.
+    :type seed: int, optional
+
+    :return: The sample.
+    :rtype: pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    reservoir, keys = None, np.array([])
+    for chunk in chunks:
+        chunk_keys = rng.random(len(chunk))
+        if reservoir is not None:
+            chunk = pd.concat([reservoir, chunk])
+            chunk_keys = np.concatenate([keys, chunk_keys])
+        keep = np.arange(len(chunk_keys)) if len(chunk_keys) <= n else np.sort(np.argpartition(chunk_keys, n - 1)[:n])
+        reservoir, keys = chunk.iloc[keep], chunk_keys[keep]
+    return reservoir
+
+
+def stratified_sample(
+        dataframe: pd.DataFrame,
+        by: str,
+        n: int,
+        min_per_group: int = 10,
+        seed: int = 0
+    ) -> pd.DataFrame:
+    """Draw about `n` rows, sampling each group of `by` in proportion to its size.
+
+    Small groups keep at least `min_per_group` rows (or all of theirs), so rare categories
+    still show up in per-category results. Groups are then over-represented, so the sample
+    records the size of every group in `attrs['strata']` for `sample_weights`.
+
+    :param dataframe: The dataset.
+    :type dataframe: pd.DataFrame
+    :param by: Column defining the groups.
+    :type by: str
+    :param n: Target number of rows.
+    :type n: int
+    :param min_per_group: Minimum number of rows per group.
+    :type min_per_group: int, optional
+    :param seed: Random seed.
+    :type seed: int, optional
+
+    :return: The sample, in the original row order.
+    :rtype: pd.DataFrame
+    """
+    fraction = min(1.0, n / max(len(dataframe), 1))
+    rng = np.random.default_rng(seed)
+    positions = []
+    group_rows = {}
+    for key, group in dataframe.groupby(by, observed=True, dropna=False, sort=False).indices.items():
+        size = min(len(group), max(min_per_group, int(round(len(group) * fraction))))
+        positions.append(rng.choice(group, size, replace=False))
+        group_rows[None if pd.isna(key) else key] = len(group)
+    sample = dataframe.iloc[np.sort(np.concatenate(positions))] if positions else dataframe.iloc[:0]
+    sample.attrs['strata'] = (by, group_rows)
+    return sample
+
+
+def sample_weights(sample: pd.DataFrame, total_rows: int) -> np.ndarray:
+    """Number of rows of the whole dataset each sample row stands for.
+
+    Rows of a uniform sample all stand for `total_rows / len(sample)` rows; rows of a
+    stratified sample (see `stratified_sample`) for the rows of their group over the sampled ones.
+
+    :param sample: A sample from `sample_frame`.
+    :type sample: pd.DataFrame
+    :param total_rows: Number of rows of the whole dataset.
+    :type total_rows: int
+
+    :return: One weight per sample row.
+    :rtype: np.ndarray
+    """
+    if 'strata' not in sample.attrs:
+        return np.full(len(sample), total_rows / max(len(sample), 1))
+    by, group_rows = sample.attrs['strata']
+    weights = np.empty(len(sample))
+    for key, group in sample.groupby(by, observed=True, dropna=False, sort=False).indices.items():
+        weights[group] = group_rows[None if pd.isna(key) else key] / len(group)
+    return weights
+
+
+def sum_estimate(func, column: str):
+    """Return a `sample_func` for `ProgressiveRunner.run` estimating totals of `column` from a sample.
+
+    `func` is applied to the sample with `column` multiplied by the `sample_weights`, so sums
+    of it (e.g. the bars of `visualization.plot_metrics_by_category` or the trend of
+    `eda.plot_sales_trends`) estimate the sums over the whole dataset instead of the sample.
+
+    :param func: The analysis function.
+    :param column: The summed column.
+    :type column: str
+
+    :return: The sample function.
+    """
+    def sample_func(sample, total_rows, *args, **kwargs):
+        weighted = sample.assign(**{column: sample[column] * sample_weights(sample, total_rows)})
+        return func(weighted, *args, **kwargs)
+    return sample_func
+
+
+def sample_frame(
+        dataframe: pd.DataFrame,
+        n: int = Config.PROGRESSIVE_SAMPLE_ROWS,
+        by: str = None,
+        seed: int = 0
+    ) -> pd.DataFrame:
+    """Return a uniform (or, with `by`, stratified) sample of at most about `n` rows, in row order.
+
+    The whole frame is returned when it has at most `n` rows.
+    """
+    if len(dataframe) <= n:
+        return dataframe
+    if by is not None:
+        return stratified_sample(dataframe, by, n, seed=seed)
+    return reservoir_sample([dataframe], n, seed)
+
+
+def mean_intervals(
+        sample: pd.DataFrame,
+        total_rows: int,
+        confidence: float = 0.95
+    ) -> pd.DataFrame:
+    """Confidence intervals of the means of the numeric columns, estimated from a sample.
+
+    Uses the normal approximation with the finite population correction, so the interval
+    shrinks to the sample mean as the sample approaches the whole dataset.
+
+    :param sample: A uniform sample of the dataset.
+    :type sample: pd.DataFrame
+    :param total_rows: Number of rows of the whole dataset.
+    :type total_rows: int
+    :param confidence: Confidence level, one of 0.8, 0.9, 0.95 or 0.99.
+    :type confidence: float, optional
+        Default is 0.95.
+
+    :return: `mean`, `low`, `high` and `margin` per numeric column.
+    :rtype: pd.DataFrame
+    """
+    numeric = sample[[column for column in sample.columns
+                      if is_numeric_dtype(sample[column]) and not is_bool_dtype(sample[column])]]
+    count = numeric.count()
+    mean = numeric.mean()
+    correction = np.sqrt(np.clip((total_rows - len(sample)) / max(total_rows - 1, 1), 0.0, 1.0))
+    margin = _z(confidence) * numeric.std() / np.sqrt(count) * correction
+    return pd.DataFrame({'mean': mean, 'low': mean - margin, 'high': mean + margin, 'margin': margin})
+
+
+def summary_with_intervals(
+        sample: pd.DataFrame,
+        total_rows: int,
+        confidence: float = 0.95
+    ) -> pd.DataFrame:
+    """Numeric summary of a sample, shaped like `eda.generate_summary_statistics`, with mean intervals.
+
+    Counts and missing values are scaled up to the whole dataset, and `mean low` and
+    `mean high` rows give the confidence interval of the mean (see `mean_intervals`).
+
+    :param sample: A uniform sample of the dataset.
+    :type sample: pd.DataFrame
+    :param total_rows: Number of rows of the whole dataset.
+    :type total_rows: int
+    :param confidence: Confidence level.
+    :type confidence: float, optional
+
+    :return: The estimated summary.
+    :rtype: pd.DataFrame
+    """
+    summary = stats.summarize(sample)[0]
+    scale = total_rows / max(len(sample), 1)
+    for row in ('count', 'missing'):
+        if row in summary.index:
+            summary.loc[row] = (summary.loc[row] * scale).round()
+    intervals = mean_intervals(sample, total_rows, confidence).reindex(summary.columns)
+    summary.loc['mean low'] = intervals['low']
+    summary.loc['mean high'] = intervals['high']
+    return summary
+
+
+def correlation_intervals(
+        matrix: pd.DataFrame,
+        n: int,
+        confidence: float = 0.95
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Confidence intervals of sample correlations, with the Fisher z-transformation.
+
+    :param matrix: Correlation matrix of a sample.
+    :type matrix: pd.DataFrame
+    :param n: Number of rows of the sample.
+    :type n: int
+    :param confidence: Confidence level.
+    :type confidence: float, optional
+
+    :return: Lower and upper bounds, as matrices like `matrix`.
+    :rtype: tuple[pd.DataFrame, pd.DataFrame]
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.arctanh(matrix.clip(-0.999999, 0.999999))
+        margin = _z(confidence) / np.sqrt(max(n - 3, 1))
+        return np.tanh(z - margin), np.tanh(z + margin)
+
+
+class ProgressiveRunner:
+    """Runs analysis functions on a sample first and on the whole dataset in the background.
+
+    `run` returns at once with the function applied to a sample, and submits the exact
+    computation to a small thread pool. Exact results are kept by key for the most recent
+    `max_results` computations, so a rerun of the same analysis gets the exact value (or
+    waits on the same computation) instead of starting over.
+
+    Works with any function taking the dataset first, e.g. `eda.plot_correlation_matrix`
+    or `visualization.plot_metrics_by_category`.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = Config.PROGRESSIVE_WORKERS,
+            max_results: int = Config.PROGRESSIVE_MAX_RESULTS
+        ):
+        """
+        :param max_workers: Number of background threads computing exact results.
+        :type max_workers: int, optional
+        :param max_results: Number of exact results (and samples) kept.
+        :type max_results: int, optional
+        """
+        self.max_workers = max_workers
+        self.max_results = max_results
+        self._executor = None
+        self._futures = OrderedDict()
+        self._samples = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, entries: OrderedDict, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_results:
+            entries.popitem(last=False)
+
+    def sample(
+            self,
+            dataframe: pd.DataFrame,
+            data_key: str = None,
+            sample_rows: int = Config.PROGRESSIVE_SAMPLE_ROWS,
+            by: str = None
+        ) -> pd.DataFrame:
+        """Return the sample of a dataset, drawing it only once per `data_key`."""
+        key = (data_key or fingerprint_frame(dataframe), sample_rows, by)
+        with self._lock:
+            sample = self._samples.get(key)
+        if sample is None:
+            sample = sample_frame(dataframe, sample_rows, by)
+            with self._lock:
+                self._remember(self._samples, key, sample)
+        return sample
+
+    def run(
+            self,
+            func,
+            dataframe: pd.DataFrame,
+            *args,
+            data_key: str = None,
+            sample_rows: int = Config.PROGRESSIVE_SAMPLE_ROWS,
+            by: str = None,
+            sample_func=None,
+            **kwargs
+        ) -> Progressive:
+        """Apply `func(dataframe, *args, **kwargs)` progressively.
+
+        :param func: The analysis function.
+        :param dataframe: The whole dataset.
+        :type dataframe: pd.DataFrame
+        :param data_key: Identifies the content of `dataframe`, e.g. the upload hash and the
+            options applied to it. Computed with `fingerprint_frame` when None.
+        :type data_key: str, optional
+        :param sample_rows: Rows in the sample. Smaller datasets are computed exactly right away.
+        :type sample_rows: int, optional
+        :param by: Column to stratify the sample by, e.g. the category of a per-category plot.
+        :type by: str, optional
+        :param sample_func: Function applied to the sample instead of `func`, e.g. one adding
+            confidence intervals. Called as `sample_func(sample, total_rows, *args, **kwargs)`.
+
+        :return: The sample result, or the exact one when it is already known.
+        :rtype: Progressive
+        """
+        data_key = data_key or fingerprint_frame(dataframe)
+        if len(dataframe) <= sample_rows:
+            value = func(dataframe, *args, **kwargs)
+            return Progressive(value, True, len(dataframe), len(dataframe), None)
+
+        key = (data_key, getattr(func, '__qualname__', repr(func)), repr(args), repr(sorted(kwargs.items())))
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='quickvu-exact')
+                future = self._executor.submit(func, dataframe, *args, **kwargs)
+            self._remember(self._futures, key, future)
+        if future.done() and future.exception() is None:
+            return Progressive(future.result(), True, len(dataframe), len(dataframe), future)
+
+        sample = self.sample(dataframe, data_key, sample_rows, by)
+        if sample_func is not None:
+            value = sample_func(sample, len(dataframe), *args, **kwargs)
+        else:
+            value = func(sample, *args, **kwargs)
+        return Progressive(value, False, len(sample), len(dataframe), future)
+
+    def refined(self, result: Progressive, timeout: float = None) -> Progressive:
+        """Wait for the exact value of a progressive result.
+
+        A failed computation is forgotten once its exception is raised here, so the next
+        `run` of the same analysis tries again instead of serving the error.
+
+        :param result: A result of `run`.
+        :type result: Progressive
+        :param timeout: Seconds to wait, forever when None. Raises `TimeoutError` when the
+            value is not ready in time; check `result.future.done()` to avoid waiting.
+        :type timeout: float, optional
+
+        :return: The exact result. Raises the exception of the exact computation if it failed.
+        :rtype: Progressive
+        """
+        if result.exact:
+            return result
+        try:
+            value = result.future.result(timeout)
+        except TimeoutError:
+            raise
+        except Exception:
+            with self._lock:
+                for key, future in list(self._futures.items()):
+                    if future is result.future:
+                        del self._futures[key]
+            raise
+        return Progressive(value, True, result.total_rows, result.total_rows, result.future)
+
+
+# shared by every session, so identical analyses of the same upload are computed once
+runner = ProgressiveRunner()
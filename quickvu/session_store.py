@@ -0,0 +1,181 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Compact per-session storage for working datasets.
+
+    Each session's DataFrame is kept as an Arrow table: strings live in contiguous buffers
+    instead of one Python object per value, which is usually several times smaller than the
+    pandas object columns. Tables of sessions that have been idle for `spill_after` seconds
+    are written to Arrow IPC files on local disk and reopened memory-mapped, so their pages
+    belong to the OS page cache rather than the process heap. Sessions idle for
+    `expire_after` seconds are dropped.
+
+    Frames that Arrow can't represent (e.g. object columns mixing numbers and strings) are
+    kept as they are.
+    """
+
+    def __init__(
+            self,
+            spill_after: float = Config.SESSION_SPILL_AFTER_SECONDS,
+            expire_after: float = Config.SESSION_EXPIRE_AFTER_SECONDS,
+            spill_dir: str = None
+        ):
+        """
+        :param spill_after: Seconds of inactivity after which a session's table is spilled to disk.
+        :type spill_after: float, optional
+        :param expire_after: Seconds of inactivity after which a session's dataset is dropped.
+        :type expire_after: float, optional
+        :param spill_dir: Directory for spilled tables. A temporary directory is created when None.
+        :type spill_dir: str, optional
+        """
+        self.spill_after = spill_after
+        self.expire_after = expire_after
+        self._spill_dir = spill_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _spill_path(self, session_id: str) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='quickvu-sessions-')
+        os.makedirs(self._spill_dir, exist_ok=True)
+        return os.path.join(self._spill_dir, f"{session_id}.arrow")
+
+    @staticmethod
+    def _remove(entry: dict):
+        if entry.get("path"):
+            # the memory map must be released before the file goes away
+            entry["data"] = None
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+
+    def put(self, session_id: str, dataframe: pd.DataFrame):
+        """Store the working dataset of a session, replacing the previous one.
+
+        :param session_id: Identifier of the session.
+        :type session_id: str
+        :param dataframe: The dataset to store.
+        :type dataframe: pd.DataFrame
+        """
+        try:
+            data = pa.Table.from_pandas(dataframe, preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as error:
+            logger.info(f"Keeping session dataset as pandas, it can't be stored as Arrow: {error}")
+            data = dataframe.copy()
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(self._entries.pop(session_id))
+            self._entries[session_id] = {"data": data, "path": None, "last_access": time.monotonic()}
+        self.spill_idle()
+
+    def get(self, session_id: str, arrow_dtypes: bool = False):
+        """Return the working dataset of a session, or None when there is none.
+
+        :param session_id: Identifier of the session.
+        :type session_id: str
+        :param arrow_dtypes: Return Arrow-backed pandas columns (`pd.ArrowDtype`) instead of
+            numpy ones, which avoids converting strings back to Python objects.
+        :type arrow_dtypes: bool, optional
+            Default is False.
+
+        :return: A copy of the stored dataset.
+        :rtype: pd.DataFrame
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            entry["last_access"] = time.monotonic()
+            data = entry["data"]
+        self.spill_idle()
+        if isinstance(data, pd.DataFrame):
+            return data.copy()
+        return data.to_pandas(types_mapper=pd.ArrowDtype if arrow_dtypes else None)
+
+    def drop(self, session_id: str):
+        """Forget the dataset of a session and delete its spill file."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._remove(entry)
+
+    def spill_idle(self, now: float = None):
+        """Spill idle sessions to memory-mapped files and drop expired ones.
+
+        Called on every `put` and `get`, so there is no background thread to manage.
+
+        :param now: Current `time.monotonic()` value, mostly useful for tests.
+        :type now: float, optional
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for session_id, entry in list(self._entries.items()):
+                idle = now - entry["last_access"]
+                if idle >= self.expire_after:
+                    self._remove(self._entries.pop(session_id))
+                elif idle >= self.spill_after and entry["path"] is None and isinstance(entry["data"], pa.Table):
+                    path = self._spill_path(session_id)
+                    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, entry["data"].schema) as writer:
+                        writer.write_table(entry["data"])
+                    entry["data"] = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+                    entry["path"] = path
+                    logger.info(f"Spilled idle session dataset to {path}")
+
+    def close(self):
+        """Drop every session and remove the spill directory."""
+        with self._lock:
+            for entry in self._entries.values():
+                self._remove(entry)
+            self._entries.clear()
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+
+    def __contains__(self, session_id) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def info(self) -> dict:
+        """Return the number of sessions and the memory they hold.
+
+        :return: Store statistics. `memory_bytes` counts in-memory tables and frames,
+            `spilled_bytes` the tables that are memory-mapped from disk.
+        :rtype: dict
+        """
+        with self._lock:
+            memory_bytes = spilled_bytes = spilled = 0
+            for entry in self._entries.values():
+                data = entry["data"]
+                nbytes = int(data.memory_usage(deep=True).sum()) if isinstance(data, pd.DataFrame) else data.nbytes
+                if entry["path"] is None:
+                    memory_bytes += nbytes
+                else:
+                    spilled_bytes += nbytes
+                    spilled += 1
+            return {
+                "sessions": len(self._entries),
+                "spilled": spilled,
+                "memory_bytes": memory_bytes,
+                "spilled_bytes": spilled_bytes,
+            }
+
+
+# working datasets of every Quick Prep session
+dataset_store = SessionStore()
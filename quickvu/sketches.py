@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+
+
+class KLLSketch:
+    """A mergeable quantile sketch (KLL) that holds a bounded number of values.
+
+    Values are kept in a stack of compactors. Level `h` holds values that each stand for
+    `2**h` original values; when a level goes over its capacity it is sorted and every other
+    value (from a random offset) is promoted to the next level. The sketch keeps roughly
+    `3 * k` values no matter how many were added, and a quantile query is off by at most
+    about `error` in rank (e.g. `error=0.01` may return the 24th-26th percentile for `0.25`).
+
+    While nothing has been compacted yet the sketch still holds every value, and quantiles
+    are exact and match `numpy.quantile`.
+    """
+
+    def __init__(self, error: float = 0.01, seed: int = 0):
+        """
+        :param error: Target rank error of quantile queries, between 0 and 1.
+        :type error: float, optional
+            Default is 0.01.
+        :param seed: Seed for the random compaction offsets, so results are reproducible.
+        :type seed: int, optional
+            Default is 0.
+        """
+        if not 0 < error < 1:
+            raise ValueError("The sketch error must be between 0 and 1.")
+        self.error = error
+        self.k = max(8, math.ceil(2.7 / error))
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays at this level so no weight is lost
+                keep = items[:len(items) % 2]
+                paired = items[len(items) % 2:]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add values to the sketch. NaNs are ignored.
+
+        :param values: Array-like of numbers.
+
+        :return: The sketch itself.
+        :rtype: KLLSketch
+        """
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch'):
+        """Combine another sketch, e.g. one built from another chunk, into this one.
+
+        :param other: The sketch to merge in.
+        :type other: KLLSketch
+
+        :return: The sketch itself.
+        :rtype: KLLSketch
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    @property
+    def is_exact(self) -> bool:
+        """True while the sketch still holds every value added to it."""
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        """Return the approximate quantile(s) of the values added so far.
+
+        :param q: A quantile or a sequence of quantiles between 0 and 1.
+
+        :return: The quantile value(s), NaN when the sketch is empty.
+        :rtype: float | np.ndarray
+        """
+        scalar = np.ndim(q) == 0
+        q = np.atleast_1d(np.asarray(q, dtype='float64'))
+        if self.count == 0:
+            result = np.full(len(q), np.nan)
+        elif self.is_exact:
+            result = np.quantile(self.levels[0], q)
+        else:
+            items, weights = self._weighted_items()
+            # position of each item on the same 0..n-1 rank scale numpy.quantile interpolates on
+            positions = np.cumsum(weights) - (weights + 1) / 2
+            result = np.interp(q * (weights.sum() - 1), positions, items)
+        return float(result[0]) if scalar else result
+
+    def _weighted_items(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the retained values in sorted order with the number of values each stands for."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def rank(self, values) -> np.ndarray:
+        """Return the approximate rank of each value among the values added so far.
+
+        Ranks are on the `1..count` scale of `pandas.Series.rank`, with ties getting their average
+        rank, so they are exact while the sketch `is_exact`. NaNs get a NaN rank.
+
+        :param values: Array-like of numbers.
+
+        :return: The ranks.
+        :rtype: np.ndarray
+        """
+        values = np.asarray(values, dtype='float64')
+        items, weights = self._weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        below = cumulative[np.searchsorted(items, values, side='left')]
+        equal = cumulative[np.searchsorted(items, values, side='right')] - below
+        ranks = below + (equal + 1) / 2
+        ranks[np.isnan(values)] = np.nan
+        return ranks
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the retained values, in bytes."""
+        return sum(level.nbytes for level in self.levels)
+
+
+def column_sketches(
+        chunks,
+        columns: list,
+        error: float = 0.01
+    ) -> dict:
+    """Build one quantile sketch per column from an iterable of DataFrame chunks.
+
+    :param chunks: Iterable of DataFrames, e.g. `pd.read_csv(..., chunksize=...)`.
+    :param columns: Numeric columns to sketch.
+    :type columns: list
+    :param error: Target rank error of the sketches.
+    :type error: float, optional
+        Default is 0.01.
+
+    :return: Mapping of column name to `KLLSketch`.
+    :rtype: dict
+    """
+    sketches = {column: KLLSketch(error=error) for column in columns}
+    for chunk in chunks:
+        for column in columns:
+            sketches[column].update(chunk[column].to_numpy(dtype='float64', na_value=np.nan))
+    return sketches
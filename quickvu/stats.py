@@ -0,0 +1,272 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_numeric_dtype,
+    is_timedelta64_dtype,
+)
+
+from .cache import FrameCache, fingerprint_frame
+from .sketches import KLLSketch
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+_summary_cache = FrameCache(max_bytes=64 * 1024 * 1024)
+
+
+def _is_text(series: pd.Series) -> bool:
+    """Check whether a column is summarized as text (object, string or category)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return True
+    return not (is_numeric_dtype(series) or is_datetime64_any_dtype(series) or is_timedelta64_dtype(series))
+
+
+class SummaryAccumulator:
+    """Mergeable summary statistics for every column of a dataset.
+
+    Each `update` makes one vectorized pass over a chunk: numeric columns are stacked into a
+    single float block for counts, moments, min and max, and text columns contribute value
+    counts. Partial results from different chunks (or workers) are combined with `merge`,
+    using the parallel variance formula for the moments, so the summary of a dataset read in
+    chunks equals the summary of the whole frame.
+
+    Quartiles are exact by default, which keeps every numeric value until the summary is
+    built. With `quantile_method='sketch'` each numeric column is summarized by a mergeable
+    `KLLSketch` instead, so memory stays bounded however many chunks are added.
+    """
+
+    def __init__(self, quantile_method: str = 'exact', error: float = 0.01):
+        if quantile_method not in ('exact', 'sketch'):
+            raise ValueError("Invalid quantile method. Choose 'exact' or 'sketch'.")
+        self.quantile_method = quantile_method
+        self.error = error
+        self.columns = None
+        self.numeric_columns = []
+        self.text_columns = []
+        self.rows = 0
+        self.null_counts = None
+        self.count = self.mean = self.m2 = self.min = self.max = None
+        self.value_counts = {}
+        self._numeric_values = []
+        self._sketches = {}
+
+    @classmethod
+    def from_chunk(
+            cls,
+            chunk: pd.DataFrame,
+            numeric_columns: list = None,
+            text_columns: list = None,
+            quantile_method: str = 'exact',
+            error: float = 0.01
+        ):
+        """Compute the statistics of a single chunk.
+
+        :param chunk: The rows to summarize.
+        :type chunk: pd.DataFrame
+        :param numeric_columns: Columns to treat as numeric. Inferred from the dtypes when None.
+        :type numeric_columns: list, optional
+        :param text_columns: Columns to treat as text. Inferred from the dtypes when None.
+        :type text_columns: list, optional
+        :param quantile_method: `exact` or `sketch`, see the class docstring.
+        :type quantile_method: str, optional
+        :param error: Target rank error of the quantile sketches.
+        :type error: float, optional
+
+        :return: An accumulator holding the statistics of the chunk.
+        :rtype: SummaryAccumulator
+        """
+        accumulator = cls(quantile_method, error)
+        accumulator.columns = chunk.columns.tolist()
+        if numeric_columns is None:
+            numeric_columns = [column for column in accumulator.columns
+                               if is_numeric_dtype(chunk[column]) and not is_bool_dtype(chunk[column])]
+        if text_columns is None:
+            text_columns = [column for column in accumulator.columns if _is_text(chunk[column])]
+        accumulator.numeric_columns, accumulator.text_columns = numeric_columns, text_columns
+        accumulator.rows = len(chunk)
+        accumulator.null_counts = chunk.isna().sum().astype('int64')
+
+        # all numeric columns go through numpy as one 2-D block
+        numeric = chunk[numeric_columns]
+        if not all(is_numeric_dtype(dtype) for dtype in numeric.dtypes):
+            # a later chunk can parse a numeric column as text; values that aren't numbers count as missing
+            numeric = numeric.apply(pd.to_numeric, errors='coerce')
+        values = numeric.to_numpy(dtype='float64', na_value=np.nan)
+        with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            accumulator.count = np.sum(~np.isnan(values), axis=0).astype('float64')
+            accumulator.mean = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(numeric_columns))
+            accumulator.m2 = np.nansum((values - accumulator.mean) ** 2, axis=0)
+            accumulator.min = np.nanmin(values, axis=0) if len(values) else np.full(len(numeric_columns), np.nan)
+            accumulator.max = np.nanmax(values, axis=0) if len(values) else np.full(len(numeric_columns), np.nan)
+        if quantile_method == 'sketch':
+            accumulator._sketches = {column: KLLSketch(error).update(values[:, position])
+                                     for position, column in enumerate(numeric_columns)}
+        else:
+            accumulator._numeric_values = [values]
+
+        accumulator.value_counts = {column: chunk[column].value_counts(dropna=True) for column in text_columns}
+        return accumulator
+
+    def update(self, chunk: pd.DataFrame):
+        """Add a chunk of rows to the summary.
+
+        :param chunk: A DataFrame with the same columns as the previous chunks.
+        :type chunk: pd.DataFrame
+
+        :return: The accumulator itself.
+        :rtype: SummaryAccumulator
+        """
+        if self.columns is None:
+            return self.merge(SummaryAccumulator.from_chunk(
+                chunk, quantile_method=self.quantile_method, error=self.error))
+        return self.merge(SummaryAccumulator.from_chunk(
+            chunk, self.numeric_columns, self.text_columns, self.quantile_method, self.error))
+
+    def merge(self, other: 'SummaryAccumulator'):
+        """Combine the partial statistics of another accumulator into this one.
+
+        :param other: Accumulator built from other rows of the same dataset.
+        :type other: SummaryAccumulator
+
+        :return: The accumulator itself.
+        :rtype: SummaryAccumulator
+        """
+        if self.columns is None:
+            self.columns = other.columns
+            self.numeric_columns, self.text_columns = other.numeric_columns, other.text_columns
+            self.rows, self.null_counts = other.rows, other.null_counts.copy()
+            self.count, self.mean, self.m2 = other.count.copy(), other.mean.copy(), other.m2.copy()
+            self.min, self.max = other.min.copy(), other.max.copy()
+            self.value_counts = dict(other.value_counts)
+            self._numeric_values = list(other._numeric_values)
+            self._sketches = dict(other._sketches)
+            return self
+
+        total = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(total > 0, other.count / total, 0.0)
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * weight
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * weight
+        self.count = total
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+        self.rows += other.rows
+        self.null_counts = self.null_counts.add(other.null_counts, fill_value=0).astype('int64')
+        self._numeric_values.extend(other._numeric_values)
+        for column, sketch in other._sketches.items():
+            if column in self._sketches:
+                self._sketches[column].merge(sketch)
+            else:
+                self._sketches[column] = sketch
+        for column, counts in other.value_counts.items():
+            if column in self.value_counts:
+                self.value_counts[column] = self.value_counts[column].add(counts, fill_value=0).astype('int64')
+            else:
+                self.value_counts[column] = counts
+        return self
+
+    def quantiles(self) -> np.ndarray:
+        """Return the 25%, 50% and 75% quantiles of each numeric column, shape (3, columns)."""
+        if self._sketches:
+            return np.column_stack([self._sketches[column].quantile(QUANTILES)
+                                    for column in self.numeric_columns])
+        if not self._numeric_values:
+            return np.full((len(QUANTILES), len(self.numeric_columns)), np.nan)
+        values = np.concatenate(self._numeric_values) if len(self._numeric_values) > 1 else self._numeric_values[0]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            return np.nanquantile(values, QUANTILES, axis=0)
+
+    def numeric_summary(self) -> pd.DataFrame:
+        """Return the summary of numeric columns, laid out like `DataFrame.describe`.
+
+        :return: Count, mean, std, min, quartiles, max and missing values per numeric column.
+        :rtype: pd.DataFrame
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.where(self.count > 1, self.m2 / (self.count - 1), np.nan))
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        rows = [self.count, mean, std, self.min, *self.quantiles(), self.max,
+                self.null_counts.reindex(self.numeric_columns).to_numpy(dtype='float64')]
+        index = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'missing']
+        return pd.DataFrame(rows, index=index, columns=self.numeric_columns)
+
+    def object_summary(self) -> pd.DataFrame:
+        """Return the summary of text columns, laid out like `DataFrame.describe(include='object')`.
+
+        :return: Count, unique values, most frequent value, its frequency and missing values per text column.
+        :rtype: pd.DataFrame
+        """
+        summary = {}
+        for column in self.text_columns:
+            counts = self.value_counts[column]
+            counts = counts[counts > 0]
+            summary[column] = {
+                'count': int(counts.sum()),
+                'unique': len(counts),
+                'top': counts.idxmax() if len(counts) else np.nan,
+                'freq': int(counts.max()) if len(counts) else np.nan,
+                'missing': int(self.null_counts[column]),
+            }
+        return pd.DataFrame(summary, index=['count', 'unique', 'top', 'freq', 'missing'], dtype=object)
+
+
+def summarize_chunks(
+        chunks,
+        quantile_method: str = 'exact',
+        error: float = 0.01
+    ) -> SummaryAccumulator:
+    """Summarize a dataset given as an iterable of chunks, e.g. `pd.read_csv(..., chunksize=...)`.
+
+    :param chunks: Iterable of DataFrames with the same columns.
+    :param quantile_method: `exact` keeps numeric values for exact quartiles; `sketch` uses
+        bounded-memory quantile sketches, which suits data that doesn't fit in RAM.
+    :type quantile_method: str, optional
+        Default is `exact`.
+    :param error: Target rank error of the quantile sketches.
+    :type error: float, optional
+        Default is 0.01.
+
+    :return: The accumulated statistics.
+    :rtype: SummaryAccumulator
+    """
+    accumulator = SummaryAccumulator(quantile_method, error)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator
+
+
+def summarize(
+        dataframe: pd.DataFrame,
+        quantile_method: str = 'exact',
+        error: float = 0.01
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return numeric and text summaries of a DataFrame from a single pass, memoized by content.
+
+    :param dataframe: Input dataset.
+    :type dataframe: pd.DataFrame
+    :param quantile_method: `exact` or `sketch` quartiles, see `summarize_chunks`.
+    :type quantile_method: str, optional
+        Default is `exact`.
+    :param error: Target rank error of the quantile sketches.
+    :type error: float, optional
+        Default is 0.01.
+
+    :return: The numeric summary and the text summary.
+    :rtype: tuple[pd.DataFrame, pd.DataFrame]
+    """
+    key = (fingerprint_frame(dataframe), quantile_method, error)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached[0].copy(), cached[1].copy()
+
+    accumulator = summarize_chunks([dataframe], quantile_method, error)
+    result = (accumulator.numeric_summary(), accumulator.object_summary())
+    _summary_cache.put(key, result, nbytes=sum(int(frame.memory_usage(deep=True).sum()) for frame in result))
+    return result[0].copy(), result[1].copy()
@@ -0,0 +1,490 @@
+import abc
+import datetime
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .cache import hash_bytes
+from .config import Config
+from .sketches import KLLSketch
+
+
+def _chunks(data):
+    """Iterate over the chunks of a DataFrame or of an iterable of DataFrames."""
+    if isinstance(data, pd.DataFrame):
+        yield data
+    elif isinstance(data, np.ndarray):
+        yield pd.DataFrame(data)
+    else:
+        yield from data
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return is_numeric_dtype(series) and not is_bool_dtype(series)
+
+
+def _encode(value):
+    """Encode a fill value for JSON, keeping timestamps, dates and numpy scalars."""
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return {'timestamp': pd.Timestamp(value).isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _decode(value):
+    if isinstance(value, dict) and 'timestamp' in value:
+        return pd.Timestamp(value['timestamp'])
+    if isinstance(value, dict) and 'date' in value:
+        return datetime.date.fromisoformat(value['date'])
+    return value
+
+
+class _StreamingTransformer(abc.ABC):
+    """Shared plumbing of the fit-once transformers.
+
+    Statistics are accumulated by `partial_fit`, one chunk at a time, so a transformer can be
+    fitted on data that doesn't fit in memory and updated later with new batches. The
+    fitted state is saved as JSON with `save` and read back with `load`.
+
+    The scikit-learn estimator API (`fit`, `transform`, `get_params`, `set_params`) is
+    implemented without importing scikit-learn, so the transformers work in a scikit-learn
+    `Pipeline` and with `clone`.
+    """
+
+    _params = ()
+
+    def get_params(self, deep: bool = True) -> dict:
+        return {name: getattr(self, name) for name in self._params}
+
+    def set_params(self, **params):
+        for name, value in params.items():
+            if name not in self._params:
+                raise ValueError(f"Invalid parameter '{name}'. Choose one of {', '.join(self._params)}.")
+            setattr(self, name, value)
+        self._fingerprint = None
+        return self
+
+    @abc.abstractmethod
+    def _reset(self):
+        """Forget the fitted statistics."""
+
+    @abc.abstractmethod
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        """Update the statistics with one chunk."""
+
+    @abc.abstractmethod
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Apply the fitted statistics to a chunk."""
+
+    def fit(self, X, y=None):
+        """Fit the statistics from scratch.
+
+        :param X: A DataFrame, or an iterable of DataFrame chunks, e.g. `pd.read_csv(..., chunksize=...)`.
+        :param y: Ignored, for scikit-learn compatibility.
+
+        :return: The transformer itself.
+        """
+        self._reset()
+        for chunk in _chunks(X):
+            self.partial_fit(chunk)
+        self._fingerprint = None
+        return self
+
+    def fit_transform(self, X, y=None) -> pd.DataFrame:
+        """Fit on a DataFrame and transform it.
+
+        Only for data in memory: an iterable of chunks is used up by `fit`, so call `fit` on
+        the chunks and `transform` each chunk read again instead.
+
+        :param X: A DataFrame or a numpy array.
+        :param y: Ignored, for scikit-learn compatibility.
+
+        :return: The transformed data.
+        :rtype: pd.DataFrame
+        """
+        if not isinstance(X, (pd.DataFrame, np.ndarray)):
+            raise ValueError("Invalid input for fit_transform. Pass a DataFrame, or call fit on the chunks and transform each chunk.")
+        return self.fit(X).transform(X)
+
+    @property
+    def fitted(self) -> bool:
+        return bool(getattr(self, 'columns_', None))
+
+    def _check_fitted(self):
+        if not self.fitted:
+            raise ValueError(f"This {type(self).__name__} is not fitted yet. Call fit or partial_fit first.")
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        return np.asarray(input_features if input_features is not None else self.columns_, dtype=object)
+
+    @abc.abstractmethod
+    def _state(self) -> dict:
+        """Return the fitted statistics as a JSON-serializable dict."""
+
+    @abc.abstractmethod
+    def _load_state(self, state: dict):
+        """Restore the fitted statistics of `_state`."""
+
+    def to_dict(self) -> dict:
+        """Return the parameters and fitted statistics as a JSON-serializable dict."""
+        return {'type': type(self).__name__, 'params': self.get_params(), 'state': self._state()}
+
+    def save(self, path: str):
+        """Write the transformer to a JSON file, see `load`."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    def fingerprint(self) -> str:
+        """Return a hash of the parameters and fitted statistics."""
+        # kept until the next fit, reruns ask for it with every pipeline key
+        if getattr(self, '_fingerprint', None) is None:
+            self._fingerprint = hash_bytes(json.dumps(self.to_dict(), sort_keys=True, default=str).encode())
+        return self._fingerprint
+
+    def __repr__(self) -> str:
+        params = ', '.join(f"{name}={value!r}" for name, value in self.get_params().items())
+        # the fingerprint keeps pipeline checkpoints of differently fitted transformers apart
+        fitted = f", fitted={self.fingerprint()[:12]!r}" if self.fitted else ''
+        return f"{type(self).__name__}({params}{fitted})"
+
+
+class StreamingScaler(_StreamingTransformer):
+    """Scales numeric columns with statistics fitted once, like scikit-learn's `StandardScaler` or `MinMaxScaler`.
+
+    Counts, means and sums of squared deviations (merged chunk by chunk with Chan's formula)
+    and minimums and maximums are kept per column, so both methods can be applied after any
+    number of `partial_fit` calls. Missing values are ignored when fitting and stay missing.
+    Constant columns are scaled by 1, like scikit-learn does.
+
+    Example:
+        `scaler = StreamingScaler('standarize').fit(pd.read_csv('history.csv', chunksize=100_000))`
+        then `scaler.transform(today)`, or `scaler.partial_fit(today).save('scaler.json')` to
+        keep the statistics up to date.
+    """
+
+    _params = ('method', 'columns')
+
+    def __init__(self, method: str = 'standarize', columns: list = None):
+        """
+        :param method: `standarize` (z-score) or `normalize` (min-max to 0-1).
+        :type method: str, optional
+        :param columns: Columns to scale. Defaults to the numeric columns of the first chunk fitted.
+        :type columns: list, optional
+        """
+        self.method = method
+        self.columns = columns
+        self._reset()
+
+    def _reset(self):
+        self.columns_ = []
+        self.n_samples_seen_ = np.zeros(0)
+        self.mean_ = np.zeros(0)
+        self.m2_ = np.zeros(0)
+        self.min_ = np.zeros(0)
+        self.max_ = np.zeros(0)
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        """Update the statistics with a chunk of rows.
+
+        :param X: The chunk.
+        :type X: pd.DataFrame
+        :param y: Ignored, for scikit-learn compatibility.
+
+        :return: The scaler itself.
+        :rtype: StreamingScaler
+        """
+        if self.method not in ('standarize', 'normalize'):
+            raise ValueError("Invalid method for scaling data. Choose 'standarize' or 'minmax'.")
+        X = next(_chunks(X))
+        self._fingerprint = None
+        if not self.fitted:
+            self.columns_ = list(self.columns) if self.columns is not None else [
+                column for column in X.columns if _is_numeric(X[column])]
+            width = len(self.columns_)
+            self.n_samples_seen_, self.mean_, self.m2_ = np.zeros(width), np.zeros(width), np.zeros(width)
+            self.min_, self.max_ = np.full(width, np.inf), np.full(width, -np.inf)
+
+        values = X[self.columns_].to_numpy(dtype='float64', na_value=np.nan)
+        missing = np.isnan(values)
+        count = (~missing).sum(axis=0)
+        if not count.any():
+            return self
+        mean = np.nansum(values, axis=0) / np.maximum(count, 1)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        self.min_ = np.minimum(self.min_, np.where(missing, np.inf, values).min(axis=0))
+        self.max_ = np.maximum(self.max_, np.where(missing, -np.inf, values).max(axis=0))
+
+        total = self.n_samples_seen_ + count
+        delta = mean - self.mean_
+        weight = np.divide(count, total, out=np.zeros_like(delta), where=total > 0)
+        self.m2_ = self.m2_ + m2 + delta ** 2 * self.n_samples_seen_ * weight
+        self.mean_ = self.mean_ + delta * weight
+        self.n_samples_seen_ = total
+        return self
+
+    @property
+    def center_(self) -> np.ndarray:
+        """Value subtracted from each column."""
+        self._check_fitted()
+        return self.mean_ if self.method == 'standarize' else np.where(np.isfinite(self.min_), self.min_, 0.0)
+
+    @property
+    def scale_(self) -> np.ndarray:
+        """Value each centered column is divided by."""
+        self._check_fitted()
+        if self.method == 'standarize':
+            scale = np.sqrt(np.divide(self.m2_, self.n_samples_seen_, out=np.zeros_like(self.m2_), where=self.n_samples_seen_ > 0))
+        else:
+            scale = np.where(np.isfinite(self.min_), self.max_ - self.min_, 0.0)
+        return np.where(scale == 0, 1.0, scale)
+
+    def _apply(self, X: pd.DataFrame, inverse: bool) -> pd.DataFrame:
+        self._check_fitted()
+        X = next(_chunks(X))
+        positions = [index for index, column in enumerate(self.columns_) if column in X.columns]
+        columns = [self.columns_[index] for index in positions]
+        values = X[columns].to_numpy(dtype='float64', na_value=np.nan)
+        center, scale = self.center_[positions], self.scale_[positions]
+        values = values * scale + center if inverse else (values - center) / scale
+        X = X.copy()
+        for index, column in enumerate(columns):
+            X[column] = values[:, index]
+        return X
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Scale the fitted columns of a chunk with the fitted statistics.
+
+        :param X: The chunk. Fitted columns it doesn't have are skipped.
+        :type X: pd.DataFrame
+
+        :return: A copy of the chunk with the columns scaled, as floats.
+        :rtype: pd.DataFrame
+        """
+        return self._apply(X, inverse=False)
+
+    def inverse_transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Undo `transform`."""
+        return self._apply(X, inverse=True)
+
+    def _state(self) -> dict:
+        return {
+            'columns': self.columns_,
+            'count': self.n_samples_seen_.tolist(),
+            'mean': self.mean_.tolist(),
+            'm2': self.m2_.tolist(),
+            'min': self.min_.tolist(),
+            'max': self.max_.tolist(),
+        }
+
+    def _load_state(self, state: dict):
+        self._fingerprint = None
+        self.columns_ = state['columns']
+        self.n_samples_seen_ = np.asarray(state['count'], dtype='float64')
+        self.mean_ = np.asarray(state['mean'], dtype='float64')
+        self.m2_ = np.asarray(state['m2'], dtype='float64')
+        self.min_ = np.asarray(state['min'], dtype='float64')
+        self.max_ = np.asarray(state['max'], dtype='float64')
+
+
+class StreamingImputer(_StreamingTransformer):
+    """Fills missing values with statistics fitted once, like `prepare_data.handle_missing_values`.
+
+    Numeric columns are filled with their mean (from running sums) or their median (from a
+    `KLLSketch`, exact until the sketch compacts and then within `error` in rank); other
+    columns are filled with their most frequent value, from running value counts.
+    """
+
+    _params = ('strategy', 'columns', 'error')
+
+    def __init__(self, strategy: str = 'mean', columns: list = None, error: float = 0.001):
+        """
+        :param strategy: `mean` or `median`, for the numeric columns.
+        :type strategy: str, optional
+        :param columns: Columns to impute. Defaults to every column of the first chunk fitted.
+        :type columns: list, optional
+        :param error: Rank error of the median sketches.
+        :type error: float, optional
+        """
+        self.strategy = strategy
+        self.columns = columns
+        self.error = error
+        self._reset()
+
+    def _reset(self):
+        self.columns_ = []
+        self.numeric_ = {}
+        self.counts_ = {}
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        """Update the statistics with a chunk of rows.
+
+        :param X: The chunk.
+        :type X: pd.DataFrame
+        :param y: Ignored, for scikit-learn compatibility.
+
+        :return: The imputer itself.
+        :rtype: StreamingImputer
+        """
+        if self.strategy not in ('mean', 'median'):
+            raise ValueError("Invalid method for handling missing values. Choose 'mean' or 'median'.")
+        X = next(_chunks(X))
+        self._fingerprint = None
+        if not self.fitted:
+            self.columns_ = list(self.columns) if self.columns is not None else X.columns.tolist()
+            for column in self.columns_:
+                if _is_numeric(X[column]):
+                    self.numeric_[column] = [0, 0.0] if self.strategy == 'mean' else KLLSketch(self.error)
+                else:
+                    self.counts_[column] = {}
+
+        for column, statistic in self.numeric_.items():
+            values = X[column]
+            if self.strategy == 'mean':
+                statistic[0] += int(values.count())
+                statistic[1] += float(values.sum())
+            else:
+                statistic.update(values.to_numpy(dtype='float64', na_value=np.nan))
+        for column, counts in self.counts_.items():
+            for value, count in X[column].value_counts(dropna=True, sort=False).items():
+                if count:
+                    counts[value] = counts.get(value, 0) + int(count)
+        return self
+
+    @property
+    def statistics_(self) -> dict:
+        """Fill value per column, None for columns without any value yet."""
+        self._check_fitted()
+        statistics = {}
+        for column, statistic in self.numeric_.items():
+            if self.strategy == 'mean':
+                statistics[column] = statistic[1] / statistic[0] if statistic[0] else None
+            else:
+                statistics[column] = statistic.quantile(0.5) if statistic.count else None
+        for column, counts in self.counts_.items():
+            if not counts:
+                statistics[column] = None
+                continue
+            most = max(counts.values())
+            tied = [value for value, count in counts.items() if count == most]
+            try:
+                # the smallest of tied values, like `Series.mode()[0]`
+                statistics[column] = min(tied)
+            except TypeError:
+                statistics[column] = tied[0]
+        return statistics
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Fill the missing values of a chunk with the fitted statistics.
+
+        :param X: The chunk.
+        :type X: pd.DataFrame
+
+        :return: A copy of the chunk with the missing values filled.
+        :rtype: pd.DataFrame
+        """
+        X = next(_chunks(X))
+        fill = {column: value for column, value in self.statistics_.items() if value is not None and column in X.columns}
+        return X.fillna(fill) if fill else X.copy()
+
+    def _state(self) -> dict:
+        numeric = {}
+        for column, statistic in self.numeric_.items():
+            if self.strategy == 'mean':
+                numeric[column] = {'count': statistic[0], 'sum': statistic[1]}
+            else:
+                numeric[column] = {'count': statistic.count, 'levels': [level.tolist() for level in statistic.levels]}
+        return {
+            'columns': self.columns_,
+            'numeric': numeric,
+            'counts': {column: [[_encode(value), count] for value, count in counts.items()]
+                       for column, counts in self.counts_.items()},
+        }
+
+    def _load_state(self, state: dict):
+        self._fingerprint = None
+        self.columns_ = state['columns']
+        self.numeric_ = {}
+        for column, statistic in state['numeric'].items():
+            if self.strategy == 'mean':
+                self.numeric_[column] = [statistic['count'], statistic['sum']]
+            else:
+                sketch = KLLSketch(self.error)
+                sketch.count = statistic['count']
+                sketch.levels = [np.asarray(level, dtype='float64') for level in statistic['levels']]
+                self.numeric_[column] = sketch
+        self.counts_ = {column: {_decode(value): count for value, count in counts}
+                        for column, counts in state['counts'].items()}
+
+
+TRANSFORMER_TYPES = (StreamingScaler, StreamingImputer)
+TRANSFORMERS = {transformer.__name__: transformer for transformer in TRANSFORMER_TYPES}
+
+
+def from_dict(data: dict):
+    """Rebuild a transformer from `to_dict` output."""
+    if data.get('type') not in TRANSFORMERS:
+        raise ValueError(f"Unknown transformer '{data.get('type')}'. Choose one of {', '.join(TRANSFORMERS)}.")
+    transformer = TRANSFORMERS[data['type']](**data['params'])
+    transformer._load_state(data['state'])
+    return transformer
+
+
+def load(path_or_buffer):
+    """Read a transformer saved with `save`.
+
+    :param path_or_buffer: Path of the JSON file, or a file object such as an upload.
+
+    :return: The fitted transformer.
+    :rtype: StreamingScaler | StreamingImputer
+    """
+    if hasattr(path_or_buffer, 'read'):
+        return from_dict(json.load(path_or_buffer))
+    with open(path_or_buffer) as f:
+        return from_dict(json.load(f))
+
+
+class FittedCache:
+    """Keeps fitted transformers by data key and parameters, so reruns don't fit them again."""
+
+    def __init__(self, max_entries: int = Config.TRANSFORMER_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fit(self, transformer, data, data_key: str, backend=None):
+        """Return `transformer` fitted on `data`, from the cache when it was fitted on the same data before.
+
+        :param transformer: An unfitted transformer, only its parameters are used.
+        :param data: A DataFrame or an iterable of chunks, or a table of `backend`.
+        :param data_key: Identifies the content of `data`.
+        :type data_key: str
+        :param backend: A backend of `backends.BACKENDS` to fit with, see its `fit`.
+
+        :return: A fitted copy of `transformer`.
+        """
+        key = (data_key, type(transformer).__name__, repr(sorted(transformer.get_params().items())))
+        with self._lock:
+            fitted = self._entries.get(key)
+            if fitted is not None:
+                self._entries.move_to_end(key)
+                return fitted
+        fitted = type(transformer)(**transformer.get_params())
+        fitted = backend.fit(fitted, data) if backend is not None else fitted.fit(data)
+        with self._lock:
+            self._entries[key] = fitted
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fitted
+
+
+# shared by every session
+fitted_cache = FittedCache()
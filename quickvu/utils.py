@@ -3,8 +3,11 @@ import logging
 def setup_logger():
     """
     Sets up a logger for logging information, warnings, and errors.
+
+    Called once by the app entry point; importing quickvu doesn't configure logging.
     """
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    return logging.getLogger(__name__)
+    return logger
+
+logger = logging.getLogger(__name__)
 
-logger = setup_logger()
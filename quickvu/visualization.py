@@ -1,12 +1,10 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 
 def plot_metrics_by_category(
     df: pd.DataFrame, 
     category_column: str, 
     numerical_column: str
-) -> plt.Figure:
+) -> 'matplotlib.figure.Figure':
     """
     Plots total metrics by category.
     
@@ -16,7 +14,11 @@ def plot_metrics_by_category(
     
     :returns: Matplotlib figure object
     """
-    fig, ax = plt.subplots()
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
     
     # Group by product and sum sales
     metric_by_category = df.groupby(category_column)[numerical_column].sum().reset_index()
@@ -51,7 +53,11 @@ def plot_distribution(
     
     :returns: Matplotlib figure object
     """
-    fig, ax = plt.subplots()
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
     customer_sales = df.groupby(categorical_column)[numerical_column].sum().reset_index()
     sns.histplot(customer_sales[numerical_column], bins=20, kde=True, ax=ax)
     ax.set_title('Histogram Plot')
@@ -12,6 +12,14 @@ setup(
         'scikit-learn',
         'streamlit'
     ],
+    entry_points={
+        # headless cleaning with recipes saved from Quick Prep, see quickvu.cli
+        'console_scripts': ['quickvu=quickvu.cli:main'],
+    },
+    extras_require={
+        # out-of-core cleaning backend, see quickvu.backends
+        'duckdb': ['duckdb'],
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
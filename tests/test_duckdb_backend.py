@@ -0,0 +1,152 @@
+"""The duckdb backend gives the same results as the pandas backend.
+
+Run with `python -m pytest tests`; skipped when duckdb is not installed.
+"""
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from quickvu.backends import DuckDBBackend, PandasBackend
+from quickvu.generate_dummy_data import generate_test_data
+from quickvu.pipeline import Pipeline
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    rows = 200
+    data = pd.DataFrame({
+        'ID': np.arange(rows),
+        'Age': rng.integers(18, 60, rows).astype(float),
+        'Salary': rng.normal(50000, 12000, rows),
+        'Department': rng.choice(['Sales', 'HR', 'Engineering'], rows).astype(object),
+        'Comments': rng.choice(['  Good  performance!', 'Needs improvement?'], rows).astype(object),
+    })
+    data.loc[rng.random(rows) < 0.1, 'Age'] = np.nan
+    data.loc[rng.random(rows) < 0.1, 'Comments'] = None
+    data.loc[::7, 'Salary'] = 200000
+    # exact copies of earlier rows
+    data.iloc[150:170] = data.iloc[10:30].values
+    return data.astype({'ID': 'int64', 'Age': 'float64', 'Salary': 'float64'})
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = DuckDBBackend(temp_directory=str(tmp_path / 'duckdb'), batch_rows=32)
+    yield backend
+    backend.close()
+
+
+def _run_both(backend, frame, tmp_path, pipeline):
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path, index=False)
+    expected = PandasBackend().run(pipeline, frame.copy()).reset_index(drop=True)
+    table, _ = backend.scan(path)
+    result = backend.cursor().sql(backend.run(pipeline, table)).df()
+    return expected, result
+
+
+@pytest.mark.parametrize('steps', [
+    [('handle_missing_values', {'method': 'drop'})],
+    [('handle_missing_values', {'method': 'mean'})],
+    [('handle_missing_values', {'method': 'median'})],
+    [('detech_outliers', {'method': 'iqr', 'threshold': 1.5})],
+    [('detech_outliers', {'method': 'zscore', 'threshold': 2, 'columns': ['Salary']})],
+    [('clean_text_data', {'text_columns': ['Comments']})],
+    [('remove_duplicates', {})],
+    [('scale_data', {'numerical_columns': ['Salary'], 'method': 'standarize'})],
+    [('scale_data', {'numerical_columns': ['Salary', 'Age'], 'method': 'normalize'})],
+    [('convert_data_types', {'column_types': {'Salary': 'int64'}})],
+    [('filter_rows', {'filter_conditions': {'Department': ['Sales', 'HR']}})],
+    [('drop_columns', {'columns': ['Comments']})],
+    [('standardize_column_names', {})],
+    [('manipulate_columns', {'column_operations': {'add': {'Bonus': 'Salary * 0.1'}}})],
+    [('remove_duplicates', {}), ('handle_missing_values', {'method': 'mean'}),
+     ('filter_rows', {'filter_conditions': {'Department': 'Sales'}})],
+])
+def test_pipeline_matches_pandas(backend, frame, tmp_path, steps):
+    pipeline = Pipeline(steps)
+    expected, result = _run_both(backend, frame, tmp_path, pipeline)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False)
+
+
+def test_clean_text_data_on_dates_read_from_csv(backend):
+    # DuckDB reads Joining_Date as a DATE, the pandas loader as text
+    upload = io.BytesIO(generate_test_data(100).to_csv(index=False).encode())
+    upload.name = 'data.csv'
+    pipeline = Pipeline([('clean_text_data', {'text_columns': ['Joining_Date', 'Comments']})])
+    expected = PandasBackend().run(pipeline, PandasBackend().scan(upload)[0])
+    table, _ = backend.scan(upload)
+    result = backend.cursor().sql(backend.run(pipeline, table)).df()
+    for column in ('Joining_Date', 'Comments'):
+        assert result[column].tolist() == expected[column].astype(object).where(expected[column].notna(), None).tolist()
+
+
+def test_integer_conversion_of_missing_values_raises_like_pandas(backend, frame, tmp_path):
+    pipeline = Pipeline([('convert_data_types', {'column_types': {'Age': 'int64'}})])
+    with pytest.raises(pd.errors.IntCastingNaNError):
+        PandasBackend().run(pipeline, frame.copy())
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path, index=False)
+    table, _ = backend.scan(path)
+    with pytest.raises(pd.errors.IntCastingNaNError):
+        backend.run(pipeline, table)
+
+
+def test_batch_results_are_widened_like_shards(backend, frame, tmp_path):
+    def add_columns(data):
+        # an integer in the first batch, then a float; a category, then text
+        first = data['ID'].iloc[0] == 0
+        return data.assign(Ratio=data['ID'] if first else data['ID'] / 2,
+                           Team=data['Department'].astype('category') if first else data['Department'])
+
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path, index=False)
+    table, _ = backend.scan(path)
+    result = backend.cursor().sql(backend._map_batches(backend.cursor(), table, add_columns)).df()
+
+    assert result['Ratio'].dtype == np.float64
+    np.testing.assert_allclose(result['Ratio'], np.where(np.arange(len(frame)) < 32, frame['ID'], frame['ID'] / 2))
+    assert result['Team'].astype(object).tolist() == frame['Department'].tolist()
+    # batches are read back in order
+    assert result['ID'].tolist() == frame['ID'].tolist()
+
+
+def test_summarize_matches_pandas(backend, frame, tmp_path):
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path, index=False)
+    table, _ = backend.scan(path)
+    numeric, _ = backend.summarize(table)
+    expected, _ = PandasBackend().summarize(frame)
+    for statistic in ('count', 'mean', 'min', 'max'):
+        pd.testing.assert_series_equal(numeric.loc[statistic], expected.loc[statistic], check_dtype=False)
+
+
+def test_export_matches_pandas(backend, frame, tmp_path):
+    path = str(tmp_path / 'data.parquet')
+    frame.to_parquet(path, index=False)
+    table, _ = backend.scan(path)
+    exported = pd.read_parquet(pd.io.common.BytesIO(backend.export(table, 'parquet')))
+    pd.testing.assert_frame_equal(exported, frame, check_dtype=False)
+
+
+def test_sweep_and_close_delete_temporary_files(tmp_path, frame):
+    backend = DuckDBBackend(batch_rows=32)
+    upload = pd.io.common.BytesIO(frame.to_csv(index=False).encode())
+    upload.name = 'data.csv'
+    table, report = backend.scan(upload)
+    table = backend.run(Pipeline([('manipulate_columns', {'column_operations': {'add': {'Bonus': 'Salary * 0.1'}}})]), table)
+    assert os.path.exists(report['path'])
+
+    backend.sweep(now=time.time() + backend.expire_after)
+    assert not os.listdir(backend.temp_directory)
+
+    backend.scan(upload)
+    backend.close()
+    assert not os.path.exists(backend.temp_directory)
@@ -0,0 +1,47 @@
+"""Converted files read back with the rows they were written with, for every output format and compression."""
+import bz2
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from quickvu import file_converter as fc
+
+CASES = ([(target_type, compression) for target_type in ('csv', 'ndjson') for compression in (None, 'gzip', 'bz2')]
+         + [('parquet', compression) for compression in (None,) + fc.PARQUET_COMPRESSION]
+         + [('xlsx', None)])
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'ID': [1, 2, 3], 'Name': ['a', 'b', 'c'], 'Salary': [1.5, None, 3.25]})
+
+
+def _read_back(data: bytes, name: str) -> pd.DataFrame:
+    if name.endswith('.gz'):
+        data, name = gzip.decompress(data), name[:-3]
+    elif name.endswith('.bz2'):
+        data, name = bz2.decompress(data), name[:-4]
+    return fc.read_file(io.BytesIO(data), name.rsplit('.', 1)[1])
+
+
+@pytest.mark.parametrize('target_type, compression', CASES)
+def test_round_trip(frame, target_type, compression):
+    source = io.BytesIO(frame.to_csv(index=False).encode())
+    sink, report = fc.convert(source, 'csv', target_type, compression=compression)
+    name = fc.output_name('data.csv', target_type, compression)
+
+    assert report['rows'] == len(frame)
+    assert name.startswith(f"data.{target_type}")
+    if target_type == 'parquet':
+        # Parquet compresses its own pages, the file itself is never wrapped
+        assert name == 'data.parquet'
+        assert sink.getvalue()[:4] == b'PAR1'
+    result = _read_back(sink.getvalue(), name)
+    pd.testing.assert_frame_equal(result, frame, check_dtype=False)
+
+
+def test_compression_for_another_format_is_refused(frame):
+    with pytest.raises(ValueError):
+        fc.convert(io.BytesIO(frame.to_csv(index=False).encode()), 'csv', 'csv', compression='zstd')
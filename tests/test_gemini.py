@@ -0,0 +1,56 @@
+"""Correlation explanations return within their timeout and are cached per backend."""
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from quickvu import gemini
+from quickvu.config import Config
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'EXPLANATION_CACHE_DIR', str(tmp_path / 'explanations'))
+
+
+@pytest.fixture
+def matrix():
+    return pd.DataFrame({'a': [1.0, 0.5], 'b': [0.5, 1.0]}, index=['a', 'b'])
+
+
+def test_slow_backend_times_out_without_waiting(matrix):
+    started = time.perf_counter()
+    text = gemini.explain_correlation_matrix(matrix, timeout=0.5, backend=gemini.StubBackend(delay=4))
+    assert time.perf_counter() - started < 1.5
+    assert text.startswith("Error: the explanation took longer than 0.5 seconds")
+
+
+def test_async_slow_backend_times_out_without_waiting(matrix):
+    started = time.perf_counter()
+    text = asyncio.run(gemini.explain_correlation_matrix_async(matrix, timeout=0.5, backend=gemini.StubBackend(delay=4)))
+    assert time.perf_counter() - started < 1.5
+    assert text.startswith("Error")
+
+
+def test_timed_out_requests_give_their_slots_back(matrix):
+    slow = gemini.StubBackend(delay=3)
+    for decimals in range(Config.LLM_MAX_CONCURRENCY):
+        # a different rounding per call, so none is answered from the cache
+        gemini.explain_correlation_matrix(matrix + decimals, timeout=0.1, backend=slow)
+    started = time.perf_counter()
+    text = gemini.explain_correlation_matrix(matrix, timeout=1, backend=gemini.StubBackend())
+    assert time.perf_counter() - started < 0.5
+    assert text.startswith("Stub explanation")
+
+
+def test_answers_are_cached_per_backend(matrix):
+    stub = gemini.StubBackend()
+    first = gemini.explain_correlation_matrix(matrix, backend=stub)
+    assert gemini.explain_correlation_matrix(matrix, backend=stub) == first
+    assert stub.calls == 1
+
+    other = gemini.StubBackend()
+    other.name = 'other'
+    gemini.explain_correlation_matrix(matrix, backend=other)
+    assert other.calls == 1